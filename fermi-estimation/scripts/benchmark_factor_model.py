@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Benchmark factor_model.py phases on synthetic factor models."""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from factor_model import (
+    build_result,
+    correlation_entries,
+    monte_carlo_summary,
+    parse_node,
+    scenario_totals,
+    sensitivity_entries,
+    write_json,
+    write_markdown,
+)
+
+BENCHMARK_FORMAT_VERSION = 1
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10
+PHASES = (
+    "parse_node",
+    "sensitivity_entries",
+    "correlation_entries",
+    "scenario_totals",
+    "monte_carlo_summary",
+    "write_json",
+    "write_json_compact",
+    "write_markdown",
+)
+RENDER_PHASES = ("parse_node", "write_json", "write_json_compact", "write_markdown")
+
+
+def synthetic_factor(rng: random.Random, name: str, around: float) -> dict:
+    base = around * rng.uniform(0.8, 1.2)
+    return {
+        "name": name,
+        "low": base * rng.uniform(0.6, 0.95),
+        "base": base,
+        "high": base * rng.uniform(1.05, 1.6),
+    }
+
+
+def wide_product_payload(width: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    return {
+        "name": f"wide_product_{width}",
+        "mode": "product",
+        "factors": [
+            synthetic_factor(rng, f"f{index}", 1.0) for index in range(width)
+        ],
+    }
+
+
+def deep_tree_node(
+    rng: random.Random, name: str, depth: int, branching: int, mode: str
+) -> dict:
+    around = 1.0 if mode == "product" else 100.0
+    if depth <= 1:
+        return {
+            "name": name,
+            "mode": mode,
+            "factors": [
+                synthetic_factor(rng, f"f{index}", around)
+                for index in range(branching)
+            ],
+        }
+    child_mode = "sum" if mode == "product" else "product"
+    return {
+        "name": name,
+        "mode": mode,
+        "factors": [synthetic_factor(rng, "scale", around)],
+        "groups": [
+            deep_tree_node(rng, f"g{index}", depth - 1, branching, child_mode)
+            for index in range(branching)
+        ],
+    }
+
+
+def deep_tree_payload(depth: int, branching: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    payload = deep_tree_node(rng, "deep_tree", depth, branching, "sum")
+    payload["name"] = f"deep_tree_d{depth}_b{branching}"
+    return payload
+
+
+def correlated_payload(groups: int, per_group: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    segments = []
+    for index in range(groups):
+        factors = []
+        for position in range(per_group):
+            factor = synthetic_factor(rng, f"f{position}", 1.0 if position else 1000.0)
+            factor["correlation_group"] = f"corr{index}"
+            factor["correlation_direction"] = rng.choice(["positive", "negative"])
+            factor["correlation_strength"] = round(rng.uniform(0.3, 1.0), 2)
+            factors.append(factor)
+        segments.append({"name": f"segment{index}", "mode": "product", "factors": factors})
+    return {
+        "name": f"correlated_g{groups}_n{per_group}",
+        "mode": "sum",
+        "groups": segments,
+    }
+
+
+SUITES = {
+    "quick": [
+        {"case": "wide_product", "params": {"width": 100}, "samples": 500},
+        {"case": "deep_tree", "params": {"depth": 4, "branching": 3}, "samples": 500},
+        {"case": "correlated", "params": {"groups": 10, "per_group": 4}, "samples": 500},
+        {"case": "large_samples", "params": {"groups": 3, "per_group": 3}, "samples": 20000},
+        {
+            "case": "wide_output",
+            "params": {"width": 2000},
+            "samples": 200,
+            "phases": RENDER_PHASES,
+        },
+    ],
+    "full": [
+        {"case": "wide_product", "params": {"width": 1000}, "samples": 2000},
+        {"case": "deep_tree", "params": {"depth": 6, "branching": 3}, "samples": 2000},
+        {"case": "correlated", "params": {"groups": 100, "per_group": 5}, "samples": 2000},
+        {"case": "large_samples", "params": {"groups": 5, "per_group": 4}, "samples": 200000},
+        {
+            "case": "wide_output",
+            "params": {"width": 20000},
+            "samples": 200,
+            "phases": RENDER_PHASES,
+        },
+    ],
+}
+
+
+def build_payload(case: dict) -> dict:
+    params = case["params"]
+    if case["case"] in {"wide_product", "wide_output"}:
+        return wide_product_payload(params["width"])
+    if case["case"] == "deep_tree":
+        return deep_tree_payload(params["depth"], params["branching"])
+    if case["case"] in {"correlated", "large_samples"}:
+        return correlated_payload(params["groups"], params["per_group"])
+    raise ValueError(f"Unknown benchmark case: {case['case']}")
+
+
+def time_call(function, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        runs.append((time.perf_counter() - start) * 1000)
+    return {
+        "min_ms": min(runs),
+        "median_ms": statistics.median(runs),
+        "runs": repeat,
+    }
+
+
+def run_case(case: dict, repeat: int) -> dict:
+    payload = build_payload(case)
+    model = parse_node(payload)
+    output = build_result(payload, None, analyses="totals")
+    config = {
+        "enabled": True,
+        "samples": case["samples"],
+        "seed": 0,
+        "correlated_groups": True,
+    }
+    calls = {
+        "parse_node": lambda: parse_node(payload),
+        "sensitivity_entries": lambda: sensitivity_entries(model),
+        "correlation_entries": lambda: correlation_entries(model),
+        "scenario_totals": lambda: scenario_totals(model),
+        "monte_carlo_summary": lambda: monte_carlo_summary(model, config),
+        # Rendering is timed on the totals-only result, which holds every factor twice.
+        "write_json": lambda: write_json(output, io.StringIO()),
+        "write_json_compact": lambda: write_json(output, io.StringIO(), compact=True),
+        "write_markdown": lambda: write_markdown(output, io.StringIO()),
+    }
+    return {
+        "case": case["case"],
+        "name": payload["name"],
+        "params": {**case["params"], "samples": case["samples"]},
+        "timings": {
+            phase: time_call(calls[phase], repeat) for phase in case.get("phases", PHASES)
+        },
+    }
+
+
+def run_suite(suite: str, selected: list[str] | None, repeat: int) -> dict:
+    cases = SUITES[suite]
+    if selected:
+        unknown = sorted(set(selected) - {case["case"] for case in cases})
+        if unknown:
+            raise ValueError(f"Unknown benchmark case(s): {', '.join(unknown)}")
+        cases = [case for case in cases if case["case"] in selected]
+    return {
+        "version": BENCHMARK_FORMAT_VERSION,
+        "suite": suite,
+        "repeat": repeat,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [run_case(case, repeat) for case in cases],
+    }
+
+
+def compare_runs(baseline: dict, candidate: dict, threshold: float) -> dict:
+    baseline_index = {
+        (item["name"], phase): timing["min_ms"]
+        for item in baseline.get("results", [])
+        for phase, timing in item["timings"].items()
+    }
+    rows = []
+    for item in candidate.get("results", []):
+        for phase, timing in item["timings"].items():
+            before = baseline_index.get((item["name"], phase))
+            if before is None:
+                continue
+            after = timing["min_ms"]
+            change = (after - before) / before if before > 0 else 0.0
+            rows.append(
+                {
+                    "name": item["name"],
+                    "phase": phase,
+                    "baseline_ms": before,
+                    "candidate_ms": after,
+                    "change": change,
+                    "regression": change > threshold,
+                }
+            )
+    rows.sort(key=lambda row: row["change"], reverse=True)
+    return {
+        "threshold": threshold,
+        "compared": len(rows),
+        "regressions": [row for row in rows if row["regression"]],
+        "rows": rows,
+    }
+
+
+def load_run(path: str) -> dict:
+    run = json.loads(Path(path).read_text())
+    if run.get("version") != BENCHMARK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported benchmark result format in {path}")
+    return run
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument(
+        "--case",
+        action="append",
+        default=None,
+        help=(
+            "Run only this case (repeatable): wide_product, deep_tree, correlated, "
+            "large_samples, wide_output"
+        ),
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Timed runs per phase; the minimum is compared (default: {DEFAULT_REPEAT})",
+    )
+    parser.add_argument("--output", default=None, help="Write results JSON to this file")
+    parser.add_argument(
+        "--baseline",
+        default=None,
+        help="Compare this run against a previous results file",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CANDIDATE"),
+        default=None,
+        help="Compare two saved results files without running benchmarks",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Relative slowdown flagged as a regression (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.repeat <= 0:
+            raise ValueError("--repeat must be positive")
+        if args.compare:
+            output = compare_runs(
+                load_run(args.compare[0]), load_run(args.compare[1]), args.threshold
+            )
+        else:
+            output = run_suite(args.suite, args.case, args.repeat)
+            if args.output:
+                Path(args.output).write_text(json.dumps(output, indent=2) + "\n")
+            if args.baseline:
+                output["comparison"] = compare_runs(
+                    load_run(args.baseline), output, args.threshold
+                )
+        json.dump(output, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        comparison = output.get("comparison", output if args.compare else None)
+        if comparison and comparison["regressions"]:
+            return 2
+        return 0
+    except Exception as exc:
+        sys.stderr.write(f"error: {exc}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
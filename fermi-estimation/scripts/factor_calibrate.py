@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""Fit factor scales and ranges of a factor model to observed totals."""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import math
+import sys
+import time
+from pathlib import Path
+
+from factor_model import (
+    compile_model,
+    evaluate_lanes,
+    load_payload,
+    parse_node,
+    resolve_conversions,
+    resolve_definitions,
+    short_number,
+)
+
+ALLOWED_LOSSES = {"auto", "log", "relative"}
+DEFAULT_PRIOR = 0.01
+DEFAULT_MAX_ITERATIONS = 100
+DEFAULT_COVERAGE = 0.9
+FINITE_DIFFERENCE_STEP = 1e-6
+CONVERGENCE_TOLERANCE = 1e-10
+WIDTH_SEARCH_STEPS = 50
+MAX_WIDTH_MULTIPLIER = 1000.0
+
+
+def parse_model(payload: dict, forced_mode: str | None, rates: str | None) -> dict:
+    if forced_mode is not None:
+        payload = {**payload, "mode": forced_mode}
+    return parse_node(
+        payload,
+        conversions=resolve_conversions(payload, rates),
+        definitions=resolve_definitions(payload),
+    )
+
+
+def load_observations(raw_input: str) -> list[dict]:
+    raw = load_payload(raw_input)
+    if isinstance(raw, dict):
+        raw = raw.get("observations")
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("Observations must be a non-empty list or {observations: [...]}")
+    observations = []
+    for index, item in enumerate(raw, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Observation {index} must be an object, got: {item!r}")
+        label = str(item.get("label") or f"observation_{index}")
+        total = item.get("total")
+        if not isinstance(total, (int, float)) or isinstance(total, bool):
+            raise ValueError(f"Observation '{label}' has non-numeric total: {total!r}")
+        values = item.get("values", {}) or {}
+        if not isinstance(values, dict) or not all(
+            isinstance(value, (int, float)) for value in values.values()
+        ):
+            raise ValueError(f"Observation '{label}' values must map factor paths to numbers")
+        weight = item.get("weight", 1.0)
+        if not isinstance(weight, (int, float)) or weight <= 0:
+            raise ValueError(f"Observation '{label}' has non-positive weight: {weight!r}")
+        observations.append(
+            {
+                "label": label,
+                "total": float(total),
+                "values": {path: float(value) for path, value in values.items()},
+                "weight": float(weight),
+            }
+        )
+    return observations
+
+
+def select_fitted(
+    factors: list[dict], observations: list[dict], fit_paths: list[str] | None
+) -> list[int]:
+    paths = [factor["path"] for factor in factors]
+    known = set(paths)
+    for observation in observations:
+        unknown = sorted(set(observation["values"]) - known)
+        if unknown:
+            raise ValueError(
+                f"Observation '{observation['label']}' pins unknown factor(s): {', '.join(unknown)}"
+            )
+    if fit_paths:
+        # A group path selects every factor below it.
+        selected = [
+            index
+            for index, path in enumerate(paths)
+            if any(path == prefix or path.startswith(f"{prefix} > ") for prefix in fit_paths)
+        ]
+        if not selected:
+            raise ValueError(f"No factors match --fit: {', '.join(fit_paths)}")
+        return selected
+    pinned = {path for observation in observations for path in observation["values"]}
+    selected = [index for index, path in enumerate(paths) if path not in pinned]
+    if not selected:
+        raise ValueError("Every factor is pinned by an observation; nothing to fit")
+    return selected
+
+
+class Calibrator:
+    """Evaluate candidate scales for all observations in one batched pass."""
+
+    def __init__(
+        self,
+        model: dict,
+        observations: list[dict],
+        fitted: list[int],
+        loss: str,
+        prior: float,
+    ) -> None:
+        self.compiled = compile_model(model)
+        self.factors = self.compiled["factors"]
+        self.observations = observations
+        self.fitted = fitted
+        self.prior = prior
+        self.evaluations = 0
+        index_of = {factor["path"]: index for index, factor in enumerate(self.factors)}
+        self.pinned = [
+            {index_of[path]: value for path, value in observation["values"].items()}
+            for observation in observations
+        ]
+        actuals = [observation["total"] for observation in observations]
+        if loss == "auto":
+            loss = "log" if all(actual > 0 for actual in actuals) else "relative"
+        if loss == "log" and any(actual <= 0 for actual in actuals):
+            raise ValueError("Log loss needs positive observed totals; use --loss relative")
+        self.loss = loss
+
+    def lane(self, observation_index: int, scales: list[float], key: str = "base") -> list[float]:
+        values = [factor[key] for factor in self.factors]
+        for index, scale in zip(self.fitted, scales):
+            values[index] *= scale
+        values_pinned = self.pinned[observation_index]
+        for index, value in values_pinned.items():
+            values[index] = value
+        return values
+
+    def predict_many(self, thetas: list[list[float]]) -> list[list[float]]:
+        lanes = [
+            self.lane(observation_index, [math.exp(value) for value in theta])
+            for theta in thetas
+            for observation_index in range(len(self.observations))
+        ]
+        self.evaluations += len(lanes)
+        totals = evaluate_lanes(self.compiled, lanes)
+        count = len(self.observations)
+        return [totals[start : start + count] for start in range(0, len(totals), count)]
+
+    def residuals(self, theta: list[float], predictions: list[float]) -> list[float]:
+        residuals = []
+        for observation, predicted in zip(self.observations, predictions):
+            weight = math.sqrt(observation["weight"])
+            if self.loss == "log":
+                if predicted <= 0:
+                    raise ValueError(
+                        f"Model predicts a non-positive total for '{observation['label']}'; "
+                        "use --loss relative"
+                    )
+                residuals.append(weight * math.log(predicted / observation["total"]))
+            else:
+                residuals.append(
+                    weight * (predicted - observation["total"]) / abs(observation["total"] or 1.0)
+                )
+        # Ridge prior on log-scales keeps collinear factors (for example two
+        # factors in the same product) close to their hand-set values.
+        residuals.extend(math.sqrt(self.prior) * value for value in theta)
+        return residuals
+
+    def cost(self, theta: list[float], predictions: list[float]) -> float:
+        return math.fsum(value * value for value in self.residuals(theta, predictions))
+
+    def fit(self, max_iterations: int) -> tuple[list[float], int]:
+        # Levenberg-Marquardt with a forward-difference Jacobian; the base point
+        # and every perturbed point are evaluated as lanes of one batched pass.
+        theta = [0.0] * len(self.fitted)
+        damping = 1e-3
+        iterations = 0
+        for iterations in range(1, max_iterations + 1):
+            perturbed = [theta]
+            for position in range(len(theta)):
+                step = list(theta)
+                step[position] += FINITE_DIFFERENCE_STEP
+                perturbed.append(step)
+            predictions = self.predict_many(perturbed)
+            residuals = self.residuals(theta, predictions[0])
+            current = math.fsum(value * value for value in residuals)
+            jacobian = [
+                [
+                    (after - before) / FINITE_DIFFERENCE_STEP
+                    for after, before in zip(
+                        self.residuals(perturbed[position + 1], predictions[position + 1]),
+                        residuals,
+                    )
+                ]
+                for position in range(len(theta))
+            ]
+            normal = [
+                [math.fsum(a * b for a, b in zip(row, column)) for column in jacobian]
+                for row in jacobian
+            ]
+            gradient = [math.fsum(a * b for a, b in zip(row, residuals)) for row in jacobian]
+            improved = False
+            while damping < 1e12:
+                system = [
+                    [
+                        value + (damping * (normal[row][row] or 1.0) if row == column else 0.0)
+                        for column, value in enumerate(normal[row])
+                    ]
+                    for row in range(len(theta))
+                ]
+                delta = solve_linear(system, [-value for value in gradient])
+                candidate = [value + change for value, change in zip(theta, delta)]
+                candidate_cost = self.cost(candidate, self.predict_many([candidate])[0])
+                if candidate_cost < current:
+                    improved = True
+                    damping = max(damping / 3, 1e-12)
+                    break
+                damping *= 4
+            if not improved:
+                break
+            theta = candidate
+            if current - candidate_cost <= CONVERGENCE_TOLERANCE * max(current, 1.0):
+                break
+        return theta, iterations
+
+    def envelope(self, scales: list[float], width: float) -> list[tuple[float, float]]:
+        lanes = []
+        for observation_index in range(len(self.observations)):
+            base = self.lane(observation_index, scales)
+            for key in ("low", "high"):
+                values = self.lane(observation_index, scales, key)
+                for index, scale in zip(self.fitted, scales):
+                    if index in self.pinned[observation_index]:
+                        continue
+                    bound = self.factors[index][key]
+                    values[index] = widen(bound * scale, base[index], width, bound >= 0)
+                lanes.append(values)
+        self.evaluations += len(lanes)
+        totals = evaluate_lanes(self.compiled, lanes)
+        return [
+            (min(totals[index], totals[index + 1]), max(totals[index], totals[index + 1]))
+            for index in range(0, len(totals), 2)
+        ]
+
+    def coverage(self, scales: list[float], width: float) -> float:
+        weights = [observation["weight"] for observation in self.observations]
+        covered = math.fsum(
+            weight
+            for weight, observation, (low, high) in zip(
+                weights, self.observations, self.envelope(scales, width)
+            )
+            if low <= observation["total"] <= high
+        )
+        return covered / math.fsum(weights)
+
+    def fit_width(self, scales: list[float], target: float) -> float:
+        """Narrowest range multiplier whose envelopes reach the target coverage.
+
+        This is in-sample coverage on the observations the scales were fitted
+        to, so a result below 1 is optimistic; calibrate() floors it at 1.
+        """
+        upper = 1.0
+        while self.coverage(scales, upper) < target and upper < MAX_WIDTH_MULTIPLIER:
+            upper *= 2
+        lower = 0.0
+        for _ in range(WIDTH_SEARCH_STEPS):
+            middle = (lower + upper) / 2
+            if self.coverage(scales, middle) >= target:
+                upper = middle
+            else:
+                lower = middle
+        return upper
+
+
+def widen(bound: float, base: float, width: float, non_negative: bool) -> float:
+    value = base + width * (bound - base)
+    return max(value, 0.0) if non_negative else value
+
+
+def solve_linear(matrix: list[list[float]], vector: list[float]) -> list[float]:
+    size = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for column in range(size):
+        pivot = max(range(column, size), key=lambda row: abs(rows[row][column]))
+        if rows[pivot][column] == 0:
+            raise ValueError("Calibration system is singular; pin or drop redundant factors")
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in range(column + 1, size):
+            ratio = rows[row][column] / rows[column][column]
+            if ratio:
+                for position in range(column, size + 1):
+                    rows[row][position] -= ratio * rows[column][position]
+    solution = [0.0] * size
+    for row in range(size - 1, -1, -1):
+        total = rows[row][size] - math.fsum(
+            rows[row][position] * solution[position] for position in range(row + 1, size)
+        )
+        solution[row] = total / rows[row][row]
+    return solution
+
+
+def fit_metrics(
+    calibrator: Calibrator, predictions: list[float], scales: list[float], width: float
+) -> dict:
+    errors = [
+        abs(predicted - observation["total"]) / abs(observation["total"])
+        for predicted, observation in zip(predictions, calibrator.observations)
+        if observation["total"]
+    ]
+    metrics = {
+        "rmse": math.sqrt(
+            math.fsum(value * value for value in calibrator.residuals([], predictions))
+            / len(predictions)
+        ),
+        "mean_abs_pct_error": math.fsum(errors) / len(errors) if errors else None,
+        "coverage": calibrator.coverage(scales, width),
+    }
+    return metrics
+
+
+def raw_factors_by_path(payload: dict) -> dict[str, dict]:
+    # Mirror parse_node naming so fitted paths map back to payload entries.
+    found = {}
+
+    def walk(node: dict, qualified_name: str) -> None:
+        for index, factor in enumerate(node.get("factors", []), start=1):
+            found[f"{qualified_name} > {factor.get('name') or f'factor_{index}'}"] = factor
+        for index, group in enumerate(node.get("groups", []), start=1):
+            if "ref" in group:
+                continue
+            walk(group, f"{qualified_name} > {group.get('name') or f'group_{index}'}")
+
+    walk(payload, payload.get("name") or "model")
+    for name, definition in (payload.get("definitions") or {}).items():
+        walk(definition, name)
+    return found
+
+
+def scale_range(entry: dict, keys: tuple[str, ...], base: float, scale: float, width: float) -> None:
+    for key in keys:
+        value = entry.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            entry[key] = widen(value * scale, base, width, value >= 0)
+
+
+def scale_raw_factor(factor: dict, scale: float, width: float) -> None:
+    # Scenario values are points of the same range as low/high, so they are
+    # widened with it; otherwise they could fall outside the new range.
+    base = factor["base"] * scale
+    scale_range(factor, ("low", "high"), base, scale, width)
+    factor["base"] = base
+    scenarios = factor.get("scenarios")
+    if isinstance(scenarios, dict):
+        scale_range(scenarios, tuple(scenarios), base, scale, width)
+    values = factor.get("values")
+    if isinstance(values, list):
+        for index, value in enumerate(values):
+            if isinstance(value, (int, float)):
+                values[index] = value * scale
+            elif isinstance(value, dict):
+                period_base = value.get("base")
+                if isinstance(period_base, (int, float)):
+                    value["base"] = period_base * scale
+                    scale_range(value, ("low", "high"), value["base"], scale, width)
+                else:
+                    scale_range(value, ("low", "base", "high"), 0.0, scale, 1.0)
+
+
+def calibrate(
+    payload: dict,
+    observations: list[dict],
+    forced_mode: str | None = None,
+    rates: str | None = None,
+    fit_paths: list[str] | None = None,
+    loss: str = "auto",
+    prior: float = DEFAULT_PRIOR,
+    max_iterations: int = DEFAULT_MAX_ITERATIONS,
+    coverage: float | None = None,
+    allow_narrowing: bool = False,
+) -> tuple[dict, dict]:
+    model = parse_model(payload, forced_mode, rates)
+    calibrator = Calibrator(
+        model,
+        observations,
+        select_fitted(compile_model(model)["factors"], observations, fit_paths),
+        loss,
+        prior,
+    )
+    started = time.perf_counter()
+    unit_scales = [1.0] * len(calibrator.fitted)
+    before = calibrator.predict_many([[0.0] * len(calibrator.fitted)])[0]
+    theta, iterations = calibrator.fit(max_iterations)
+    scales = [math.exp(value) for value in theta]
+    width = 1.0
+    warnings = []
+    if coverage is not None:
+        narrowest = calibrator.fit_width(scales, coverage)
+        width = narrowest if allow_narrowing else max(narrowest, 1.0)
+        if narrowest < 1.0 and allow_narrowing:
+            warnings.append(
+                f"Ranges narrowed to {narrowest:.3g}x to just reach {coverage:.0%} coverage "
+                "on the fitted observations; they are likely overconfident"
+            )
+        elif narrowest < 1.0:
+            warnings.append(
+                f"Target coverage is already met in-sample at {narrowest:.3g}x; ranges kept "
+                "at 1x (pass --allow-narrowing to narrow them)"
+            )
+    after = calibrator.predict_many([theta])[0]
+    elapsed = time.perf_counter() - started
+
+    calibrated = copy.deepcopy(payload)
+    raw_factors = raw_factors_by_path(calibrated)
+    factors = []
+    for index, scale in zip(calibrator.fitted, scales):
+        factor = calibrator.factors[index]
+        raw_factor = raw_factors.get(factor["path"])
+        if raw_factor is None:
+            raise ValueError(f"Could not map fitted factor '{factor['path']}' back to the payload")
+        scale_raw_factor(raw_factor, scale, width)
+        factors.append({"path": factor["path"], "scale": scale})
+    # Re-parsing runs validate_factor, so low <= base <= high is enforced on the
+    # calibrated payload exactly as for a hand-written one.
+    refit = {
+        factor["path"]: factor
+        for factor in compile_model(parse_model(calibrated, forced_mode, rates))["factors"]
+    }
+    for entry, index in zip(factors, calibrator.fitted):
+        old = calibrator.factors[index]
+        new = refit[entry["path"]]
+        entry["old"] = {key: old[key] for key in ("low", "base", "high")}
+        entry["new"] = {key: new[key] for key in ("low", "base", "high")}
+
+    result = {
+        "loss": calibrator.loss,
+        "prior": prior,
+        "observation_count": len(observations),
+        "fitted_count": len(calibrator.fitted),
+        "iterations": iterations,
+        "evaluations": calibrator.evaluations,
+        "evaluations_per_second": calibrator.evaluations / elapsed if elapsed > 0 else None,
+        "before": fit_metrics(calibrator, before, unit_scales, 1.0),
+        "after": fit_metrics(calibrator, after, scales, width),
+        "factors": factors,
+        "observations": [
+            {
+                "label": observation["label"],
+                "actual": observation["total"],
+                "predicted_before": old,
+                "predicted_after": new,
+            }
+            for observation, old, new in zip(observations, before, after)
+        ],
+    }
+    if coverage is not None:
+        result["target_coverage"] = coverage
+        result["width_multiplier"] = width
+    if warnings:
+        result["warnings"] = warnings
+    return result, calibrated
+
+
+def render_markdown(result: dict) -> str:
+    lines = ["## Calibration"]
+    lines.append(
+        f"- Fitted {result['fitted_count']} factors to {result['observation_count']} "
+        f"observations with {result['loss']} loss in {result['iterations']} iterations "
+        f"({result['evaluations']} model evaluations)"
+    )
+    for label, key in (("Before", "before"), ("After", "after")):
+        metrics = result[key]
+        mape = metrics["mean_abs_pct_error"]
+        lines.append(
+            f"- {label}: rmse {metrics['rmse']:.4f}, mean abs error "
+            f"{f'{mape:.1%}' if mape is not None else '-'}, coverage {metrics['coverage']:.0%}"
+        )
+    if "width_multiplier" in result:
+        lines.append(
+            f"- Ranges scaled by {result['width_multiplier']:.3f}x around base for "
+            f"{result['target_coverage']:.0%} target coverage"
+        )
+    for warning in result.get("warnings", []):
+        lines.append(f"- Warning: {warning}")
+    lines.append("")
+    lines.append("## Fitted factors")
+    lines.append("| Factor | Scale | Old low / base / high | New low / base / high |")
+    lines.append("| --- | ---: | --- | --- |")
+    for entry in result["factors"]:
+        lines.append(
+            "| {path} | {scale:.4g} | {old} | {new} |".format(
+                path=entry["path"],
+                scale=entry["scale"],
+                old=" / ".join(short_number(entry["old"][key]) for key in ("low", "base", "high")),
+                new=" / ".join(short_number(entry["new"][key]) for key in ("low", "base", "high")),
+            )
+        )
+    lines.append("")
+    lines.append("## Observations")
+    lines.append("| Observation | Actual | Before | After |")
+    lines.append("| --- | ---: | ---: | ---: |")
+    for item in result["observations"]:
+        lines.append(
+            "| {label} | {actual} | {before} | {after} |".format(
+                label=item["label"],
+                actual=short_number(item["actual"]),
+                before=short_number(item["predicted_before"]),
+                after=short_number(item["predicted_after"]),
+            )
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", required=True, help="Factor model JSON file path or inline JSON")
+    parser.add_argument(
+        "--observations",
+        required=True,
+        help="JSON list (file or inline) of {label, total, values, weight} observations",
+    )
+    parser.add_argument("--mode", choices=["product", "sum"], default=None)
+    parser.add_argument(
+        "--fit",
+        action="append",
+        default=None,
+        help="Factor or group path to fit (repeatable; default: every factor not pinned by an observation)",
+    )
+    parser.add_argument(
+        "--loss",
+        choices=sorted(ALLOWED_LOSSES),
+        default="auto",
+        help="Error on the total: log ratio or relative error (default: log when all totals are positive)",
+    )
+    parser.add_argument(
+        "--prior",
+        type=float,
+        default=DEFAULT_PRIOR,
+        help=f"Ridge weight pulling log-scales toward 1x (default: {DEFAULT_PRIOR})",
+    )
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        default=DEFAULT_MAX_ITERATIONS,
+        help=f"Optimizer iteration cap (default: {DEFAULT_MAX_ITERATIONS})",
+    )
+    parser.add_argument(
+        "--fit-ranges",
+        nargs="?",
+        type=float,
+        const=DEFAULT_COVERAGE,
+        default=None,
+        metavar="COVERAGE",
+        help=(
+            "Also rescale fitted low/high around base so this share of observations "
+            f"falls inside the total's low-high range (default: {DEFAULT_COVERAGE}); "
+            "ranges are only widened unless --allow-narrowing is given"
+        ),
+    )
+    parser.add_argument(
+        "--allow-narrowing",
+        action="store_true",
+        help="Let --fit-ranges narrow ranges below 1x (in-sample, so likely overconfident)",
+    )
+    parser.add_argument("--rates", default=None, help="JSON file of currency rates")
+    parser.add_argument("--format", choices=["json", "markdown"], default="json")
+    parser.add_argument(
+        "--write-payload",
+        default=None,
+        help="Write the calibrated payload to this file",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.prior < 0:
+            raise ValueError("--prior must be non-negative")
+        if args.max_iterations <= 0:
+            raise ValueError("--max-iterations must be positive")
+        if args.fit_ranges is not None and not 0 < args.fit_ranges <= 1:
+            raise ValueError("--fit-ranges coverage must be in (0, 1]")
+        if args.allow_narrowing and args.fit_ranges is None:
+            raise ValueError("--allow-narrowing needs --fit-ranges")
+        result, calibrated = calibrate(
+            load_payload(args.input),
+            load_observations(args.observations),
+            forced_mode=args.mode,
+            rates=args.rates,
+            fit_paths=args.fit,
+            loss=args.loss,
+            prior=args.prior,
+            max_iterations=args.max_iterations,
+            coverage=args.fit_ranges,
+            allow_narrowing=args.allow_narrowing,
+        )
+        for warning in result.get("warnings", []):
+            sys.stderr.write(f"warning: {warning}\n")
+        if args.write_payload:
+            Path(args.write_payload).write_text(json.dumps(calibrated, indent=2) + "\n")
+        if args.format == "json":
+            json.dump(result, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            sys.stdout.write(render_markdown(result) + "\n")
+        return 0
+    except Exception as exc:
+        sys.stderr.write(f"error: {exc}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Attribute the change in a Fermi estimate between two factor-model payloads."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+
+from factor_model import (
+    headline_number,
+    load_payload,
+    parse_node,
+    resolve_conversions,
+    resolve_definitions,
+    short_number,
+)
+
+ALLOWED_METHODS = {"lmdi", "sequential"}
+ALLOWED_VALUES = {"low", "base", "high"}
+DEFAULT_TOP = 20
+
+
+def neutral_value(mode: str) -> float:
+    return 1.0 if mode == "product" else 0.0
+
+
+def log_mean(new_total: float, old_total: float) -> float:
+    if new_total == old_total:
+        return old_total
+    return (new_total - old_total) / (math.log(new_total) - math.log(old_total))
+
+
+def product_multipliers(
+    old_values: list[float], new_values: list[float], method: str
+) -> list[float]:
+    # Multipliers turn each child's own change into its share of the product's
+    # change, so the shares add up exactly to new_total - old_total.
+    if method == "lmdi" and all(value > 0 for value in old_values + new_values):
+        old_total = math.prod(old_values)
+        new_total = math.prod(new_values)
+        weight = log_mean(new_total, old_total)
+        multipliers = []
+        for old, new in zip(old_values, new_values):
+            if new == old:
+                multipliers.append(weight / old)
+            else:
+                multipliers.append(weight * math.log(new / old) / (new - old))
+        return multipliers
+
+    count = len(old_values)
+    prefix = [1.0] * (count + 1)
+    for index, value in enumerate(new_values):
+        prefix[index + 1] = prefix[index] * value
+    suffix = [1.0] * (count + 1)
+    for index in range(count - 1, -1, -1):
+        suffix[index] = suffix[index + 1] * old_values[index]
+    return [prefix[index] * suffix[index + 1] for index in range(count)]
+
+
+def sibling_keys(children: list[dict]) -> list[tuple[str, int]]:
+    # Duplicate sibling names are told apart by their order among namesakes.
+    seen: dict[str, int] = {}
+    keys = []
+    for child in children:
+        occurrence = seen.get(child["name"], 0)
+        seen[child["name"]] = occurrence + 1
+        keys.append((child["name"], occurrence))
+    return keys
+
+
+def align_children(old: dict, new: dict) -> list[tuple[dict | None, dict | None]]:
+    old_children = dict(zip(sibling_keys(old["children"]), old["children"]))
+    pairs = []
+    for key, child in zip(sibling_keys(new["children"]), new["children"]):
+        pairs.append((old_children.pop(key, None), child))
+    pairs.extend((child, None) for child in old_children.values())
+    return pairs
+
+
+def attribute(
+    old: dict | None,
+    new: dict | None,
+    value_key: str,
+    method: str,
+    neutral: float,
+) -> list[dict]:
+    old_value = old[value_key] if old else neutral
+    new_value = new[value_key] if new else neutral
+    node = new or old
+    if (
+        old is None
+        or new is None
+        or old["kind"] != new["kind"]
+        or node["kind"] == "factor"
+        or old["mode"] != new["mode"]
+    ):
+        if old is None:
+            status = "added"
+        elif new is None:
+            status = "removed"
+        elif old["kind"] != new["kind"] or (
+            node["kind"] == "group" and old["mode"] != new["mode"]
+        ):
+            status = "restructured"
+        else:
+            status = "changed" if old_value != new_value else "unchanged"
+        return [
+            {
+                "path": node["path"],
+                "kind": node["kind"],
+                "status": status,
+                "old": old[value_key] if old else None,
+                "new": new[value_key] if new else None,
+                "contribution": new_value - old_value,
+            }
+        ]
+
+    pairs = align_children(old, new)
+    child_neutral = neutral_value(node["mode"])
+    if node["mode"] == "sum":
+        multipliers = [1.0] * len(pairs)
+    else:
+        multipliers = product_multipliers(
+            [pair[0][value_key] if pair[0] else child_neutral for pair in pairs],
+            [pair[1][value_key] if pair[1] else child_neutral for pair in pairs],
+            method,
+        )
+    entries = []
+    for (old_child, new_child), multiplier in zip(pairs, multipliers):
+        for entry in attribute(old_child, new_child, value_key, method, child_neutral):
+            entry["contribution"] *= multiplier
+            entries.append(entry)
+    return entries
+
+
+def diff_models(old: dict, new: dict, value_key: str, method: str) -> dict:
+    entries = attribute(old, new, value_key, method, neutral_value(new["mode"]))
+    delta = new[value_key] - old[value_key]
+    explained = math.fsum(entry["contribution"] for entry in entries)
+    for entry in entries:
+        entry["share"] = entry["contribution"] / delta if delta else None
+    entries.sort(key=lambda entry: abs(entry["contribution"]), reverse=True)
+    return {
+        "value": value_key,
+        "method": method,
+        "old_total": old[value_key],
+        "new_total": new[value_key],
+        "delta": delta,
+        "residual": delta - explained,
+        # A shared definition is one node reused at every ref, so its factors
+        # keep one path; counting distinct paths counts each definition once.
+        "counts": {
+            status: len({entry["path"] for entry in entries if entry["status"] == status})
+            for status in ("changed", "added", "removed", "restructured", "unchanged")
+        },
+        "contributions": entries,
+    }
+
+
+def render_markdown(result: dict, top: int) -> str:
+    lines = ["## Change summary"]
+    lines.append(
+        "- {value}: {old} -> {new} ({sign}{delta})".format(
+            value=result["value"].capitalize(),
+            old=headline_number(result["old_total"]),
+            new=headline_number(result["new_total"]),
+            sign="+" if result["delta"] >= 0 else "",
+            delta=short_number(result["delta"]),
+        )
+    )
+    lines.append(f"- Attribution method: {result['method']}")
+    lines.append(
+        "- Factors: "
+        + ", ".join(f"{count} {status}" for status, count in result["counts"].items())
+    )
+    lines.append("")
+    lines.append("## Drivers of change")
+    lines.append("| Path | Status | Old | New | Contribution | Share |")
+    lines.append("| --- | --- | ---: | ---: | ---: | ---: |")
+    changed = [entry for entry in result["contributions"] if entry["status"] != "unchanged"]
+    for entry in changed[:top]:
+        lines.append(
+            "| {path} | {status} | {old} | {new} | {contribution} | {share} |".format(
+                path=entry["path"],
+                status=entry["status"],
+                old=short_number(entry["old"]) if entry["old"] is not None else "-",
+                new=short_number(entry["new"]) if entry["new"] is not None else "-",
+                contribution=short_number(entry["contribution"]),
+                share=f"{entry['share']:.1%}" if entry["share"] is not None else "-",
+            )
+        )
+    return "\n".join(lines)
+
+
+def parse_payload(raw_input: str, forced_mode: str | None, rates: str | None) -> dict:
+    payload = load_payload(raw_input)
+    if forced_mode is not None:
+        payload = {**payload, "mode": forced_mode}
+    return parse_node(
+        payload,
+        conversions=resolve_conversions(payload, rates),
+        definitions=resolve_definitions(payload),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--old", required=True, help="Previous JSON file path or inline JSON")
+    parser.add_argument("--new", required=True, help="Current JSON file path or inline JSON")
+    parser.add_argument("--mode", choices=["product", "sum"], default=None)
+    parser.add_argument(
+        "--value",
+        choices=sorted(ALLOWED_VALUES),
+        default="base",
+        help="Which total to attribute (default: base)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=sorted(ALLOWED_METHODS),
+        default="lmdi",
+        help=(
+            "Product-group attribution: log-mean Divisia (lmdi, falls back to "
+            "sequential for non-positive values) or sequential (default: lmdi)"
+        ),
+    )
+    parser.add_argument("--format", choices=["json", "markdown"], default="json")
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=DEFAULT_TOP,
+        help=f"Rows shown in markdown output (default: {DEFAULT_TOP})",
+    )
+    parser.add_argument("--rates", default=None, help="JSON file of currency rates")
+    args = parser.parse_args()
+
+    try:
+        old = parse_payload(args.old, args.mode, args.rates)
+        new = parse_payload(args.new, args.mode, args.rates)
+        result = diff_models(old, new, args.value, args.method)
+        if args.format == "json":
+            json.dump(result, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        else:
+            sys.stdout.write(render_markdown(result, args.top) + "\n")
+        return 0
+    except Exception as exc:
+        sys.stderr.write(f"error: {exc}\n")
+        return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,12 +4,20 @@
 from __future__ import annotations
 
 import argparse
+import cmath
+import hashlib
 import json
 import math
+import os
 import random
 import sys
-from copy import deepcopy
+import time
+import tracemalloc
+from array import array
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
+from typing import TextIO
 
 ALLOWED_MODES = {"product", "sum"}
 SCENARIO_NAMES = ("conservative", "base", "aggressive")
@@ -39,8 +47,71 @@ METADATA_KEYS = (
     "correlation_direction",
 )
 SUM_CONSISTENCY_KEYS = ("unit", "period", "currency", "geo", "dimension")
+PERIOD_DAYS = {
+    "hour": 1 / 24,
+    "day": 1.0,
+    "week": 7.0,
+    "month": 365 / 12,
+    "quarter": 365 / 4,
+    "year": 365.0,
+}
 ALLOWED_CORRELATION_DIRECTIONS = {"positive", "negative"}
 DEFAULT_MONTE_CARLO_SAMPLES = 5000
+DEFAULT_BOOTSTRAP_REPLICATES = 200
+DEFAULT_CONVOLUTION_BINS = 512
+ALLOWED_MONTE_CARLO_METHODS = {"sampling", "convolution"}
+MONTE_CARLO_QUANTILES = (("p05", 0.05), ("p50", 0.50), ("p95", 0.95))
+DEFAULT_HISTOGRAM_BINS = 50
+DRAWS_TYPECODES = {"float32": "f", "float64": "d"}
+DRAWS_FORMAT_VERSION = 1
+DRAWS_FLUSH_VALUES = 1 << 16
+ANALYSIS_SECTIONS = {
+    "totals": ("model", "factors"),
+    "sensitivity": ("sensitivity",),
+    "correlations": ("correlations",),
+    "pairs": ("correlation_pairs",),
+    "scenarios": ("scenarios",),
+    "sanity": ("sanity_checks",),
+    "mc": ("monte_carlo",),
+    "timeline": ("timeline",),
+}
+ANALYSIS_ALIASES = {
+    "monte_carlo": "mc",
+    "sanity_checks": "sanity",
+    "correlation_pairs": "pairs",
+}
+# Opt-in analyses: computed for "all" or when named, not by default.
+OPT_IN_ANALYSES = {"pairs"}
+CORRELATION_COMBINATIONS = (
+    ("conservative", "conservative"),
+    ("conservative", "aggressive"),
+    ("aggressive", "conservative"),
+    ("aggressive", "aggressive"),
+)
+LANE_BATCH_SIZE = 1024
+# Blocks that duplicate information available elsewhere in the output.
+OMITTABLE_BLOCKS = ("factors", "calculation")
+COMPACT_SEPARATORS = (",", ":")
+# Factor fields that only feed the report text; editing them in --watch mode
+# reuses the previously computed analysis sections.
+ANNOTATION_KEYS = ("basis_type", "source", "source_url", "source_tier", "as_of", "note")
+WATCH_CACHE_SIZE = 8
+# CLI options that change computed sections, so they are part of the --watch cache key.
+WATCH_KEY_OPTIONS = (
+    "mode",
+    "samples",
+    "seed",
+    "bootstrap",
+    "method",
+    "histogram",
+    "draws_out",
+    "draws_dtype",
+    "draws_groups",
+    "group_quantiles",
+    "periods",
+    "rates",
+    "analyses",
+)
 
 
 def load_payload(raw_input: str) -> dict:
@@ -195,11 +266,134 @@ def merge_correlation_config(
     }
 
 
+def load_rates_file(path: str) -> dict:
+    try:
+        raw = json.loads(Path(path).read_text())
+    except OSError as exc:
+        raise ValueError(f"Cannot read rates file '{path}': {exc}") from exc
+    if isinstance(raw, dict) and isinstance(raw.get("rates"), dict):
+        raw = raw["rates"]
+    if not isinstance(raw, dict):
+        raise ValueError(f"Rates file '{path}' must contain a JSON object of rates")
+    return raw
+
+
+def resolve_conversions(payload: dict, rates_path: str | None = None) -> dict | None:
+    raw_config = payload.get("normalize")
+    if raw_config in (None, ""):
+        raw_config = {}
+    if not isinstance(raw_config, dict):
+        raise ValueError(f"Model has non-object normalize config: {raw_config!r}")
+    if not raw_config and rates_path is None:
+        return None
+
+    target_period = validate_period("normalize", raw_config.get("period", ""))
+    if target_period == "one_time":
+        raise ValueError("normalize.period cannot be 'one_time'")
+    target_currency = raw_config.get("currency", "")
+    if target_currency is None:
+        target_currency = ""
+    if not isinstance(target_currency, str):
+        raise ValueError(f"Model has non-string normalize.currency: {target_currency!r}")
+
+    rates = {}
+    rates_path = rates_path or raw_config.get("rates_file")
+    if rates_path:
+        rates.update(load_rates_file(rates_path))
+    inline_rates = raw_config.get("rates", {})
+    if not isinstance(inline_rates, dict):
+        raise ValueError(f"Model has non-object normalize.rates: {inline_rates!r}")
+    rates.update(inline_rates)
+    for currency, rate in rates.items():
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError(f"Currency rate for '{currency}' must be a positive number")
+
+    # Precompute every multiplier once so evaluation only sees normalized values.
+    period_multipliers = {}
+    if target_period:
+        period_multipliers = {
+            period: PERIOD_DAYS[target_period] / days
+            for period, days in PERIOD_DAYS.items()
+        }
+    currency_multipliers = {}
+    if target_currency:
+        if target_currency not in rates:
+            raise ValueError(
+                f"normalize.currency '{target_currency}' has no rate in normalize.rates"
+            )
+        target_rate = float(rates[target_currency])
+        currency_multipliers = {
+            currency: float(rate) / target_rate for currency, rate in rates.items()
+        }
+        currency_multipliers[target_currency] = 1.0
+    return {
+        "period": target_period,
+        "currency": target_currency,
+        "period_multipliers": period_multipliers,
+        "currency_multipliers": currency_multipliers,
+    }
+
+
+def apply_conversions(item: dict, conversions: dict | None) -> None:
+    if not conversions:
+        return
+    multiplier = 1.0
+    converted = {}
+    period = item.get("period", "")
+    if conversions["period"] and period and period != conversions["period"]:
+        if period not in conversions["period_multipliers"]:
+            raise ValueError(
+                f"Factor '{item['path']}' has period '{period}' that cannot be "
+                f"converted to '{conversions['period']}'"
+            )
+        multiplier *= conversions["period_multipliers"][period]
+        converted["period"] = period
+        item["period"] = conversions["period"]
+    currency = item.get("currency", "")
+    if conversions["currency"] and currency and currency != conversions["currency"]:
+        if currency not in conversions["currency_multipliers"]:
+            raise ValueError(
+                f"Factor '{item['path']}' has currency '{currency}' with no rate "
+                f"to '{conversions['currency']}'"
+            )
+        multiplier *= conversions["currency_multipliers"][currency]
+        converted["currency"] = currency
+        item["currency"] = conversions["currency"]
+    if not converted:
+        return
+    for key in ("low", "base", "high"):
+        item[key] *= multiplier
+    for key in item["scenarios"]:
+        item["scenarios"][key] *= multiplier
+    if "series" in item:
+        item["series"] = [
+            [value * multiplier for value in row] for row in item["series"]
+        ]
+    item["converted_from"] = {**converted, "multiplier": multiplier}
+
+
+def ensure_single_conversion(name: str, mode: str, children: list[dict]) -> None:
+    if mode != "product":
+        return
+    for key in ("period", "currency"):
+        converted = [
+            child["path"]
+            for child in children
+            if key in child.get("converted_from", {})
+        ]
+        if len(converted) > 1:
+            raise ValueError(
+                f"Product group '{name}' converts {key} on more than one factor "
+                f"({', '.join(converted)}); tag only the per-{key} flow factor"
+            )
+
+
 def validate_factor(
     factor: dict,
     index: int,
     prefix: str = "",
     inherited_correlation: dict[str, object] | None = None,
+    conversions: dict | None = None,
 ) -> dict:
     name = factor.get("name") or f"factor_{index}"
     qualified_name = f"{prefix}{name}" if prefix else name
@@ -274,6 +468,13 @@ def validate_factor(
         }
     item.update(merge_correlation_config(qualified_name, factor, inherited_for_factor))
     item["tags"] = validate_string_list(qualified_name, "tags", factor.get("tags", []))
+    growth, series = validate_time_axis(
+        qualified_name, factor, low_value, base_value, high_value
+    )
+    if growth is not None:
+        item["growth"] = growth
+    if series is not None:
+        item["series"] = series
 
     for key in METADATA_KEYS:
         if key == "period":
@@ -296,9 +497,45 @@ def validate_factor(
                 )
             item[key] = value
 
+    apply_conversions(item, conversions)
     return item
 
 
+def validate_time_axis(
+    name: str, factor: dict, low: float, base: float, high: float
+) -> tuple[float | None, list[list[float]] | None]:
+    growth = factor.get("growth")
+    values = factor.get("values")
+    if growth is not None and values is not None:
+        raise ValueError(f"Factor '{name}' cannot set both growth and values")
+    if growth is not None:
+        growth = to_float(growth, name, "growth")
+        if growth <= -1:
+            raise ValueError(f"Factor '{name}' has growth at or below -100%")
+        return growth, None
+    if values is None:
+        return None, None
+    if not isinstance(values, list) or not values:
+        raise ValueError(f"Factor '{name}' has non-list or empty values: {values!r}")
+    series = []
+    for index, value in enumerate(values):
+        key = f"values[{index}]"
+        if isinstance(value, dict):
+            period_base = to_float(value.get("base"), name, f"{key}.base")
+            period_low = to_float(value.get("low", period_base), name, f"{key}.low")
+            period_high = to_float(value.get("high", period_base), name, f"{key}.high")
+        else:
+            period_base = to_float(value, name, key)
+            period_low = period_base * (low / base) if base else low
+            period_high = period_base * (high / base) if base else high
+            if period_low > period_high:
+                period_low, period_high = period_high, period_low
+        if period_low > period_base or period_base > period_high:
+            raise ValueError(f"Factor '{name}' must satisfy low <= base <= high in {key}")
+        series.append([period_low, period_base, period_high])
+    return None, series
+
+
 def ensure_children(name: str, children: list[dict]) -> None:
     if not children:
         raise ValueError(f"Group '{name}' must contain at least one factor or subgroup")
@@ -343,10 +580,60 @@ def infer_group_metadata(node: dict, mode: str, children: list[dict]) -> dict:
     return metadata
 
 
+def resolve_definitions(payload: dict) -> dict | None:
+    raw_definitions = payload.get("definitions")
+    if raw_definitions in (None, ""):
+        return None
+    if not isinstance(raw_definitions, dict):
+        raise ValueError(f"Model has non-object definitions: {raw_definitions!r}")
+    return {"raw": raw_definitions, "parsed": {}, "resolving": []}
+
+
+def resolve_reference(
+    entry: dict,
+    owner_name: str,
+    conversions: dict | None,
+    definitions: dict | None,
+) -> dict:
+    name = entry["ref"]
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Group '{owner_name}' has invalid ref: {name!r}")
+    extra_keys = sorted(set(entry) - {"ref"})
+    if extra_keys:
+        raise ValueError(
+            f"Group '{owner_name}' ref '{name}' cannot also set: {', '.join(extra_keys)}"
+        )
+    if definitions is None or name not in definitions["raw"]:
+        raise ValueError(f"Group '{owner_name}' references unknown definition '{name}'")
+    if name in definitions["parsed"]:
+        return definitions["parsed"][name]
+    if name in definitions["resolving"]:
+        cycle = " -> ".join(definitions["resolving"] + [name])
+        raise ValueError(f"Definitions reference each other in a cycle: {cycle}")
+
+    raw_node = definitions["raw"][name]
+    if not isinstance(raw_node, dict):
+        raise ValueError(f"Definition '{name}' must be an object, got: {raw_node!r}")
+    definitions["resolving"].append(name)
+    # Shared definitions are parsed once, without inherited correlation, and the
+    # same node object is reused everywhere it is referenced.
+    parsed = parse_node(
+        {**raw_node, "name": name},
+        conversions=conversions,
+        definitions=definitions,
+    )
+    definitions["resolving"].pop()
+    parsed["ref"] = name
+    definitions["parsed"][name] = parsed
+    return parsed
+
+
 def parse_node(
     node: dict,
     prefix: str = "",
     inherited_correlation: dict[str, object] | None = None,
+    conversions: dict | None = None,
+    definitions: dict | None = None,
 ) -> dict:
     if not isinstance(node, dict):
         raise ValueError(f"Each model node must be an object, got: {node!r}")
@@ -376,9 +663,15 @@ def parse_node(
                 index,
                 prefix=f"{qualified_name} > ",
                 inherited_correlation=merged_correlation,
+                conversions=conversions,
             )
         )
     for index, group in enumerate(groups, start=1):
+        if isinstance(group, dict) and "ref" in group:
+            children.append(
+                resolve_reference(group, qualified_name, conversions, definitions)
+            )
+            continue
         child_name = group.get("name") or f"group_{index}"
         group_prefix = f"{qualified_name} > "
         child_group = {**group, "name": child_name}
@@ -386,10 +679,13 @@ def parse_node(
             child_group,
             prefix=group_prefix,
             inherited_correlation=merged_correlation,
+            conversions=conversions,
+            definitions=definitions,
         )
         children.append(parsed_group)
 
     ensure_children(qualified_name, children)
+    ensure_single_conversion(qualified_name, mode, children)
 
     totals = compute_total(children, mode)
     metadata = infer_group_metadata(node, mode, children)
@@ -435,11 +731,145 @@ def flatten_factors(node: dict) -> list[dict]:
     if node["kind"] == "factor":
         return [node]
     factors = []
-    for child in node["children"]:
-        factors.extend(flatten_factors(child))
+    seen = set()
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if current["kind"] == "factor":
+            factors.append(current)
+        else:
+            stack.extend(reversed(current["children"]))
     return factors
 
 
+_COMPILED_CACHE: dict[int, tuple[dict, dict]] = {}
+
+
+def compiled_model(model: dict) -> dict:
+    # Parsed models are never mutated, so the analyses of one model (and repeat
+    # renders in --watch mode) share a single compiled form.
+    cached = _COMPILED_CACHE.get(id(model))
+    if cached is None or cached[0] is not model:
+        _COMPILED_CACHE.clear()
+        cached = (model, compile_model(model))
+        _COMPILED_CACHE[id(model)] = cached
+    return cached[1]
+
+
+def compile_model(model: dict) -> dict:
+    # Flatten the (possibly shared) node graph into slots: factors first, then
+    # groups in post-order, so each shared node is evaluated once per lane.
+    factors = flatten_factors(model)
+    slot_of = {id(factor): index for index, factor in enumerate(factors)}
+    ops = []
+    group_nodes = []
+    parents = {}
+    stack = [(model, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in slot_of:
+            continue
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node["children"]))
+            continue
+        slot = len(factors) + len(ops)
+        slot_of[id(node)] = slot
+        children = [slot_of[id(child)] for child in node["children"]]
+        for child in children:
+            parents.setdefault(child, []).append(len(ops))
+        ops.append((slot, node["mode"], children))
+        group_nodes.append(node)
+    return {
+        "factors": factors,
+        "ops": ops,
+        "group_nodes": group_nodes,
+        "parents": parents,
+        "slot_count": len(factors) + len(ops),
+        "root": slot_of[id(model)],
+    }
+
+
+def iter_unique_nodes(model: dict) -> list[dict]:
+    nodes = []
+    seen = set()
+    stack = [model]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        nodes.append(node)
+        if node["kind"] == "group":
+            stack.extend(reversed(node["children"]))
+    return nodes
+
+
+def evaluate_compiled(compiled: dict, factor_values: list[float]) -> list[float]:
+    values = list(factor_values)
+    values.extend([0.0] * len(compiled["ops"]))
+    for slot, mode, children in compiled["ops"]:
+        if mode == "product":
+            total = 1.0
+            for child in children:
+                total *= values[child]
+        else:
+            total = 0
+            for child in children:
+                total += values[child]
+        values[slot] = total
+    return values
+
+
+def evaluate_lanes(compiled: dict, lanes: list[list[float]]) -> list[float]:
+    # Each lane is one full factor vector; every op runs once across all lanes.
+    if not lanes:
+        return []
+    values = [list(column) for column in zip(*lanes)]
+    values.extend([None] * len(compiled["ops"]))
+    for slot, mode, children in compiled["ops"]:
+        total = list(values[children[0]])
+        for child in children[1:]:
+            column = values[child]
+            if mode == "product":
+                total = [left * right for left, right in zip(total, column)]
+            else:
+                total = [left + right for left, right in zip(total, column)]
+        values[slot] = total
+    return values[compiled["root"]]
+
+
+def evaluate_overrides(
+    compiled: dict, base_values: list[float], overrides: dict[int, float]
+) -> float:
+    # Recompute only the ancestors of the overridden factor slots and reuse the
+    # memoized base value of every other node.
+    values = dict(overrides)
+    affected = set()
+    pending = list(overrides)
+    while pending:
+        for op_index in compiled["parents"].get(pending.pop(), []):
+            if op_index not in affected:
+                affected.add(op_index)
+                pending.append(compiled["ops"][op_index][0])
+    ops = compiled["ops"]
+    for op_index in sorted(affected):
+        slot, mode, children = ops[op_index]
+        if mode == "product":
+            total = 1.0
+            for child in children:
+                total *= values.get(child, base_values[child])
+        else:
+            total = 0
+            for child in children:
+                total += values.get(child, base_values[child])
+        values[slot] = total
+    return values.get(compiled["root"], base_values[compiled["root"]])
+
+
 def sample_factor_value(factor: dict, rng: random.Random) -> float:
     return rng.triangular(factor["low"], factor["high"], factor["base"])
 
@@ -457,44 +887,31 @@ def triangular_quantile(low: float, high: float, mode: float, q: float) -> float
     return high - math.sqrt((1 - q) * (high - low) * (high - mode))
 
 
-def monte_carlo_factor_value(
+def monte_carlo_factor_quantile(
     factor: dict, rng: random.Random, group_quantiles: dict[str, float]
 ) -> float:
     group = factor.get("correlation_group", "")
     independent_q = rng.random()
-    if not group:
-        return triangular_quantile(
-            factor["low"], factor["high"], factor["base"], independent_q
-        )
+    if not group or group not in group_quantiles:
+        return independent_q
 
     group_q = group_quantiles[group]
     direction = factor.get("correlation_direction", "") or "positive"
     if direction == "negative":
         group_q = 1.0 - group_q
     strength = factor.get("correlation_strength", 1.0)
-    effective_q = ((1.0 - strength) * independent_q) + (strength * group_q)
-    return triangular_quantile(
-        factor["low"], factor["high"], factor["base"], effective_q
-    )
+    return ((1.0 - strength) * independent_q) + (strength * group_q)
 
 
-def sample_node_value(node: dict, rng: random.Random) -> float:
-    if node["kind"] == "factor":
-        return sample_factor_value(node, rng)
-    child_values = [sample_node_value(child, rng) for child in node["children"]]
-    return compute_node_value(child_values, node["mode"])
-
-
-def sample_node_value_correlated(
-    node: dict, rng: random.Random, group_quantiles: dict[str, float]
+def monte_carlo_factor_value(
+    factor: dict, rng: random.Random, group_quantiles: dict[str, float]
 ) -> float:
-    if node["kind"] == "factor":
-        return monte_carlo_factor_value(node, rng, group_quantiles)
-    child_values = [
-        sample_node_value_correlated(child, rng, group_quantiles)
-        for child in node["children"]
-    ]
-    return compute_node_value(child_values, node["mode"])
+    return triangular_quantile(
+        factor["low"],
+        factor["high"],
+        factor["base"],
+        monte_carlo_factor_quantile(factor, rng, group_quantiles),
+    )
 
 
 def percentile(sorted_values: list[float], value: float) -> float:
@@ -514,7 +931,14 @@ def percentile(sorted_values: list[float], value: float) -> float:
 
 
 def resolve_monte_carlo_config(
-    payload: dict, samples_override: int | None, seed_override: int | None
+    payload: dict,
+    samples_override: int | None,
+    seed_override: int | None,
+    bootstrap_override: int | None = None,
+    method_override: str | None = None,
+    histogram_override: int | None = None,
+    draws_out: dict | None = None,
+    group_quantiles_override: bool | None = None,
 ) -> dict | None:
     raw_config = payload.get("monte_carlo", {})
     if raw_config in (None, ""):
@@ -524,10 +948,14 @@ def resolve_monte_carlo_config(
 
     enabled = raw_config.get("enabled")
     if enabled is None:
-        enabled = samples_override is not None
+        enabled = samples_override is not None or method_override is not None
     if not isinstance(enabled, bool):
         raise ValueError(f"Model has non-boolean monte_carlo.enabled: {enabled!r}")
     if not enabled:
+        if draws_out is not None:
+            raise ValueError(
+                "Exporting draws needs Monte Carlo; pass --samples or enable monte_carlo"
+            )
         return None
 
     samples = samples_override
@@ -547,30 +975,611 @@ def resolve_monte_carlo_config(
             f"{correlated_groups!r}"
         )
 
+    bootstrap = bootstrap_override
+    if bootstrap is None:
+        bootstrap = raw_config.get("bootstrap", 0)
+    if bootstrap is True:
+        bootstrap = DEFAULT_BOOTSTRAP_REPLICATES
+    if bootstrap in (None, False):
+        bootstrap = 0
+    if not isinstance(bootstrap, int) or bootstrap < 0:
+        raise ValueError(
+            f"Model has invalid monte_carlo bootstrap replicate count: {bootstrap!r}"
+        )
+    if bootstrap == 1:
+        raise ValueError("Model needs at least 2 monte_carlo bootstrap replicates")
+
+    method = method_override or raw_config.get("method", "sampling")
+    if method not in ALLOWED_MONTE_CARLO_METHODS:
+        allowed = ", ".join(sorted(ALLOWED_MONTE_CARLO_METHODS))
+        raise ValueError(
+            f"Model has unsupported monte_carlo.method {method!r}. Expected one of: {allowed}"
+        )
+    bins = raw_config.get("bins", DEFAULT_CONVOLUTION_BINS)
+    if not isinstance(bins, int) or bins < 16:
+        raise ValueError(f"Model has invalid monte_carlo bin count: {bins!r}")
+
+    histogram = histogram_override
+    if histogram is None:
+        histogram = raw_config.get("histogram", 0)
+    if histogram is True:
+        histogram = DEFAULT_HISTOGRAM_BINS
+    if histogram in (None, False):
+        histogram = 0
+    if not isinstance(histogram, int) or histogram < 0:
+        raise ValueError(f"Model has invalid monte_carlo histogram bin count: {histogram!r}")
+
+    group_quantiles = group_quantiles_override
+    if group_quantiles is None:
+        group_quantiles = raw_config.get("group_quantiles", False)
+    if not isinstance(group_quantiles, bool):
+        raise ValueError(
+            f"Model has non-boolean monte_carlo.group_quantiles: {group_quantiles!r}"
+        )
+    if group_quantiles and method == "convolution":
+        raise ValueError("monte_carlo.group_quantiles needs monte_carlo.method 'sampling'")
+
+    if draws_out is not None:
+        if draws_out.get("dtype", "float64") not in DRAWS_TYPECODES:
+            allowed = ", ".join(sorted(DRAWS_TYPECODES))
+            raise ValueError(f"Unsupported draws dtype. Expected one of: {allowed}")
+        if method == "convolution":
+            raise ValueError("Exporting draws needs monte_carlo.method 'sampling'")
+
     return {
         "enabled": True,
         "samples": samples,
         "seed": seed,
         "correlated_groups": correlated_groups,
+        "bootstrap": bootstrap,
+        "method": method,
+        "bins": bins,
+        "histogram": histogram,
+        "draws_out": draws_out,
+        "group_quantiles": group_quantiles,
     }
 
 
+class P2Quantile:
+    """Streaming quantile estimate (Jain-Chlamtac P-squared) in constant memory."""
+
+    def __init__(self, q: float) -> None:
+        self.q = q
+        self.heights: list[float] = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5.0]
+        self.increments = [0.0, q / 2, q, (1 + q) / 2, 1.0]
+
+    def add(self, value: float) -> None:
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            if len(heights) == 5:
+                heights.sort()
+            return
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        positions = self.positions
+        for index in range(cell + 1, 5):
+            positions[index] += 1
+        for index in range(5):
+            self.desired[index] += self.increments[index]
+        for index in (1, 2, 3):
+            offset = self.desired[index] - positions[index]
+            if (offset >= 1 and positions[index + 1] - positions[index] > 1) or (
+                offset <= -1 and positions[index - 1] - positions[index] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                candidate = self.parabolic(index, step)
+                if not heights[index - 1] < candidate < heights[index + 1]:
+                    candidate = heights[index] + step * (
+                        heights[index + step] - heights[index]
+                    ) / (positions[index + step] - positions[index])
+                heights[index] = candidate
+                positions[index] += step
+
+    def parabolic(self, index: int, step: int) -> float:
+        heights = self.heights
+        positions = self.positions
+        below = positions[index] - positions[index - 1]
+        above = positions[index + 1] - positions[index]
+        return heights[index] + step / (positions[index + 1] - positions[index - 1]) * (
+            (below + step) * (heights[index + 1] - heights[index]) / above
+            + (above - step) * (heights[index] - heights[index - 1]) / below
+        )
+
+    def value(self) -> float:
+        if len(self.heights) < 5:
+            return percentile(sorted(self.heights), self.q)
+        return self.heights[2]
+
+
+class GroupSketch:
+    """Running mean, bounds, and P-squared quantiles for one group's draws."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self.total = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+        self.quantiles = [(key, P2Quantile(q)) for key, q in MONTE_CARLO_QUANTILES]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.low:
+            self.low = value
+        if value > self.high:
+            self.high = value
+        for _, sketch in self.quantiles:
+            sketch.add(value)
+
+    def summary(self) -> dict:
+        return {
+            "path": self.path,
+            "mean": self.total / self.count,
+            **{key: sketch.value() for key, sketch in self.quantiles},
+            "min": self.low,
+            "max": self.high,
+        }
+
+
+class DrawsWriter:
+    """Stream Monte Carlo draws to a flat little-endian binary file."""
+
+    def __init__(self, path: str, dtype: str, columns: list[str]) -> None:
+        self.path = Path(path)
+        self.dtype = dtype
+        self.columns = columns
+        self.rows = 0
+        self.buffer = array(DRAWS_TYPECODES[dtype])
+        self.handle = self.path.open("wb")
+
+    def add(self, row: list[float]) -> None:
+        self.buffer.extend(row)
+        self.rows += 1
+        if len(self.buffer) >= DRAWS_FLUSH_VALUES:
+            self.flush()
+
+    def flush(self) -> None:
+        if sys.byteorder == "big":
+            self.buffer.byteswap()
+        self.buffer.tofile(self.handle)
+        del self.buffer[:]
+
+    def abort(self) -> None:
+        # Drop the partial file so it is never mistaken for a complete export.
+        self.handle.close()
+        self.path.unlink(missing_ok=True)
+
+    def close(self, seed: int | None) -> dict:
+        self.flush()
+        self.handle.close()
+        # The sidecar carries everything needed to memory-map the file, e.g.
+        # numpy.memmap(path, dtype="<f8", mode="r", shape=tuple(shape)).
+        sidecar = self.path.with_name(self.path.name + ".json")
+        metadata = {
+            "version": DRAWS_FORMAT_VERSION,
+            "path": self.path.name,
+            "dtype": self.dtype,
+            "byteorder": "little",
+            "layout": "row-major",
+            "shape": [self.rows, len(self.columns)],
+            "columns": self.columns,
+            "seed": seed,
+        }
+        sidecar.write_text(json.dumps(metadata, indent=2) + "\n")
+        return {
+            "path": str(self.path),
+            "sidecar": str(sidecar),
+            "dtype": self.dtype,
+            "shape": metadata["shape"],
+        }
+
+
+def draws_histogram(sorted_draws: list[float], bins: int) -> dict:
+    low, high = sorted_draws[0], sorted_draws[-1]
+    if high == low:
+        return {"edges": [low, high], "counts": [len(sorted_draws)]}
+    width = (high - low) / bins
+    edges = [low + width * index for index in range(bins)] + [high]
+    counts = [0] * bins
+    index = 0
+    # Draws are already sorted, so one forward sweep assigns every bin.
+    for value in sorted_draws:
+        while index < bins - 1 and value >= edges[index + 1]:
+            index += 1
+        counts[index] += 1
+    return {"edges": edges, "counts": counts}
+
+
+def distribution_histogram(dist: dict, low: float, high: float, bins: int) -> dict:
+    if high == low:
+        return {"edges": [low, high], "probabilities": [1.0]}
+    width = (high - low) / bins
+    edges = [low + width * index for index in range(bins)] + [high]
+    cdf = [distribution_cdf(dist, edge) for edge in edges]
+    cdf[0] = 0.0
+    return {
+        "edges": edges,
+        "probabilities": [cdf[index + 1] - cdf[index] for index in range(bins)],
+    }
+
+
+def bootstrap_standard_errors(
+    sorted_draws: list[float], replicates: int, rng: random.Random
+) -> dict[str, float]:
+    # Resampled indices into the shared sorted draws are generated already in
+    # ascending order from normalized exponential spacings, so each replicate is
+    # one O(n) pass with no sort and no model re-evaluation.
+    count = len(sorted_draws)
+    positions = {}
+    for key, q in MONTE_CARLO_QUANTILES:
+        position = (count - 1) * q
+        positions[key] = (position, math.floor(position), math.ceil(position))
+    wanted = {}
+    for key, (_, lower, upper) in positions.items():
+        wanted.setdefault(lower, []).append((key, "lower"))
+        wanted.setdefault(upper, []).append((key, "upper"))
+
+    estimates = {"mean": []}
+    estimates.update({key: [] for key, _ in MONTE_CARLO_QUANTILES})
+    expovariate = rng.expovariate
+    for _ in range(replicates):
+        spacings = [expovariate(1.0) for _ in range(count + 1)]
+        scale = count / sum(spacings)
+        cumulative = 0.0
+        total = 0.0
+        picked = {}
+        for rank in range(count):
+            cumulative += spacings[rank]
+            index = min(count - 1, int(cumulative * scale))
+            value = sorted_draws[index]
+            total += value
+            if rank in wanted:
+                for key, side in wanted[rank]:
+                    picked[(key, side)] = value
+        estimates["mean"].append(total / count)
+        for key, (position, lower, _) in positions.items():
+            low_value = picked[(key, "lower")]
+            high_value = picked[(key, "upper")]
+            estimates[key].append(low_value + (high_value - low_value) * (position - lower))
+
+    errors = {}
+    for key, values in estimates.items():
+        center = sum(values) / replicates
+        variance = sum((value - center) ** 2 for value in values) / (replicates - 1)
+        errors[key] = math.sqrt(variance)
+    return errors
+
+
+def triangular_cdf(low: float, high: float, mode: float, x: float) -> float:
+    if x <= low:
+        return 0.0
+    if x >= high:
+        return 1.0
+    if x <= mode:
+        return (x - low) ** 2 / ((high - low) * (mode - low))
+    return 1.0 - (high - x) ** 2 / ((high - low) * (high - mode))
+
+
+def point_distribution(value: float) -> dict:
+    return {"low": value, "high": value, "pmf": [1.0]}
+
+
+def distribution_cdf(dist: dict, x: float) -> float:
+    # Mass inside each bin is spread uniformly, so the CDF is piecewise linear.
+    if x < dist["low"]:
+        return 0.0
+    if x >= dist["high"]:
+        return 1.0
+    pmf = dist["pmf"]
+    position = (x - dist["low"]) / (dist["high"] - dist["low"]) * len(pmf)
+    # Just below `high` the position can round up to len(pmf).
+    index = min(int(position), len(pmf) - 1)
+    return dist["cumulative"][index] + pmf[index] * (position - index)
+
+
+def with_cumulative(dist: dict) -> dict:
+    cumulative = [0.0]
+    for mass in dist["pmf"]:
+        cumulative.append(cumulative[-1] + mass)
+    dist["cumulative"] = cumulative
+    return dist
+
+
+def grid_distribution(low: float, high: float, bins: int, cdf) -> dict:
+    width = (high - low) / bins
+    edges = [cdf(low + width * index) for index in range(bins)] + [1.0]
+    edges[0] = 0.0
+    pmf = [max(0.0, edges[index + 1] - edges[index]) for index in range(bins)]
+    total = sum(pmf)
+    return with_cumulative(
+        {"low": low, "high": high, "pmf": [mass / total for mass in pmf]}
+    )
+
+
+def factor_distribution(factor: dict, bins: int) -> dict:
+    low, base, high = factor["low"], factor["base"], factor["high"]
+    if high == low:
+        return point_distribution(base)
+    return grid_distribution(
+        low, high, bins, lambda x: triangular_cdf(low, high, base, x)
+    )
+
+
+def is_point(dist: dict) -> bool:
+    return dist["high"] == dist["low"]
+
+
+def fft(values: list[complex], invert: bool = False) -> list[complex]:
+    size = len(values)
+    values = list(values)
+    swap = 0
+    for index in range(1, size):
+        bit = size >> 1
+        while swap & bit:
+            swap ^= bit
+            bit >>= 1
+        swap |= bit
+        if index < swap:
+            values[index], values[swap] = values[swap], values[index]
+    length = 2
+    sign = 1 if invert else -1
+    while length <= size:
+        step = cmath.exp(sign * 2j * math.pi / length)
+        half = length // 2
+        twiddles = [1 + 0j]
+        for _ in range(half - 1):
+            twiddles.append(twiddles[-1] * step)
+        for start in range(0, size, length):
+            for offset in range(half):
+                even = values[start + offset]
+                odd = values[start + offset + half] * twiddles[offset]
+                values[start + offset] = even + odd
+                values[start + offset + half] = even - odd
+        length <<= 1
+    if invert:
+        return [value / size for value in values]
+    return values
+
+
+def fft_convolve(left: list[float], right: list[float]) -> list[float]:
+    result_size = len(left) + len(right) - 1
+    if min(len(left), len(right)) <= 32:
+        result = [0.0] * result_size
+        for i, left_mass in enumerate(left):
+            if left_mass:
+                for j, right_mass in enumerate(right):
+                    result[i + j] += left_mass * right_mass
+        return result
+    size = 1
+    while size < result_size:
+        size <<= 1
+    left_spectrum = fft(left + [0.0] * (size - len(left)))
+    right_spectrum = fft(right + [0.0] * (size - len(right)))
+    product = [a * b for a, b in zip(left_spectrum, right_spectrum)]
+    return [max(0.0, value.real) for value in fft(product, invert=True)[:result_size]]
+
+
+def add_distributions(left: dict, right: dict, bins: int) -> dict:
+    if is_point(left) or is_point(right):
+        point, other = (left, right) if is_point(left) else (right, left)
+        shift = point["low"]
+        return with_cumulative(
+            {
+                "low": other["low"] + shift,
+                "high": other["high"] + shift,
+                "pmf": list(other["pmf"]),
+            }
+        )
+    width = ((left["high"] - left["low"]) + (right["high"] - right["low"])) / bins
+    left_bins = max(1, math.ceil((left["high"] - left["low"]) / width))
+    right_bins = max(1, math.ceil((right["high"] - right["low"]) / width))
+    left_grid = grid_distribution(
+        left["low"],
+        left["low"] + left_bins * width,
+        left_bins,
+        lambda x: distribution_cdf(left, x),
+    )
+    right_grid = grid_distribution(
+        right["low"],
+        right["low"] + right_bins * width,
+        right_bins,
+        lambda x: distribution_cdf(right, x),
+    )
+    pmf = fft_convolve(left_grid["pmf"], right_grid["pmf"])
+    total = sum(pmf)
+    # Bin i + bin j is centered one bin width above their combined left edges.
+    low = left["low"] + right["low"] + width / 2
+    combined = with_cumulative(
+        {
+            "low": low,
+            "high": low + len(pmf) * width,
+            "pmf": [mass / total for mass in pmf],
+        }
+    )
+    return grid_distribution(
+        combined["low"],
+        combined["high"],
+        bins,
+        lambda x: distribution_cdf(combined, x),
+    )
+
+
+def log_distribution(dist: dict, bins: int, path: str) -> dict:
+    if dist["low"] <= 0:
+        raise ValueError(
+            f"Convolution needs strictly positive values in product group '{path}'"
+        )
+    if is_point(dist):
+        return point_distribution(math.log(dist["low"]))
+    return grid_distribution(
+        math.log(dist["low"]),
+        math.log(dist["high"]),
+        bins,
+        lambda x: distribution_cdf(dist, math.exp(x)),
+    )
+
+
+def exp_distribution(dist: dict, bins: int) -> dict:
+    if is_point(dist):
+        return point_distribution(math.exp(dist["low"]))
+    return grid_distribution(
+        math.exp(dist["low"]),
+        math.exp(dist["high"]),
+        bins,
+        lambda x: distribution_cdf(dist, math.log(x)),
+    )
+
+
+def node_distribution(node: dict, bins: int, seen: set[int] | None = None) -> dict:
+    seen = set() if seen is None else seen
+    if id(node) in seen:
+        raise ValueError(
+            f"Convolution needs a tree, but '{node['path']}' is shared by several "
+            "branches whose values are therefore dependent"
+        )
+    seen.add(id(node))
+    if node["kind"] == "factor":
+        return factor_distribution(node, bins)
+    children = [node_distribution(child, bins, seen) for child in node["children"]]
+    if node["mode"] == "product":
+        children = [log_distribution(child, bins, node["path"]) for child in children]
+    total = children[0]
+    for child in children[1:]:
+        total = add_distributions(total, child, bins)
+    if node["mode"] == "product":
+        return exp_distribution(total, bins)
+    return total
+
+
+def node_mean(node: dict) -> float:
+    if node["kind"] == "factor":
+        return (node["low"] + node["base"] + node["high"]) / 3
+    return compute_node_value(
+        [node_mean(child) for child in node["children"]], node["mode"]
+    )
+
+
+def distribution_quantile(dist: dict, q: float) -> float:
+    if is_point(dist):
+        return dist["low"]
+    cumulative = dist["cumulative"]
+    pmf = dist["pmf"]
+    width = (dist["high"] - dist["low"]) / len(pmf)
+    for index, mass in enumerate(pmf):
+        if cumulative[index + 1] >= q and mass > 0:
+            fraction = (q - cumulative[index]) / mass
+            return dist["low"] + width * (index + min(1.0, max(0.0, fraction)))
+    return dist["high"]
+
+
+def check_convolution(model: dict, config: dict) -> None:
+    if config.get("correlated_groups", True) and factor_paths_by_correlation_group(
+        model
+    ):
+        raise ValueError(
+            "monte_carlo.method 'convolution' needs independent factors; "
+            "set monte_carlo.correlated_groups to false or use 'sampling'"
+        )
+
+
+def convolution_summary(model: dict, config: dict) -> dict:
+    check_convolution(model, config)
+    dist = node_distribution(model, config["bins"])
+    # Independent sums and products have exact means, so only quantiles
+    # carry discretization error.
+    summary = {
+        "method": "convolution",
+        "bins": config["bins"],
+        "samples": None,
+        "seed": None,
+        "correlated_groups": False,
+        "group_count": 0,
+        "mean": node_mean(model),
+        "p05": distribution_quantile(dist, 0.05),
+        "p50": distribution_quantile(dist, 0.50),
+        "p95": distribution_quantile(dist, 0.95),
+        "min": model["low"],
+        "max": model["high"],
+    }
+    if config.get("histogram"):
+        summary["histogram"] = distribution_histogram(
+            dist, model["low"], model["high"], config["histogram"]
+        )
+    return summary
+
+
 def monte_carlo_summary(model: dict, config: dict | None) -> dict | None:
     if not config:
         return None
+    if config.get("method") == "convolution":
+        return convolution_summary(model, config)
     rng = random.Random(config.get("seed"))
     groups = sorted(factor_paths_by_correlation_group(model))
     use_correlated_groups = bool(groups) and config.get("correlated_groups", True)
+    compiled = compiled_model(model)
+    factors = compiled["factors"]
+    root = compiled["root"]
+    export = config.get("draws_out")
+    writer = None
+    group_slots = []
+    if export:
+        if export.get("groups"):
+            group_slots = [
+                (slot, node["path"])
+                for (slot, _, _), node in zip(compiled["ops"], compiled["group_nodes"])
+                if slot != root
+            ]
+        writer = DrawsWriter(
+            export["path"],
+            export.get("dtype", "float64"),
+            ["total"] + [path for _, path in group_slots],
+        )
+    sketches = []
+    if config.get("group_quantiles"):
+        # Shared definitions are one compiled slot, so each is sketched once.
+        sketches = [
+            (slot, GroupSketch(node["path"]))
+            for (slot, _, _), node in zip(compiled["ops"], compiled["group_nodes"])
+            if slot != root
+        ]
     draws = []
-    for _ in range(config["samples"]):
-        if use_correlated_groups:
-            group_quantiles = {group: rng.random() for group in groups}
-            draws.append(sample_node_value_correlated(model, rng, group_quantiles))
-        else:
-            draws.append(sample_node_value(model, rng))
+    try:
+        for _ in range(config["samples"]):
+            if use_correlated_groups:
+                group_quantiles = {group: rng.random() for group in groups}
+                values = [
+                    monte_carlo_factor_value(factor, rng, group_quantiles)
+                    for factor in factors
+                ]
+            else:
+                values = [sample_factor_value(factor, rng) for factor in factors]
+            slot_values = evaluate_compiled(compiled, values)
+            draws.append(slot_values[root])
+            if writer is not None:
+                writer.add([slot_values[root]] + [slot_values[slot] for slot, _ in group_slots])
+            for slot, sketch in sketches:
+                sketch.add(slot_values[slot])
+        if writer is not None:
+            draws_metadata = writer.close(config.get("seed"))
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
     draws.sort()
     mean = sum(draws) / len(draws)
-    return {
+    summary = {
         "samples": config["samples"],
         "seed": config.get("seed"),
         "correlated_groups": use_correlated_groups,
@@ -582,6 +1591,19 @@ def monte_carlo_summary(model: dict, config: dict | None) -> dict | None:
         "min": draws[0],
         "max": draws[-1],
     }
+    replicates = config.get("bootstrap", 0)
+    if replicates:
+        summary["bootstrap_replicates"] = replicates
+        summary["standard_errors"] = bootstrap_standard_errors(
+            draws, replicates, random.Random(rng.random())
+        )
+    if config.get("histogram"):
+        summary["histogram"] = draws_histogram(draws, config["histogram"])
+    if sketches:
+        summary["groups"] = [sketch.summary() for _, sketch in sketches]
+    if writer is not None:
+        summary["draws"] = draws_metadata
+    return summary
 
 
 def factor_scenario_value(factor: dict, scenario_name: str) -> float:
@@ -596,59 +1618,16 @@ def interpolated_value(base: float, target: float, strength: float) -> float:
     return base + ((target - base) * strength)
 
 
-def set_factor_value(node: dict, target_path: str, scenario_key: str) -> None:
-    if node["kind"] == "factor":
-        if node["path"] == target_path:
-            value = node[scenario_key]
-            node["low"] = value
-            node["base"] = value
-            node["high"] = value
-        else:
-            value = node["base"]
-            node["low"] = value
-            node["base"] = value
-            node["high"] = value
-        return
-
-    for child in node["children"]:
-        set_factor_value(child, target_path, scenario_key)
-
-    totals = compute_total(node["children"], node["mode"])
-    node["low"] = totals["low"]
-    node["base"] = totals["base"]
-    node["high"] = totals["high"]
-
-
-def set_model_to_scenario(node: dict, scenario_name: str) -> None:
-    if node["kind"] == "factor":
-        value = factor_scenario_value(node, scenario_name)
-        node["low"] = value
-        node["base"] = value
-        node["high"] = value
-        return
-
-    for child in node["children"]:
-        set_model_to_scenario(child, scenario_name)
-
-    totals = compute_total(node["children"], node["mode"])
-    node["low"] = totals["low"]
-    node["base"] = totals["base"]
-    node["high"] = totals["high"]
-
-
 def sensitivity_entries(model: dict) -> list[dict]:
     base_total = model["base"]
-    factors = flatten_factors(model)
+    compiled = compiled_model(model)
+    factors = compiled["factors"]
+    base_values = evaluate_compiled(compiled, [factor["base"] for factor in factors])
     entries = []
 
-    for factor in factors:
-        low_model = deepcopy(model)
-        high_model = deepcopy(model)
-        set_factor_value(low_model, factor["path"], "low")
-        set_factor_value(high_model, factor["path"], "high")
-
-        low_total = low_model["base"]
-        high_total = high_model["base"]
+    for index, factor in enumerate(factors):
+        low_total = evaluate_overrides(compiled, base_values, {index: factor["low"]})
+        high_total = evaluate_overrides(compiled, base_values, {index: factor["high"]})
         swing = max(abs(base_total - low_total), abs(high_total - base_total))
 
         entries.append(
@@ -691,41 +1670,27 @@ def correlation_target_value(factor: dict, scenario_name: str) -> float:
     )
 
 
-def set_paths_to_scenario(
-    node: dict, target_factors: dict[str, dict], scenario_name: str
-) -> None:
-    if node["kind"] == "factor":
-        if node["path"] in target_factors:
-            value = correlation_target_value(
-                target_factors[node["path"]], scenario_name
-            )
-        else:
-            value = node["base"]
-        node["low"] = value
-        node["base"] = value
-        node["high"] = value
-        return
-
-    for child in node["children"]:
-        set_paths_to_scenario(child, target_factors, scenario_name)
-
-    totals = compute_total(node["children"], node["mode"])
-    node["low"] = totals["low"]
-    node["base"] = totals["base"]
-    node["high"] = totals["high"]
-
-
 def correlation_entries(model: dict) -> list[dict]:
     base_total = model["base"]
+    compiled = compiled_model(model)
+    index_of = {id(factor): index for index, factor in enumerate(compiled["factors"])}
+    base_values = evaluate_compiled(
+        compiled, [factor["base"] for factor in compiled["factors"]]
+    )
     entries = []
     for group, factors in factor_paths_by_correlation_group(model).items():
-        conservative_model = deepcopy(model)
-        aggressive_model = deepcopy(model)
         target_factors = {factor["path"]: factor for factor in factors}
-        set_paths_to_scenario(conservative_model, target_factors, "conservative")
-        set_paths_to_scenario(aggressive_model, target_factors, "aggressive")
-        low_total = conservative_model["base"]
-        high_total = aggressive_model["base"]
+        low_total, high_total = (
+            evaluate_overrides(
+                compiled,
+                base_values,
+                {
+                    index_of[id(factor)]: correlation_target_value(factor, scenario_name)
+                    for factor in factors
+                },
+            )
+            for scenario_name in ("conservative", "aggressive")
+        )
         swing = max(abs(base_total - low_total), abs(high_total - base_total))
         lower_total = min(low_total, high_total)
         upper_total = max(low_total, high_total)
@@ -752,13 +1717,249 @@ def correlation_entries(model: dict) -> list[dict]:
     return sorted(entries, key=lambda item: item["swing"], reverse=True)
 
 
+def correlation_pair_entries(model: dict) -> dict:
+    compiled = compiled_model(model)
+    index_of = {id(factor): index for index, factor in enumerate(compiled["factors"])}
+    base_lane = [factor["base"] for factor in compiled["factors"]]
+    grouped = factor_paths_by_correlation_group(model)
+    groups = sorted(grouped)
+    targets = {
+        (group, scenario_name): [
+            (index_of[id(factor)], correlation_target_value(factor, scenario_name))
+            for factor in grouped[group]
+        ]
+        for group in groups
+        for scenario_name in ("conservative", "aggressive")
+    }
+
+    def lane(*moves: tuple[str, str]) -> list[float]:
+        values = list(base_lane)
+        for move in moves:
+            for index, value in targets[move]:
+                values[index] = value
+        return values
+
+    # Single-group moves first, then the four joint moves of every pair; all
+    # lanes go through the compiled evaluator in fixed-size batches.
+    moves = [((group, scenario_name),) for group, scenario_name in targets]
+    pairs = [
+        (first, second)
+        for position, first in enumerate(groups)
+        for second in groups[position + 1 :]
+    ]
+    moves.extend(
+        ((first, first_scenario), (second, second_scenario))
+        for first, second in pairs
+        for first_scenario, second_scenario in CORRELATION_COMBINATIONS
+    )
+    totals = []
+    for start in range(0, len(moves), LANE_BATCH_SIZE):
+        batch = moves[start : start + LANE_BATCH_SIZE]
+        totals.extend(evaluate_lanes(compiled, [lane(*move) for move in batch]))
+    single = dict(zip(targets, totals))
+    base_total = model["base"]
+
+    entries = []
+    for position, (first, second) in enumerate(pairs):
+        offset = len(targets) + position * len(CORRELATION_COMBINATIONS)
+        combination_totals = {}
+        interaction = 0.0
+        for (first_scenario, second_scenario), total in zip(
+            CORRELATION_COMBINATIONS, totals[offset : offset + len(CORRELATION_COMBINATIONS)]
+        ):
+            combination_totals[f"{first_scenario}/{second_scenario}"] = total
+            # How far the joint move departs from adding the two solo moves.
+            additive = (
+                single[(first, first_scenario)]
+                + single[(second, second_scenario)]
+                - base_total
+            )
+            if abs(total - additive) > abs(interaction):
+                interaction = total - additive
+        entries.append(
+            {
+                "correlation_groups": [first, second],
+                "totals": combination_totals,
+                "total_lower": min(combination_totals.values()),
+                "total_upper": max(combination_totals.values()),
+                "swing": max(abs(total - base_total) for total in combination_totals.values()),
+                "interaction": interaction,
+            }
+        )
+    entries.sort(key=lambda item: item["swing"], reverse=True)
+    return {"groups": groups, "pair_count": len(entries), "entries": entries}
+
+
 def scenario_totals(model: dict) -> dict[str, float]:
-    totals = {}
-    for scenario_name in SCENARIO_NAMES:
-        scenario_model = deepcopy(model)
-        set_model_to_scenario(scenario_model, scenario_name)
-        totals[scenario_name] = scenario_model["base"]
-    return totals
+    compiled = compiled_model(model)
+    lanes = [
+        [factor_scenario_value(factor, scenario_name) for factor in compiled["factors"]]
+        for scenario_name in SCENARIO_NAMES
+    ]
+    return dict(zip(SCENARIO_NAMES, evaluate_lanes(compiled, lanes)))
+
+
+def resolve_timeline(payload: dict, periods_override: int | None = None) -> dict | None:
+    raw_config = payload.get("timeline")
+    if raw_config in (None, "") and periods_override is None:
+        return None
+    if raw_config in (None, ""):
+        raw_config = {}
+    if not isinstance(raw_config, dict):
+        raise ValueError(f"Model has non-object timeline config: {raw_config!r}")
+    periods = periods_override
+    if periods is None:
+        periods = raw_config.get("periods")
+    if not isinstance(periods, int) or periods <= 0:
+        raise ValueError(f"Model has invalid timeline period count: {periods!r}")
+    labels = raw_config.get("labels")
+    if labels is None:
+        labels = [str(index) for index in range(1, periods + 1)]
+    labels = validate_string_list("timeline", "labels", labels)
+    if len(labels) != periods:
+        raise ValueError(
+            f"Timeline has {len(labels)} labels for {periods} periods"
+        )
+    return {
+        "periods": periods,
+        "period": validate_period("timeline", raw_config.get("period", "")),
+        "labels": labels,
+    }
+
+
+def factor_series(factor: dict, periods: int) -> list[list[float]]:
+    # Rows are periods and columns are low/base/high for one factor.
+    if "series" in factor:
+        if len(factor["series"]) != periods:
+            raise ValueError(
+                f"Factor '{factor['path']}' has {len(factor['series'])} values "
+                f"for {periods} timeline periods"
+            )
+        return factor["series"]
+    growth = factor.get("growth", 0.0)
+    snapshot = (factor["low"], factor["base"], factor["high"])
+    return [
+        [value * (1.0 + growth) ** index for value in snapshot]
+        for index in range(periods)
+    ]
+
+
+def collect_factor_series(model: dict, periods: int) -> dict[str, list[list[float]]]:
+    return {
+        factor["path"]: factor_series(factor, periods)
+        for factor in flatten_factors(model)
+    }
+
+
+def node_series(
+    node: dict,
+    series_by_path: dict[str, list[list[float]]],
+    memo: dict[int, list[list[float]]] | None = None,
+) -> list[list[float]]:
+    if node["kind"] == "factor":
+        return series_by_path[node["path"]]
+    memo = {} if memo is None else memo
+    if id(node) in memo:
+        return memo[id(node)]
+    children = [
+        node_series(child, series_by_path, memo) for child in node["children"]
+    ]
+    total = [list(row) for row in children[0]]
+    for child in children[1:]:
+        if node["mode"] == "product":
+            for row, child_row in zip(total, child):
+                row[0] *= child_row[0]
+                row[1] *= child_row[1]
+                row[2] *= child_row[2]
+        else:
+            for row, child_row in zip(total, child):
+                row[0] += child_row[0]
+                row[1] += child_row[1]
+                row[2] += child_row[2]
+    memo[id(node)] = total
+    return total
+
+
+def sample_node_trajectory(
+    node: dict,
+    rng: random.Random,
+    group_quantiles: dict[str, float],
+    series_by_path: dict[str, list[list[float]]],
+    memo: dict[int, list[float]] | None = None,
+) -> list[float]:
+    memo = {} if memo is None else memo
+    if id(node) in memo:
+        return memo[id(node)]
+    if node["kind"] == "factor":
+        # One quantile per factor keeps each sampled trajectory coherent.
+        q = monte_carlo_factor_quantile(node, rng, group_quantiles)
+        memo[id(node)] = [
+            triangular_quantile(low, high, base, q)
+            for low, base, high in series_by_path[node["path"]]
+        ]
+        return memo[id(node)]
+    children = [
+        sample_node_trajectory(child, rng, group_quantiles, series_by_path, memo)
+        for child in node["children"]
+    ]
+    total = list(children[0])
+    for child in children[1:]:
+        if node["mode"] == "product":
+            total = [left * right for left, right in zip(total, child)]
+        else:
+            total = [left + right for left, right in zip(total, child)]
+    memo[id(node)] = total
+    return total
+
+
+def timeline_summary(
+    model: dict, timeline: dict | None, monte_carlo_config: dict | None
+) -> dict | None:
+    if not timeline:
+        return None
+    periods = timeline["periods"]
+    series_by_path = collect_factor_series(model, periods)
+    totals = node_series(model, series_by_path)
+    summary = {
+        "periods": periods,
+        "period": timeline["period"],
+        "labels": timeline["labels"],
+        "low": [row[0] for row in totals],
+        "base": [row[1] for row in totals],
+        "high": [row[2] for row in totals],
+        "monte_carlo": None,
+    }
+    if not monte_carlo_config:
+        return summary
+
+    rng = random.Random(monte_carlo_config.get("seed"))
+    groups = sorted(factor_paths_by_correlation_group(model))
+    use_correlated_groups = bool(groups) and monte_carlo_config.get(
+        "correlated_groups", True
+    )
+    columns = [[] for _ in range(periods)]
+    for _ in range(monte_carlo_config["samples"]):
+        group_quantiles = (
+            {group: rng.random() for group in groups} if use_correlated_groups else {}
+        )
+        trajectory = sample_node_trajectory(
+            model, rng, group_quantiles, series_by_path
+        )
+        for column, value in zip(columns, trajectory):
+            column.append(value)
+    stats = {"mean": [], "p05": [], "p50": [], "p95": []}
+    for column in columns:
+        column.sort()
+        stats["mean"].append(sum(column) / len(column))
+        for key, q in MONTE_CARLO_QUANTILES:
+            stats[key].append(percentile(column, q))
+    summary["monte_carlo"] = {
+        "samples": monte_carlo_config["samples"],
+        "seed": monte_carlo_config.get("seed"),
+        "correlated_groups": use_correlated_groups,
+        **stats,
+    }
+    return summary
 
 
 def short_number(value: float) -> str:
@@ -799,6 +2000,12 @@ def metadata_summary(node: dict) -> str:
     as_of = node.get("as_of", "")
     if as_of:
         parts.append(f"as_of={as_of}")
+    converted = node.get("converted_from")
+    if converted:
+        origin = "/".join(
+            converted[key] for key in ("period", "currency") if key in converted
+        )
+        parts.append(f"converted_from={origin} (x{converted['multiplier']:.4g})")
     return ", ".join(parts) if parts else "-"
 
 
@@ -911,12 +2118,11 @@ def derived_sanity_checks(
     return checks
 
 
-def render_inputs_rows(model: dict) -> list[str]:
-    rows = []
+def render_inputs_rows(model: dict) -> Iterator[str]:
     for factor in flatten_factors(model):
         basis = factor.get("basis_type", "") or "-"
         source = factor.get("source", "") or factor.get("source_url", "") or "-"
-        rows.append(
+        yield (
             "| {path} | {low} | {base} | {high} | {basis} | {source} | {meta} | {scenario} |".format(
                 path=factor["path"],
                 low=short_number(factor["low"]),
@@ -928,7 +2134,6 @@ def render_inputs_rows(model: dict) -> list[str]:
                 scenario=render_factor_scenarios(factor),
             )
         )
-    return rows
 
 
 def render_factor_scenarios(factor: dict) -> str:
@@ -949,22 +2154,24 @@ def render_factor_scenarios(factor: dict) -> str:
     return ", ".join(parts) if parts else "-"
 
 
-def render_calculation_rows(node: dict, depth: int = 0) -> list[str]:
+def render_calculation_rows(
+    node: dict, depth: int = 0, expanded: set[int] | None = None
+) -> Iterator[str]:
+    expanded = set() if expanded is None else expanded
     indent = "  " * depth
     label = f"{indent}{node['path']}"
-    rows = [
-        "| {label} | {mode} | {low} | {base} | {high} |".format(
-            label=label,
-            mode=node.get("mode", "factor"),
-            low=short_number(node["low"]),
-            base=short_number(node["base"]),
-            high=short_number(node["high"]),
-        )
-    ]
-    if node["kind"] == "group":
+    repeated = node.get("ref") and id(node) in expanded
+    yield "| {label} | {mode} | {low} | {base} | {high} |".format(
+        label=label,
+        mode=f"ref {node['ref']}" if repeated else node.get("mode", "factor"),
+        low=short_number(node["low"]),
+        base=short_number(node["base"]),
+        high=short_number(node["high"]),
+    )
+    if node["kind"] == "group" and not repeated:
+        expanded.add(id(node))
         for child in node["children"]:
-            rows.extend(render_calculation_rows(child, depth + 1))
-    return rows
+            yield from render_calculation_rows(child, depth + 1, expanded)
 
 
 def confidence_label(model: dict, sensitivity: list[dict]) -> str:
@@ -980,59 +2187,72 @@ def confidence_label(model: dict, sensitivity: list[dict]) -> str:
     return "low"
 
 
-def render_markdown(result: dict) -> str:
+def iter_markdown_lines(
+    result: Mapping, omit: tuple[str, ...] = ()
+) -> Iterator[str]:
     model = result["model"]
-    sensitivity = result["sensitivity"]
-    scenarios = result["scenarios"]
-    correlations = result["correlations"]
-    monte_carlo = result.get("monte_carlo")
-    sanity_checks = result.get("sanity_checks", [])
-    lines = ["## Bottom line"]
-    lines.append(f"- Best estimate: {headline_number(model['base'])}")
-    lines.append(
+    yield "## Bottom line"
+    yield f"- Best estimate: {headline_number(model['base'])}"
+    yield (
         f"- Plausible range: {headline_number(model['low'])} to {headline_number(model['high'])}"
     )
-    lines.append(f"- Scope metadata: {metadata_summary(model)}")
-    lines.append(
-        "- Scenario view: conservative {cons}, base {base}, aggressive {aggr}".format(
-            cons=headline_number(scenarios["conservative"]),
-            base=headline_number(scenarios["base"]),
-            aggr=headline_number(scenarios["aggressive"]),
+    yield f"- Scope metadata: {metadata_summary(model)}"
+    if "scenarios" in result:
+        scenarios = result["scenarios"]
+        yield (
+            "- Scenario view: conservative {cons}, base {base}, aggressive {aggr}".format(
+                cons=headline_number(scenarios["conservative"]),
+                base=headline_number(scenarios["base"]),
+                aggr=headline_number(scenarios["aggressive"]),
+            )
         )
-    )
-    lines.append("")
-    lines.append("## Model")
-    lines.append(f"- Formula: {formula(model)}")
-    lines.append(f"- Top mode: {model['mode']}")
-    lines.append("")
-    lines.append("## Inputs and evidence")
-    lines.append(
-        "| Driver | Low | Base | High | Basis | Source | Metadata | Scenario |"
-    )
-    lines.append("| --- | ---: | ---: | ---: | --- | --- | --- | --- |")
-    lines.extend(render_inputs_rows(model))
-    lines.append("")
-    lines.append("## Calculation")
-    lines.append("| Node | Mode | Low | Base | High |")
-    lines.append("| --- | --- | ---: | ---: | ---: |")
-    lines.extend(render_calculation_rows(model))
-    lines.append("")
-    lines.append("## Sanity checks")
-    for item in sanity_checks:
-        lines.append(f"- {item['label']}: {item['result']}")
-    lines.append("")
-    lines.append("## Sensitivity and confidence")
-    if sensitivity:
-        lines.append(f"- Biggest uncertainty: {sensitivity[0]['path']}")
-    lines.append(f"- Confidence: {confidence_label(model, sensitivity)}")
+    yield ""
+    yield "## Model"
+    yield f"- Formula: {formula(model)}"
+    yield f"- Top mode: {model['mode']}"
+    if "factors" not in omit:
+        yield ""
+        yield "## Inputs and evidence"
+        yield (
+            "| Driver | Low | Base | High | Basis | Source | Metadata | Scenario |"
+        )
+        yield "| --- | ---: | ---: | ---: | --- | --- | --- | --- |"
+        yield from render_inputs_rows(model)
+    if "calculation" not in omit:
+        yield ""
+        yield "## Calculation"
+        yield "| Node | Mode | Low | Base | High |"
+        yield "| --- | --- | ---: | ---: | ---: |"
+        yield from render_calculation_rows(model)
+    if "sanity_checks" in result:
+        yield ""
+        yield "## Sanity checks"
+        for item in result["sanity_checks"]:
+            yield f"- {item['label']}: {item['result']}"
+    if any(
+        key in result
+        for key in ("sensitivity", "correlations", "correlation_pairs", "monte_carlo")
+    ):
+        yield ""
+        yield "## Sensitivity and confidence"
+    sensitivity = result.get("sensitivity") or []
+    if "sensitivity" in result:
+        if sensitivity:
+            yield f"- Biggest uncertainty: {sensitivity[0]['path']}"
+        yield f"- Confidence: {confidence_label(model, sensitivity)}"
+    monte_carlo = result.get("monte_carlo")
     if monte_carlo:
-        lines.append(
-            "- Monte Carlo: p05 {p05}, p50 {p50}, p95 {p95}, mean {mean} from {samples} draws{suffix}".format(
+        yield (
+            "- Monte Carlo: p05 {p05}, p50 {p50}, p95 {p95}, mean {mean} from {samples}{suffix}".format(
                 p05=headline_number(monte_carlo["p05"]),
                 p50=headline_number(monte_carlo["p50"]),
                 p95=headline_number(monte_carlo["p95"]),
                 mean=headline_number(monte_carlo["mean"]),
-                samples=monte_carlo["samples"],
+                samples=(
+                    f"a {monte_carlo['bins']}-bin convolution"
+                    if monte_carlo.get("method") == "convolution"
+                    else f"{monte_carlo['samples']} draws"
+                ),
                 suffix=(
                     f", correlated across {monte_carlo['group_count']} groups"
                     if monte_carlo.get("correlated_groups")
@@ -1040,16 +2260,35 @@ def render_markdown(result: dict) -> str:
                 ),
             )
         )
+        standard_errors = monte_carlo.get("standard_errors")
+        if standard_errors:
+            yield (
+                "- Monte Carlo standard errors ({replicates} bootstrap replicates): "
+                "p05 ±{p05}, p50 ±{p50}, p95 ±{p95}, mean ±{mean}".format(
+                    replicates=monte_carlo["bootstrap_replicates"],
+                    p05=short_number(standard_errors["p05"]),
+                    p50=short_number(standard_errors["p50"]),
+                    p95=short_number(standard_errors["p95"]),
+                    mean=short_number(standard_errors["mean"]),
+                )
+            )
+        draws = monte_carlo.get("draws")
+        if draws:
+            yield (
+                f"- Monte Carlo draws: {draws['shape'][0]} rows x {draws['shape'][1]} "
+                f"{draws['dtype']} columns in {draws['path']} (layout in {draws['sidecar']})"
+            )
     for item in sensitivity[:5]:
-        lines.append(
+        yield (
             "- {path}: total moves from {low} to {high} when only this factor moves".format(
                 path=item["path"],
                 low=headline_number(item["total_if_low"]),
                 high=headline_number(item["total_if_high"]),
             )
         )
+    correlations = result.get("correlations")
     if correlations:
-        lines.append("- Correlated groups:")
+        yield "- Correlated groups:"
         for item in correlations[:3]:
             driver_summary = ", ".join(
                 "{path} ({direction}, {strength:.2f})".format(
@@ -1059,7 +2298,7 @@ def render_markdown(result: dict) -> str:
                 )
                 for driver in item["drivers"]
             )
-            lines.append(
+            yield (
                 "  - {group}: total moves from {low} to {high} when this group moves together [{drivers}]".format(
                     group=item["correlation_group"],
                     low=headline_number(item["total_lower"]),
@@ -1067,35 +2306,557 @@ def render_markdown(result: dict) -> str:
                     drivers=driver_summary,
                 )
             )
-    return "\n".join(lines)
+    pairs = (result.get("correlation_pairs") or {}).get("entries")
+    if pairs:
+        yield "- Correlated group pairs:"
+        for item in pairs[:5]:
+            yield (
+                "  - {first} + {second}: total moves from {low} to {high} when both "
+                "groups move (interaction {interaction})".format(
+                    first=item["correlation_groups"][0],
+                    second=item["correlation_groups"][1],
+                    low=headline_number(item["total_lower"]),
+                    high=headline_number(item["total_upper"]),
+                    interaction=short_number(item["interaction"]),
+                )
+            )
+    group_summaries = (monte_carlo or {}).get("groups")
+    if group_summaries:
+        yield ""
+        yield "## Group distributions"
+        yield "| Group | p05 | p50 | p95 | Mean |"
+        yield "| --- | ---: | ---: | ---: | ---: |"
+        for item in group_summaries:
+            yield "| {path} | {p05} | {p50} | {p95} | {mean} |".format(
+                path=item["path"],
+                p05=short_number(item["p05"]),
+                p50=short_number(item["p50"]),
+                p95=short_number(item["p95"]),
+                mean=short_number(item["mean"]),
+            )
+    timeline = result.get("timeline")
+    if timeline:
+        yield ""
+        yield "## Timeline"
+        simulated = timeline.get("monte_carlo")
+        header = "| Period | Low | Base | High |"
+        divider = "| --- | ---: | ---: | ---: |"
+        if simulated:
+            header += " p05 | p50 | p95 |"
+            divider += " ---: | ---: | ---: |"
+        yield header
+        yield divider
+        for index, label in enumerate(timeline["labels"]):
+            row = "| {label} | {low} | {base} | {high} |".format(
+                label=label,
+                low=short_number(timeline["low"][index]),
+                base=short_number(timeline["base"][index]),
+                high=short_number(timeline["high"][index]),
+            )
+            if simulated:
+                row += " {p05} | {p50} | {p95} |".format(
+                    p05=short_number(simulated["p05"][index]),
+                    p50=short_number(simulated["p50"][index]),
+                    p95=short_number(simulated["p95"][index]),
+                )
+            yield row
+    timings = result.get("timings")
+    if timings:
+        yield ""
+        yield "## Timings"
+        yield "| Phase | Calls | Wall ms | CPU ms | Peak KiB |"
+        yield "| --- | ---: | ---: | ---: | ---: |"
+        for name, phase in timings["phases"].items():
+            peak = phase.get("peak_memory_kib")
+            yield (
+                "| {name} | {calls} | {wall:.1f} | {cpu:.1f} | {peak} |".format(
+                    name=name,
+                    calls=phase["calls"],
+                    wall=phase["wall_ms"],
+                    cpu=phase["cpu_ms"],
+                    peak=f"{peak:.0f}" if peak is not None else "-",
+                )
+            )
+        yield (
+            "- Model size: {factors} factors, {groups} groups, {corr} correlation groups".format(
+                factors=timings.get("factor_count", 0),
+                groups=timings.get("group_count", 0),
+                corr=timings.get("correlation_group_count", 0),
+            )
+        )
+
+
+def write_markdown(
+    result: Mapping, stream: TextIO, omit: tuple[str, ...] = ()
+) -> None:
+    if isinstance(result, LazyResult):
+        # Compute every section first so an error cannot truncate the report.
+        result = result.to_dict()
+    # Lines go straight to the stream so large reports never build one big string.
+    stream.writelines(f"{line}\n" for line in iter_markdown_lines(result, omit))
+
+
+def render_markdown(result: Mapping, omit: tuple[str, ...] = ()) -> str:
+    return "\n".join(iter_markdown_lines(result, omit))
+
+
+def write_json(result: Mapping, stream: TextIO, compact: bool = False) -> None:
+    if not compact:
+        json.dump(result, stream, indent=2)
+        stream.write("\n")
+        return
+    # Encode one top-level section at a time: json.dumps without indent uses the
+    # C encoder, and nothing larger than a single section is held in memory.
+    stream.write("{")
+    for index, (key, value) in enumerate(result.items()):
+        if index:
+            stream.write(",")
+        stream.write(json.dumps(key))
+        stream.write(":")
+        stream.write(json.dumps(value, separators=COMPACT_SEPARATORS))
+    stream.write("}\n")
+
+
+class PhaseProfiler:
+    """Collect wall time, CPU time, peak memory, and call counts per phase."""
+
+    def __init__(self, trace_memory: bool = False, report: bool = True) -> None:
+        self.trace_memory = trace_memory
+        self.report = report
+        self.phases: dict[str, dict] = {}
+        self.events: list[dict] = []
+        self.counts: dict[str, int] = {}
+        self.wall_ms = 0.0
+        self.origin = time.perf_counter()
+        self.started_tracing = False
+        self.stack: list[dict] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    @contextmanager
+    def phase(self, name: str):
+        frame = {"peak": 0}
+        if self.trace_memory:
+            if self.stack:
+                parent = self.stack[-1]
+                parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.stack.append(frame)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall_end = time.perf_counter()
+            cpu_end = time.process_time()
+            self.stack.pop()
+            peak = frame["peak"]
+            if self.trace_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self.stack:
+                    self.stack[-1]["peak"] = max(self.stack[-1]["peak"], peak)
+                tracemalloc.reset_peak()
+            self.record(name, wall_start, wall_end, cpu_end - cpu_start, peak)
+            if not self.stack:
+                self.wall_ms += (wall_end - wall_start) * 1000
+
+    def record(
+        self, name: str, wall_start: float, wall_end: float, cpu: float, peak: int
+    ) -> None:
+        entry = self.phases.setdefault(
+            name, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "peak_memory_kib": None}
+        )
+        entry["calls"] += 1
+        entry["wall_ms"] += (wall_end - wall_start) * 1000
+        entry["cpu_ms"] += cpu * 1000
+        if self.trace_memory:
+            entry["peak_memory_kib"] = max(entry["peak_memory_kib"] or 0.0, peak / 1024)
+        self.events.append(
+            {
+                "name": name,
+                "cat": "factor_model",
+                "ph": "X",
+                "ts": (wall_start - self.origin) * 1_000_000,
+                "dur": (wall_end - wall_start) * 1_000_000,
+                "pid": os.getpid(),
+                "tid": 1,
+                "args": {
+                    "cpu_ms": cpu * 1000,
+                    "peak_memory_kib": peak / 1024 if self.trace_memory else None,
+                },
+            }
+        )
+
+    def count_model(self, model: dict) -> None:
+        nodes = iter_unique_nodes(model)
+        self.counts = {
+            "factor_count": sum(1 for node in nodes if node["kind"] == "factor"),
+            "group_count": sum(1 for node in nodes if node["kind"] == "group"),
+            "correlation_group_count": len(factor_paths_by_correlation_group(model)),
+        }
+
+    def summary(self) -> dict:
+        return {
+            "wall_ms": self.wall_ms,
+            "phases": self.phases,
+            **self.counts,
+        }
+
+    def trace(self) -> dict:
+        return {
+            "traceEvents": self.events,
+            "displayTimeUnit": "ms",
+            "otherData": dict(self.counts),
+        }
+
+    def close(self) -> None:
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+
+def profile_phase(profiler: PhaseProfiler | None, name: str):
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
+
+
+def parse_analyses(raw: str | list[str] | None) -> tuple[str, ...]:
+    if raw in (None, ""):
+        return tuple(name for name in ANALYSIS_SECTIONS if name not in OPT_IN_ANALYSES)
+    names = raw.split(",") if isinstance(raw, str) else raw
+    selected = {"totals"}
+    for name in names:
+        if not isinstance(name, str):
+            raise ValueError(f"Analysis names must be strings, got: {name!r}")
+        name = name.strip()
+        if name == "all":
+            return tuple(ANALYSIS_SECTIONS)
+        name = ANALYSIS_ALIASES.get(name, name)
+        if name not in ANALYSIS_SECTIONS:
+            allowed = ", ".join(list(ANALYSIS_SECTIONS) + ["all"])
+            raise ValueError(f"Unsupported analysis '{name}'. Expected one of: {allowed}")
+        selected.add(name)
+    return tuple(name for name in ANALYSIS_SECTIONS if name in selected)
+
+
+def parse_omit(raw: str | list[str] | None) -> tuple[str, ...]:
+    if raw in (None, ""):
+        return ()
+    names = raw.split(",") if isinstance(raw, str) else raw
+    omitted = set()
+    for name in names:
+        name = name.strip()
+        if name not in OMITTABLE_BLOCKS:
+            allowed = ", ".join(OMITTABLE_BLOCKS)
+            raise ValueError(f"Unsupported omit block '{name}'. Expected one of: {allowed}")
+        omitted.add(name)
+    return tuple(name for name in OMITTABLE_BLOCKS if name in omitted)
+
+
+class LazyResult(Mapping):
+    """Result mapping whose analysis sections are computed on first access."""
+
+    def __init__(
+        self,
+        payload: dict,
+        model: dict,
+        monte_carlo_config: dict | None,
+        analyses: tuple[str, ...],
+        profiler: PhaseProfiler | None = None,
+        timeline: dict | None = None,
+        omit: tuple[str, ...] = (),
+    ) -> None:
+        self.payload = payload
+        self.model = model
+        self.monte_carlo_config = monte_carlo_config
+        self.analyses = analyses
+        self.profiler = profiler
+        self.timeline = timeline
+        self.omit = omit
+        self.keys_selected = [
+            key
+            for name in analyses
+            for key in ANALYSIS_SECTIONS[name]
+            if (key != "timeline" or timeline is not None) and key not in omit
+        ]
+        if profiler is not None and profiler.report:
+            self.keys_selected.append("timings")
+        self.computed: dict[str, object] = {"model": model}
+
+    def section(self, key: str) -> object:
+        if key == "timings":
+            self.profiler.count_model(self.model)
+            return self.profiler.summary()
+        if key not in self.computed:
+            with profile_phase(self.profiler, key):
+                self.computed[key] = self.compute(key)
+        return self.computed[key]
+
+    def compute(self, key: str) -> object:
+        if key == "factors":
+            return flatten_factors(self.model)
+        if key == "scenarios":
+            return scenario_totals(self.model)
+        if key == "sensitivity":
+            return sensitivity_entries(self.model)
+        if key == "correlations":
+            return correlation_entries(self.model)
+        if key == "correlation_pairs":
+            return correlation_pair_entries(self.model)
+        if key == "sanity_checks":
+            return validate_sanity_checks(
+                self.payload.get("sanity_checks", [])
+            ) + derived_sanity_checks(
+                self.model, self.section("scenarios"), self.section("correlations")
+            )
+        if key == "monte_carlo":
+            return monte_carlo_summary(self.model, self.monte_carlo_config)
+        if key == "timeline":
+            return timeline_summary(
+                self.model, self.timeline, self.monte_carlo_config
+            )
+        raise KeyError(key)
+
+    def __getitem__(self, key: str) -> object:
+        if key not in self.keys_selected:
+            raise KeyError(key)
+        return self.section(key)
 
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys_selected
 
-def build_result(
+    def __iter__(self):
+        return iter(self.keys_selected)
+
+    def __len__(self) -> int:
+        return len(self.keys_selected)
+
+    def to_dict(self) -> dict:
+        result = {key: self[key] for key in self.keys_selected if key != "timings"}
+        if "timings" in self.keys_selected:
+            result["timings"] = self["timings"]
+        return result
+
+
+def build_lazy_result(
     payload: dict,
     forced_mode: str | None,
     monte_carlo_samples: int | None = None,
     monte_carlo_seed: int | None = None,
-) -> dict:
+    profiler: PhaseProfiler | None = None,
+    analyses: str | list[str] | None = None,
+    bootstrap: int | None = None,
+    monte_carlo_method: str | None = None,
+    periods: int | None = None,
+    rates_path: str | None = None,
+    omit: str | list[str] | None = None,
+    histogram: int | None = None,
+    draws_out: dict | None = None,
+    group_quantiles: bool | None = None,
+) -> LazyResult:
     if forced_mode is not None:
         payload = dict(payload)
         payload["mode"] = forced_mode
 
-    model = parse_node(payload)
-    monte_carlo_config = resolve_monte_carlo_config(
-        payload, monte_carlo_samples, monte_carlo_seed
+    with profile_phase(profiler, "parse"):
+        model = parse_node(
+            payload,
+            conversions=resolve_conversions(payload, rates_path),
+            definitions=resolve_definitions(payload),
+        )
+        monte_carlo_config = resolve_monte_carlo_config(
+            payload,
+            monte_carlo_samples,
+            monte_carlo_seed,
+            bootstrap,
+            monte_carlo_method,
+            histogram,
+            draws_out,
+            group_quantiles,
+        )
+        timeline = resolve_timeline(payload, periods)
+        # Reject invalid option combinations before any section is computed.
+        if monte_carlo_config and monte_carlo_config["method"] == "convolution":
+            check_convolution(model, monte_carlo_config)
+        selected = parse_analyses(analyses)
+        if draws_out is not None and "mc" not in selected:
+            raise ValueError("Exporting draws needs the 'mc' analysis")
+    return LazyResult(
+        payload,
+        model,
+        monte_carlo_config,
+        selected,
+        profiler,
+        timeline,
+        parse_omit(omit),
     )
-    scenarios = scenario_totals(model)
-    correlations = correlation_entries(model)
-    return {
-        "model": model,
-        "factors": flatten_factors(model),
-        "sensitivity": sensitivity_entries(model),
-        "correlations": correlations,
-        "scenarios": scenarios,
-        "sanity_checks": validate_sanity_checks(payload.get("sanity_checks", []))
-        + derived_sanity_checks(model, scenarios, correlations),
-        "monte_carlo": monte_carlo_summary(model, monte_carlo_config),
-    }
+
+
+def build_result(*args, **kwargs) -> dict:
+    """Compute every selected section and return the result as a plain dict.
+
+    Takes the same arguments as build_lazy_result.
+    """
+    return build_lazy_result(*args, **kwargs).to_dict()
+
+
+def write_trace(path: str, profiler: PhaseProfiler) -> None:
+    Path(path).write_text(json.dumps(profiler.trace(), indent=2) + "\n")
+
+
+def strip_annotations(value: object) -> object:
+    if isinstance(value, dict):
+        return {
+            key: strip_annotations(item)
+            for key, item in value.items()
+            if key not in ANNOTATION_KEYS
+        }
+    if isinstance(value, list):
+        return [strip_annotations(item) for item in value]
+    return value
+
+
+def numeric_digest(payload: dict) -> str:
+    canonical = json.dumps(strip_annotations(payload), sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def run_once(
+    args: argparse.Namespace, payload: dict, reuse: dict | None = None
+) -> LazyResult:
+    profiler = (
+        PhaseProfiler(trace_memory=args.profile_memory, report=args.profile)
+        if args.profile or args.trace
+        else None
+    )
+    try:
+        result = build_lazy_result(
+            payload,
+            args.mode,
+            args.samples,
+            args.seed,
+            profiler=profiler,
+            analyses=args.analyses,
+            bootstrap=args.bootstrap,
+            monte_carlo_method=args.method,
+            periods=args.periods,
+            rates_path=args.rates,
+            omit=args.omit,
+            histogram=args.histogram,
+            draws_out=(
+                {
+                    "path": args.draws_out,
+                    "dtype": args.draws_dtype,
+                    "groups": args.draws_groups,
+                }
+                if args.draws_out
+                else None
+            ),
+            group_quantiles=args.group_quantiles or None,
+        )
+        if reuse:
+            result.computed.update(reuse)
+        # Compute sections up front so their time is not charged to "render".
+        output = result.to_dict()
+        with profile_phase(profiler, "render"):
+            if args.format == "json":
+                write_json(output, sys.stdout, compact=args.compact)
+            else:
+                write_markdown(output, sys.stdout, result.omit)
+        if args.trace:
+            write_trace(args.trace, profiler)
+        return result
+    finally:
+        if profiler is not None:
+            profiler.close()
+
+
+def rates_source(args: argparse.Namespace, payload: object) -> Path | None:
+    normalize = payload.get("normalize") if isinstance(payload, dict) else None
+    raw = args.rates or (normalize.get("rates_file") if isinstance(normalize, dict) else None)
+    return Path(raw) if isinstance(raw, str) and raw else None
+
+
+def watch_cache_key(payload: dict, rates_content: bytes | None, options: str) -> str:
+    digest = hashlib.sha256(numeric_digest(payload).encode())
+    digest.update(b"\0" + (rates_content or b""))
+    digest.update(b"\0" + options.encode())
+    return digest.hexdigest()
+
+
+def watch(args: argparse.Namespace) -> int:
+    path = Path(args.input)
+    if not path.is_file():
+        raise ValueError("--watch needs --input to be a file path")
+    # Imported here so the rest of the CLI works without file_watch.py next to it.
+    try:
+        from file_watch import FileWatcher
+    except ImportError as exc:
+        raise ValueError("--watch needs file_watch.py next to factor_model.py") from exc
+
+    watcher = FileWatcher([path])
+    options = json.dumps({name: getattr(args, name) for name in WATCH_KEY_OPTIONS})
+    # Numeric sections keyed by the payload digest without annotation fields,
+    # the rates file contents, and the CLI options that affect them.
+    sections: dict[str, dict] = {}
+    last_state = None
+    last_content = None
+    try:
+        while True:
+            try:
+                content = path.read_bytes()
+            except OSError:
+                content = last_content
+            last_content = content
+            payload, error, rates_content = None, None, None
+            try:
+                payload = json.loads(content)
+                rates_path = rates_source(args, payload)
+            except ValueError as exc:
+                error, rates_path = exc, None
+            if rates_path is not None:
+                try:
+                    rates_content = rates_path.read_bytes()
+                except OSError:
+                    rates_content = None
+            watcher.watch([path] + ([rates_path] if rates_path is not None else []))
+            state = (content, rates_content)
+            if state != last_state:
+                last_state = state
+                started = time.perf_counter()
+                if sys.stdout.isatty():
+                    sys.stdout.write("\033[H\033[2J")
+                try:
+                    if error is not None:
+                        raise error
+                    key = watch_cache_key(payload, rates_content, options)
+                    result = run_once(args, payload, sections.get(key))
+                    sections.pop(key, None)
+                    sections[key] = {
+                        name: value
+                        for name, value in result.computed.items()
+                        if name not in ("model", "factors")
+                    }
+                    while len(sections) > WATCH_CACHE_SIZE:
+                        sections.pop(next(iter(sections)))
+                    status = f"updated in {(time.perf_counter() - started) * 1000:.0f} ms"
+                except Exception as exc:
+                    sys.stderr.write(f"error: {exc}\n")
+                    status = "waiting for a valid payload"
+                sys.stdout.flush()
+                watched = ", ".join(str(watched_path) for watched_path in watcher.paths)
+                sys.stderr.write(
+                    f"watching {watched} ({watcher.method}): {status} at "
+                    f"{time.strftime('%H:%M:%S')}\n"
+                )
+                sys.stderr.flush()
+            watcher.wait()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
 
 
 def main() -> int:
@@ -1117,16 +2878,109 @@ def main() -> int:
         default=None,
         help="Random seed for Monte Carlo sampling",
     )
+    parser.add_argument(
+        "--bootstrap",
+        type=int,
+        default=None,
+        help="Bootstrap replicates for Monte Carlo standard errors (0 disables)",
+    )
+    parser.add_argument(
+        "--method",
+        choices=sorted(ALLOWED_MONTE_CARLO_METHODS),
+        default=None,
+        help="Distribution method: random sampling or deterministic convolution",
+    )
+    parser.add_argument(
+        "--histogram",
+        type=int,
+        default=None,
+        help="Add a Monte Carlo histogram with this many equal-width bins (0 disables)",
+    )
+    parser.add_argument(
+        "--draws-out",
+        default=None,
+        help="Write raw Monte Carlo draws to this binary file plus a .json sidecar",
+    )
+    parser.add_argument(
+        "--draws-dtype",
+        choices=sorted(DRAWS_TYPECODES),
+        default="float64",
+        help="Element type of the --draws-out file (default: float64)",
+    )
+    parser.add_argument(
+        "--draws-groups",
+        action="store_true",
+        help="Also write every group's intermediate value as extra --draws-out columns",
+    )
+    parser.add_argument(
+        "--group-quantiles",
+        action="store_true",
+        help="Also report Monte Carlo mean and p05/p50/p95 for every intermediate group",
+    )
+    parser.add_argument(
+        "--periods",
+        type=int,
+        default=None,
+        help="Project the model over this many timeline periods",
+    )
+    parser.add_argument(
+        "--rates",
+        default=None,
+        help="JSON file of currency rates used to normalize factors",
+    )
+    parser.add_argument(
+        "--analyses",
+        default=None,
+        help=(
+            "Comma-separated analyses to compute: totals, sensitivity, correlations, "
+            "pairs, scenarios, sanity, mc, timeline, or all (every analysis, including "
+            "pairs; default: every analysis except pairs)"
+        ),
+    )
+    parser.add_argument(
+        "--omit",
+        default=None,
+        help=(
+            "Comma-separated duplicated blocks to leave out: factors (flat factor "
+            "list / inputs table), calculation (markdown calculation table)"
+        ),
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write JSON without indentation, one section at a time",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase wall time, CPU time, and call counts",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help=(
+            "Also record peak traced memory per phase with tracemalloc; needs --profile "
+            "or --trace (slows the run, so wall and CPU times are inflated)"
+        ),
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write per-phase timings to this file in Chrome trace-event format",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-render whenever the --input file changes",
+    )
     args = parser.parse_args()
+    if args.profile_memory and not (args.profile or args.trace):
+        parser.error("--profile-memory needs --profile or --trace")
 
     try:
-        payload = load_payload(args.input)
-        result = build_result(payload, args.mode, args.samples, args.seed)
-        if args.format == "json":
-            json.dump(result, sys.stdout, indent=2)
-            sys.stdout.write("\n")
-        else:
-            sys.stdout.write(render_markdown(result) + "\n")
+        if args.watch:
+            return watch(args)
+        run_once(args, load_payload(args.input))
         return 0
     except Exception as exc:
         sys.stderr.write(f"error: {exc}\n")
@@ -0,0 +1,101 @@
+"""Block until one of a set of files changes, using inotify on Linux and polling elsewhere."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+POLL_SECONDS = 0.5
+SETTLE_SECONDS = 0.05
+INOTIFY_EVENTS = 0x00000008 | 0x00000080 | 0x00000100  # CLOSE_WRITE, MOVED_TO, CREATE
+INOTIFY_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Wait for saves to any watched file; the watched set can change between waits."""
+
+    def __init__(self, paths: list[Path], interval: float = POLL_SECONDS) -> None:
+        self.interval = interval
+        self.paths: list[Path] = []
+        self.directories: dict[int, bytes] = {}
+        self.libc = None
+        self.fd = self.open_inotify()
+        self.method = "inotify" if self.fd is not None else "polling"
+        self.watch(paths)
+
+    def open_inotify(self) -> int | None:
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            self.libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        return fd if fd >= 0 else None
+
+    def watch(self, paths: list[Path]) -> None:
+        """Replace the watched set, e.g. when a payload starts naming a rates file."""
+        self.paths = list(dict.fromkeys(path.resolve() for path in paths))
+        self.signatures = {path: self.stat_signature(path) for path in self.paths}
+        if self.fd is None:
+            return
+        for path in self.paths:
+            # Watch the directory: editors often save by renaming a temp file
+            # over the original, which would drop a watch on the file itself.
+            directory = os.fsencode(path.parent)
+            if directory in self.directories.values():
+                continue
+            descriptor = self.libc.inotify_add_watch(self.fd, directory, INOTIFY_EVENTS)
+            if descriptor >= 0:
+                self.directories[descriptor] = directory
+
+    @staticmethod
+    def stat_signature(path: Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def wait(self) -> None:
+        if self.fd is None:
+            while all(
+                self.stat_signature(path) == signature
+                for path, signature in self.signatures.items()
+            ):
+                time.sleep(self.interval)
+            self.signatures = {path: self.stat_signature(path) for path in self.paths}
+            return
+        targets = {os.fsencode(path) for path in self.paths}
+        while not self.read_events(targets):
+            pass
+        # Swallow the burst of events a single save produces.
+        while select.select([self.fd], [], [], SETTLE_SECONDS)[0]:
+            self.read_events(targets)
+
+    def read_events(self, targets: set[bytes]) -> bool:
+        buffer = os.read(self.fd, 64 * 1024)
+        offset = 0
+        matched = False
+        while offset < len(buffer):
+            descriptor, _, _, length = INOTIFY_HEADER.unpack_from(buffer, offset)
+            start = offset + INOTIFY_HEADER.size
+            name = buffer[start : start + length].rstrip(b"\0")
+            directory = self.directories.get(descriptor)
+            if directory is not None and os.path.join(directory, name) in targets:
+                matched = True
+            offset = start + length
+        return matched
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -16,8 +16,9 @@ Examples:
 
 import argparse
 import json
-import os
-import sys
+
+from firecrawl_cache import add_cache_arguments, cached_call, open_cache
+from firecrawl_client import FirecrawlClient, FirecrawlError, print_error, require_api_key
 
 
 def main():
@@ -37,6 +38,8 @@ Examples:
     --schema '{"type":"object","properties":{"layoffs":{"type":"array","items":{"type":"object","properties":{"company":{"type":"string"},"count":{"type":"number"}}}}}}'
 
 Note: The agent autonomously searches and navigates the web. No URLs required.
+Where the agent endpoint is not available (e.g. a self-hosted instance), --urls
+are extracted with web search enabled instead.
         """,
     )
     parser.add_argument(
@@ -55,20 +58,12 @@ Note: The agent autonomously searches and navigates the web. No URLs required.
         help="JSON schema for structured output (optional)",
     )
 
+    add_cache_arguments(parser)
+
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     # Parse URLs if provided
     urls = None
@@ -81,20 +76,11 @@ Note: The agent autonomously searches and navigates the web. No URLs required.
         try:
             schema = json.loads(args.schema)
         except json.JSONDecodeError as e:
-            print(
-                json.dumps(
-                    {
-                        "success": False,
-                        "error": f"Invalid JSON schema: {e}",
-                    }
-                )
-            )
-            sys.exit(1)
+            print_error(f"Invalid JSON schema: {e}")
 
     try:
-        from firecrawl import FirecrawlApp
-
-        app = FirecrawlApp(api_key=api_key)
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key)
 
         # Build agent parameters
         params = {
@@ -105,51 +91,36 @@ Note: The agent autonomously searches and navigates the web. No URLs required.
         if schema:
             params["schema"] = schema
 
-        # Note: The firecrawl-py SDK may have different method names
-        # Check the SDK documentation for the exact method
-        # Common patterns: app.agent(), app.extract_agent(), etc.
-
-        # Try the agent method (based on Firecrawl API)
-        if hasattr(app, "agent"):
-            result = app.agent(params)
-        else:
-            # Fallback: use extract with web search enabled
+        try:
+            result = cached_call(cache, "agent", urls, params, lambda: client.agent(**params))
+        except FirecrawlError as e:
+            # The agent endpoint only exists on the v2 API; self-hosted and older
+            # deployments answer 404, so fall back to extract with web search.
+            if e.status != 404:
+                raise
+            if not urls:
+                raise FirecrawlError(
+                    "Agent endpoint not available and no --urls given. "
+                    "Try using search.py first to find relevant URLs."
+                )
             extract_params = {
                 "prompt": args.prompt,
                 "enableWebSearch": True,
             }
             if schema:
                 extract_params["schema"] = schema
-
-            if urls:
-                result = app.extract(urls, params=extract_params)
-            else:
-                # If no URLs and no agent method, we need to search first
-                print(
-                    json.dumps(
-                        {
-                            "success": False,
-                            "error": "Agent functionality requires URLs or the agent method. Try using search.py first to find relevant URLs.",
-                        }
-                    )
-                )
-                sys.exit(1)
+            result = cached_call(
+                cache,
+                "extract",
+                urls,
+                extract_params,
+                lambda: client.extract(urls, **extract_params),
+            )
 
         print(json.dumps({"success": True, "data": result}, indent=2, default=str))
 
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
@@ -3,19 +3,176 @@
 Crawl multiple pages from a website using Firecrawl API.
 
 Usage:
-    crawl.py <url> [--limit N] [--depth N] [--async]
+    crawl.py <url> [--limit N] [--depth N] [--async | --stream]
+    crawl.py --follow JOB_ID [--skip N]
+    crawl.py <url> --checkpoint DIR
+    crawl.py <url> --incremental INDEX [--workers N]
+
+With --stream (or --follow for a job started earlier, e.g. with --async) each
+page is written to stdout as one JSON line as soon as the crawl completes it,
+so memory use does not grow with the size of the crawl. --checkpoint DIR also
+journals every page, so rerunning the same command after an interruption
+replays the journal and continues the crawl where it stopped.
+
+--incremental INDEX recrawls a site cheaply: URLs come from map, pages whose
+sitemap lastmod or ETag/Last-Modified headers match the index are skipped
+without an API call, and only new or changed pages are written out.
 
 Examples:
     crawl.py "https://docs.example.com"
     crawl.py "https://docs.example.com" --limit 20
     crawl.py "https://docs.example.com" --limit 10 --depth 2
     crawl.py "https://docs.example.com" --async
+    crawl.py "https://docs.example.com" --limit 500 --stream > pages.ndjson
+    crawl.py --follow 123e4567-e89b-12d3-a456-426614174000 > pages.ndjson
+    crawl.py "https://docs.example.com" --limit 5000 --checkpoint .firecrawl-jobs > pages.ndjson
+    crawl.py "https://docs.example.com" --limit 5000 --incremental docs-index.sqlite3 > delta.ndjson
 """
 
 import argparse
 import json
-import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+from firecrawl_cache import add_cache_arguments, cached_call, normalize_url, open_cache
+from firecrawl_checkpoint import Checkpoint
+from firecrawl_client import FirecrawlClient, FirecrawlError, print_error, require_api_key
+from firecrawl_index import PageIndex, content_hash, head_validators, sitemap_lastmods
+
+DEFAULT_WORKERS = 4
+
+
+def write_record(record):
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+
+
+def stream_pages(client, job_id, skip, checkpoint=None):
+    """Write each crawled page as one JSON line; job progress goes to stderr."""
+    status = {}
+    progress = {"id": job_id, "skip": skip}
+    try:
+        for status, documents in client.stream_crawl(job_id, skip=skip):
+            for document in documents:
+                metadata = document.get("metadata") or {}
+                record = {
+                    "success": True,
+                    "url": metadata.get("sourceURL") or metadata.get("url"),
+                    "data": document,
+                }
+                if checkpoint is not None:
+                    # A restarted crawl returns pages the journal already holds.
+                    if checkpoint.is_done(record["url"]):
+                        continue
+                    checkpoint.record(record)
+                write_record(record)
+            sys.stdout.flush()
+            progress["skip"] += len(documents)
+            if checkpoint is not None:
+                checkpoint.save(job_id=job_id, skip=progress["skip"], status=status.get("status"))
+    except KeyboardInterrupt:
+        # Tell the user how to pick the stream up again without duplicates.
+        sys.stderr.write(json.dumps({**progress, "status": "interrupted"}) + "\n")
+        sys.exit(130)
+    summary = {key: value for key, value in status.items() if key != "success"}
+    sys.stderr.write(json.dumps({**progress, **summary}) + "\n")
+
+
+def resume_checkpoint(client, checkpoint, start=None):
+    """Replay journaled pages, then continue the saved crawl job (or start one)."""
+    for record in checkpoint.records():
+        write_record(record)
+    sys.stdout.flush()
+    state = checkpoint.state
+    try:
+        if state.get("status") == "completed":
+            summary = {"id": state.get("job_id"), "skip": state.get("skip", 0)}
+            sys.stderr.write(json.dumps({**summary, "status": "completed"}) + "\n")
+            return
+        if state.get("job_id"):
+            try:
+                stream_pages(client, state["job_id"], state.get("skip", 0), checkpoint)
+                return
+            except FirecrawlError as e:
+                # An expired job can only be recrawled; pages already journaled are skipped.
+                if e.status != 404 or start is None:
+                    raise
+        job_id = start()["id"]
+        # Persist the ID right away so a crash now does not start a second crawl.
+        checkpoint.save(job_id=job_id, skip=0, status="scraping")
+        stream_pages(client, job_id, 0, checkpoint)
+    finally:
+        checkpoint.close()
+
+
+def within_depth(url, base_url, depth):
+    """True for same-host URLs at most `depth` path segments below the base URL."""
+    page, base = urlsplit(url), urlsplit(base_url)
+    if page.netloc != base.netloc:
+        return False
+    base_segments = [part for part in base.path.split("/") if part]
+    page_segments = [part for part in page.path.split("/") if part]
+    if page_segments[: len(base_segments)] != base_segments:
+        return False
+    return len(page_segments) - len(base_segments) <= depth
+
+
+def check_page(client, index, url, lastmod, started, formats):
+    """Skip, revalidate or scrape one page; return (change, record or None)."""
+    entry = index.get(url)
+    if index.unchanged(entry, lastmod=lastmod):
+        index.touch(url, started)
+        return "unchanged", None
+    validators = head_validators(url)
+    if index.unchanged(entry, validators=validators):
+        index.touch(url, started)
+        return "revalidated", None
+    try:
+        document = client.scrape(url, formats=formats, only_main_content=True)
+    except Exception as e:
+        index.touch(url, started)
+        return "failed", {"success": False, "url": url, "error": str(e)}
+    change = index.update(url, content_hash(document), started, lastmod, validators)
+    if change == "unchanged":
+        return change, None
+    return change, {"success": True, "url": url, "change": change, "data": document}
+
+
+def incremental_crawl(client, args, params):
+    """Map the site, then scrape only pages that are new or changed since the last run."""
+    index = PageIndex(args.incremental)
+    started = time.time()
+    base_url = normalize_url(args.url)
+    links = client.map(args.url, limit=args.limit)["links"]
+    urls = []
+    for link in links:
+        link = link.get("url") if isinstance(link, dict) else link
+        if link and within_depth(normalize_url(link), base_url, args.depth):
+            urls.append(normalize_url(link))
+    urls = list(dict.fromkeys(urls))
+    lastmods = sitemap_lastmods(args.url)
+    counts = dict.fromkeys(("new", "changed", "unchanged", "revalidated", "failed"), 0)
+    formats = params["scrapeOptions"]["formats"]
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [
+                executor.submit(check_page, client, index, url, lastmods.get(url), started, formats)
+                for url in urls
+            ]
+            for future in as_completed(futures):
+                change, record = future.result()
+                counts[change] += 1
+                if record is not None:
+                    write_record(record)
+                    sys.stdout.flush()
+        # Indexed pages that the map no longer returns (deleted, or beyond --limit).
+        missing = index.missing(base_url, started)
+    finally:
+        index.close()
+    summary = {"mode": "incremental", "mapped": len(urls), **counts, "missing": len(missing)}
+    sys.stderr.write(json.dumps(summary) + "\n")
+    return counts["failed"]
 
 
 def main():
@@ -28,11 +185,26 @@ Examples:
   %(prog)s "https://docs.example.com" --limit 20
   %(prog)s "https://docs.example.com" --limit 10 --depth 2
   %(prog)s "https://docs.example.com" --async
+  %(prog)s "https://docs.example.com" --limit 500 --stream > pages.ndjson
+  %(prog)s --follow JOB_ID --skip 120 >> pages.ndjson
+  %(prog)s "https://docs.example.com" --limit 5000 --checkpoint .firecrawl-jobs > pages.ndjson
+  %(prog)s "https://docs.example.com" --limit 5000 --incremental docs-index.sqlite3 > delta.ndjson
+
+Streaming modes print one JSON object per page ({"success", "url", "data"}) as
+pages complete, and a final {"id", "skip", "status", ...} line on stderr. Pass
+that "skip" value back with --follow to resume without repeating pages.
+--checkpoint DIR streams too, and records the job ID, offset and every page
+under DIR: rerun the same command after a crash to replay finished pages and
+continue the crawl.
+--incremental INDEX maps the site and scrapes only pages that are new or whose
+sitemap lastmod, ETag/Last-Modified or content hash changed since the last run
+with the same index. Each output line carries "change": "new" or "changed";
+counts (including unchanged and missing pages) go to stderr.
 
 Note: Crawling can be slow for large sites. Consider using map + scrape for better control.
         """,
     )
-    parser.add_argument("url", help="Base URL to crawl")
+    parser.add_argument("url", nargs="?", help="Base URL to crawl")
     parser.add_argument(
         "--limit",
         type=int,
@@ -51,26 +223,68 @@ Note: Crawling can be slow for large sites. Consider using map + scrape for bett
         action="store_true",
         help="Start async crawl and return job ID",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Start a crawl and stream pages as NDJSON while it runs",
+    )
+    parser.add_argument(
+        "--follow",
+        metavar="JOB_ID",
+        help="Stream pages of an existing crawl job as NDJSON",
+    )
+    parser.add_argument(
+        "--skip",
+        type=int,
+        default=0,
+        help="With --follow, skip this many pages already received (default: 0)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="DIR",
+        help="Journal pages and job state under DIR so a rerun resumes the crawl",
+    )
+    parser.add_argument(
+        "--incremental",
+        metavar="INDEX",
+        help="Output only pages new or changed since the last run with this index file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent page checks in --incremental mode (default: {DEFAULT_WORKERS})",
+    )
+
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     try:
-        from firecrawl import FirecrawlApp
+        if bool(args.url) == bool(args.follow):
+            raise ValueError("Pass either a URL to crawl or --follow JOB_ID")
+        if args.async_mode and args.stream:
+            raise ValueError("--async and --stream cannot be combined")
+        if args.checkpoint and args.async_mode:
+            raise ValueError("--checkpoint streams results and cannot be combined with --async")
+        if args.offline and (args.async_mode or args.stream or args.follow or args.checkpoint):
+            raise ValueError("Only completed synchronous crawls can be answered --offline")
+        if args.skip < 0:
+            raise ValueError("--skip must not be negative")
+        if args.skip and not args.follow:
+            raise ValueError("--skip only applies to --follow")
+        if args.incremental and (args.follow or args.async_mode or args.stream or args.checkpoint):
+            raise ValueError("--incremental cannot be combined with other crawl modes")
+        if args.incremental and (args.cache or args.refresh or args.offline):
+            raise ValueError("--incremental always revalidates pages and does not use the cache")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
 
-        app = FirecrawlApp(api_key=api_key)
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key)
 
         params = {
             "limit": args.limit,
@@ -81,9 +295,28 @@ Note: Crawling can be slow for large sites. Consider using map + scrape for bett
             },
         }
 
-        if args.async_mode:
+        if args.incremental:
+            if incremental_crawl(client, args, params):
+                sys.exit(1)
+        elif args.checkpoint:
+            if args.follow:
+                spec = {"endpoint": "crawl", "job": args.follow}
+                checkpoint = Checkpoint(args.checkpoint, spec)
+                checkpoint.state.setdefault("job_id", args.follow)
+                checkpoint.state.setdefault("skip", args.skip)
+            else:
+                spec = {"endpoint": "crawl", "url": normalize_url(args.url), "params": params}
+                checkpoint = Checkpoint(args.checkpoint, spec)
+            start = None if args.follow else lambda: client.start_crawl(args.url, **params)
+            resume_checkpoint(client, checkpoint, start)
+        elif args.follow:
+            stream_pages(client, args.follow, args.skip)
+        elif args.stream:
+            job = client.start_crawl(args.url, **params)
+            stream_pages(client, job["id"], 0)
+        elif args.async_mode:
             # Start async crawl
-            result = app.async_crawl_url(args.url, params=params)
+            result = client.start_crawl(args.url, **params)
             print(
                 json.dumps(
                     {
@@ -98,22 +331,13 @@ Note: Crawling can be slow for large sites. Consider using map + scrape for bett
             )
         else:
             # Synchronous crawl (waits for completion)
-            result = app.crawl_url(args.url, params=params)
+            result = cached_call(
+                cache, "crawl", args.url, params, lambda: client.crawl(args.url, **params)
+            )
             print(json.dumps({"success": True, "data": result}, indent=2, default=str))
 
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
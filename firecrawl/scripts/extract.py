@@ -4,6 +4,14 @@ Extract structured data from web pages using Firecrawl API with LLM capabilities
 
 Usage:
     extract.py <url> [<url>...] --prompt "extraction prompt" [--schema '{"type":"object",...}']
+    extract.py --input-file urls.txt --prompt "..." [--chunk-size N] [--workers N]
+
+Long URL lists are split into chunks that are extracted concurrently. Results
+are merged by the schema's top-level array fields (or listed per chunk when
+there are none), a failing chunk is retried and then split until the URLs that
+fail are isolated, and each of those is reported in "errors" instead of
+failing the whole run. Request errors such as a bad key, schema or missing
+credits stop the run at once.
 
 Examples:
     extract.py "https://example.com/pricing" --prompt "Extract pricing tiers"
@@ -12,8 +20,105 @@ Examples:
 
 import argparse
 import json
-import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from firecrawl_cache import add_cache_arguments, cached_call, open_cache
+from firecrawl_client import FirecrawlClient, FirecrawlError, print_error, require_api_key
+from scrape import collect_urls
+
+DEFAULT_CHUNK_SIZE = 10
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_RETRIES = 1
+
+
+def is_array_type(spec):
+    # A property may be a boolean schema or a bare {"$ref": ...}; only an
+    # explicit "array" type (alone or in a list such as ["array", "null"]) counts.
+    if not isinstance(spec, dict):
+        return False
+    kind = spec.get("type")
+    return kind == "array" or (isinstance(kind, list) and "array" in kind)
+
+
+def array_fields(schema):
+    """Top-level fields to concatenate: the schema's array properties."""
+    properties = schema.get("properties") if isinstance(schema, dict) else None
+    if not isinstance(properties, dict):
+        return set()
+    return {name for name, spec in properties.items() if is_array_type(spec)}
+
+
+def merge_results(results, schema):
+    """Merge (urls, result) chunk results in URL order.
+
+    Array fields are concatenated (and deduped) and every other field keeps its
+    first non-empty value. Without a schema naming array fields the results
+    cannot be combined without loss, so they are returned as a list of
+    {"urls", "data"} objects.
+    """
+    if len(results) == 1:
+        return results[0][1]
+    data = [result for _, result in results]
+    arrays = set()
+    if all(isinstance(result, dict) for result in data):
+        arrays = array_fields(schema)
+    if not arrays:
+        return [{"urls": urls, "data": result} for urls, result in results]
+    merged, seen = {}, {}
+    for result in data:
+        for name, value in result.items():
+            if name in arrays:
+                items = merged.setdefault(name, [])
+                if value is None:
+                    # A nullable array that is null in this chunk adds nothing.
+                    continue
+                keys = seen.setdefault(name, set())
+                for item in value if isinstance(value, list) else [value]:
+                    key = json.dumps(item, sort_keys=True, default=str)
+                    if key not in keys:
+                        keys.add(key)
+                        items.append(item)
+            elif merged.get(name) in (None, "", [], {}):
+                merged[name] = value
+    return merged
+
+
+def is_request_error(error):
+    """4xx responses other than 429 reject the request itself (key, schema,
+    credits), so retrying or splitting the chunk cannot help."""
+    status = getattr(error, "status", None)
+    return isinstance(error, FirecrawlError) and status and 400 <= status < 500 and status != 429
+
+
+def extract_chunk(client, cache, urls, params, retries):
+    """Extract one chunk; split it in half on repeated failure to isolate bad URLs.
+
+    Returns (results, errors): (urls, result) pairs in URL order, errors as
+    {"url", "error"}. Request errors are raised instead, and a chunk whose job
+    may already have started is reported as failed without being resent.
+    """
+    error = None
+    for _ in range(retries + 1):
+        try:
+            result = cached_call(
+                cache, "extract", urls, params, lambda: client.extract(urls, **params)
+            )
+            return [(urls, result)], []
+        except Exception as e:
+            if is_request_error(e):
+                raise
+            if getattr(e, "maybe_processed", False):
+                # The job may be running already; resending would start it twice.
+                return [], [{"url": url, "error": str(e)} for url in urls]
+            error = e
+    if len(urls) == 1:
+        return [], [{"url": urls[0], "error": str(error)}]
+    middle = len(urls) // 2
+    first_results, first_errors = extract_chunk(client, cache, urls[:middle], params, retries)
+    rest_results, rest_errors = extract_chunk(client, cache, urls[middle:], params, retries)
+    return first_results + rest_results, first_errors + rest_errors
 
 
 def main():
@@ -30,9 +135,23 @@ Examples:
   
   %(prog)s "https://example.com/page1" "https://example.com/page2" \\
     --prompt "Extract product information"
+
+  %(prog)s --input-file product-urls.txt --chunk-size 20 --workers 6 \\
+    --prompt "Extract product name and price" \\
+    --schema '{"type":"object","properties":{"products":{"type":"array"}}}'
+
+URL lists longer than --chunk-size are extracted in concurrent chunks. Array
+fields at the top level of --schema are concatenated across chunks; without
+them, "data" is a list of {"urls", "data"} chunk results. URLs that still fail
+after retries are listed under "errors" as {"url", "error"}; 4xx errors other
+than 429 (bad key, schema or credits) end the run immediately.
         """,
     )
-    parser.add_argument("urls", nargs="+", help="URL(s) to extract data from")
+    parser.add_argument("urls", nargs="*", help="URL(s) to extract data from")
+    parser.add_argument(
+        "--input-file",
+        help="File with URLs (one per line, or map.py JSON output); '-' reads stdin",
+    )
     parser.add_argument(
         "--prompt",
         required=True,
@@ -43,21 +162,31 @@ Examples:
         type=str,
         help="JSON schema for structured output (optional)",
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"URLs per extract request (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Chunks extracted concurrently (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--chunk-retries",
+        type=int,
+        default=DEFAULT_CHUNK_RETRIES,
+        help=f"Retries for a failed chunk before it is split (default: {DEFAULT_CHUNK_RETRIES})",
+    )
+
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     # Parse schema if provided
     schema = None
@@ -65,20 +194,21 @@ Examples:
         try:
             schema = json.loads(args.schema)
         except json.JSONDecodeError as e:
-            print(
-                json.dumps(
-                    {
-                        "success": False,
-                        "error": f"Invalid JSON schema: {e}",
-                    }
-                )
-            )
-            sys.exit(1)
+            print_error(f"Invalid JSON schema: {e}")
 
     try:
-        from firecrawl import FirecrawlApp
-
-        app = FirecrawlApp(api_key=api_key)
+        urls = collect_urls(args)
+        if not urls:
+            raise ValueError("No URLs given. Pass URLs as arguments or use --input-file")
+        if args.chunk_size < 1:
+            raise ValueError("--chunk-size must be at least 1")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
+        if args.chunk_retries < 0:
+            raise ValueError("--chunk-retries must not be negative")
+
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key)
 
         params = {
             "prompt": args.prompt,
@@ -86,23 +216,39 @@ Examples:
         if schema:
             params["schema"] = schema
 
-        result = app.extract(args.urls, params=params)
+        chunks = [urls[i : i + args.chunk_size] for i in range(0, len(urls), args.chunk_size)]
+        # A request error fails every chunk alike: stop starting new ones.
+        stop = threading.Event()
+
+        def run_chunk(chunk):
+            if stop.is_set():
+                return [], []
+            try:
+                return extract_chunk(client, cache, chunk, params, args.chunk_retries)
+            except Exception:
+                stop.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            outcomes = list(executor.map(run_chunk, chunks))
+        results = [result for chunk_results, _ in outcomes for result in chunk_results]
+        errors = [error for _, chunk_errors in outcomes for error in chunk_errors]
+        if not results:
+            if len(urls) == 1:
+                raise RuntimeError(errors[0]["error"])
+            failure = {"success": False, "error": f"All {len(urls)} URLs failed", "errors": errors}
+            print(json.dumps(failure, indent=2, default=str))
+            sys.exit(1)
 
-        print(json.dumps({"success": True, "data": result}, indent=2, default=str))
+        output = {"success": True, "data": merge_results(results, schema)}
+        if len(chunks) > 1:
+            output["chunks"] = len(chunks)
+        if errors:
+            output["errors"] = errors
+        print(json.dumps(output, indent=2, default=str))
 
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,261 @@
+"""
+Local content-addressed response cache shared by the Firecrawl scripts.
+
+Responses are stored in a SQLite database keyed by endpoint, normalized
+URL/query and request parameters. Identical bodies are stored once (keyed by
+their SHA-256), every endpoint has its own TTL, and the least recently used
+entries are evicted once the cache grows past its size limit.
+
+Scripts expose the cache through three flags:
+    --cache     read from and write to the cache
+    --refresh   always call the API, then overwrite the cached response
+    --offline   only read from the cache, however old; never call the API or need a key
+
+Environment:
+    FIRECRAWL_CACHE_DIR     cache directory (default: ~/.cache/firecrawl)
+    FIRECRAWL_CACHE_MAX_MB  size limit before LRU eviction (default: 512)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_CACHE_DIR = "~/.cache/firecrawl"
+DEFAULT_MAX_MB = 512
+CACHE_FILENAME = "responses.sqlite3"
+HOUR = 3600
+DAY = 24 * HOUR
+# Search results go stale fastest; LLM extraction is the most expensive to redo.
+DEFAULT_TTLS = {
+    "scrape": DAY,
+    "map": DAY,
+    "crawl": DAY,
+    "search": HOUR,
+    "extract": 7 * DAY,
+    "agent": 7 * DAY,
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+# Returned by ResponseCache.get on a miss, since a cached body may itself be null.
+MISSING = object()
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request has no cached response."""
+
+
+def normalize_url(url):
+    """Canonical form of a URL: lowercase scheme/host, no default port,
+    no fragment, sorted query parameters, and no trailing slash."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def normalize_query(query):
+    return " ".join(query.split()).casefold()
+
+
+def to_jsonable(value):
+    """Normalize request parameters to plain JSON data for canonical keys.
+
+    Tuples and sets become lists and mapping keys become strings; everything
+    else is passed through unchanged.
+    """
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    return value
+
+
+def request_key(endpoint, target, params):
+    if isinstance(target, (list, tuple)):
+        target = [normalize_url(item) for item in target]
+    elif endpoint == "search":
+        target = normalize_query(target)
+    elif target:
+        target = normalize_url(target)
+    canonical = json.dumps(
+        {"endpoint": endpoint, "target": target, "params": to_jsonable(params)},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache; safe to share between threads of one process."""
+
+    def __init__(self, mode="use", directory=None, max_bytes=None, ttl=None):
+        self.mode = mode
+        self.ttl = ttl
+        directory = Path(
+            os.path.expanduser(directory or os.environ.get("FIRECRAWL_CACHE_DIR", DEFAULT_CACHE_DIR))
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("FIRECRAWL_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(
+            str(directory / CACHE_FILENAME), check_same_thread=False, timeout=30
+        )
+        # WAL lets several script processes read while one writes.
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                target TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL
+            );
+            """
+        )
+        self.db.commit()
+
+    def ttl_for(self, endpoint):
+        return self.ttl if self.ttl is not None else DEFAULT_TTLS.get(endpoint, DAY)
+
+    def is_expired(self, endpoint, created_at):
+        # Offline runs replay old results, so only an explicit --cache-ttl limits them.
+        if self.mode == "offline" and self.ttl is None:
+            return False
+        return time.time() - created_at > self.ttl_for(endpoint)
+
+    def get(self, endpoint, target, params):
+        """Return the cached response, or MISSING when absent or expired."""
+        key = request_key(endpoint, target, params)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT entries.created_at, blobs.body FROM entries "
+                "JOIN blobs ON blobs.digest = entries.digest WHERE entries.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or self.is_expired(endpoint, row[0]):
+                return MISSING
+            self.db.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self.db.commit()
+        return json.loads(zlib.decompress(row[1]).decode("utf-8"))
+
+    def put(self, endpoint, target, params, value):
+        body = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        compressed = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        label = json.dumps(target) if isinstance(target, (list, tuple)) else str(target)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR IGNORE INTO blobs (digest, size, body) VALUES (?, ?, ?)",
+                (digest, len(compressed), compressed),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, endpoint, target, digest, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (request_key(endpoint, target, params), endpoint, label, digest, now, now),
+            )
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total > self.max_bytes:
+            oldest = self.db.execute(
+                "SELECT key, digest FROM entries ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            self.db.execute("DELETE FROM entries WHERE key = ?", (oldest[0],))
+            # A body shared by several requests stays until its last entry goes.
+            remaining = self.db.execute(
+                "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (oldest[1],)
+            ).fetchone()
+            if remaining is None:
+                size = self.db.execute(
+                    "SELECT size FROM blobs WHERE digest = ?", (oldest[1],)
+                ).fetchone()
+                self.db.execute("DELETE FROM blobs WHERE digest = ?", (oldest[1],))
+                total -= size[0] if size else 0
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def add_cache_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse cached API responses and cache new ones",
+    )
+    group.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Call the API even if cached, then update the cache",
+    )
+    group.add_argument(
+        "--offline",
+        action="store_true",
+        help="Answer only from the cache; never call the API",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds a cached response stays fresh (default: per endpoint)",
+    )
+
+
+def open_cache(args):
+    """Return a ResponseCache for the parsed cache flags, or None when disabled."""
+    if args.offline:
+        mode = "offline"
+    elif args.refresh:
+        mode = "refresh"
+    elif args.cache:
+        mode = "use"
+    else:
+        return None
+    return ResponseCache(mode=mode, ttl=args.cache_ttl)
+
+
+def cached_call(cache, endpoint, target, params, fetch):
+    """Return the response for a request, consulting the cache per its mode."""
+    if cache is None:
+        return fetch()
+    if cache.mode != "refresh":
+        cached = cache.get(endpoint, target, params)
+        if cached is not MISSING:
+            return cached
+        if cache.mode == "offline":
+            raise CacheMiss(f"No cached {endpoint} response for {target} (offline)")
+    result = fetch()
+    cache.put(endpoint, target, params, result)
+    return result
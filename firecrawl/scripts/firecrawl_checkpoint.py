@@ -0,0 +1,99 @@
+"""
+Checkpoints that let long crawls and bulk scrapes survive restarts.
+
+A checkpoint directory holds one subdirectory per job, named after a hash of
+the job spec (endpoint, normalized URLs and request options):
+
+    <dir>/<spec-hash>/journal.ndjson   one result record per completed URL
+    <dir>/<spec-hash>/state.json       job spec, crawl job ID, progress
+
+The journal is append-only and flushed after every record, and the state file
+is replaced atomically, so a process killed at any point loses at most the
+record it was writing. Re-running the same command reuses the directory and
+skips every URL already in the journal.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from firecrawl_cache import to_jsonable
+
+JOURNAL_FILENAME = "journal.ndjson"
+STATE_FILENAME = "state.json"
+
+
+def spec_digest(spec):
+    canonical = json.dumps(to_jsonable(spec), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    """Append-only result journal plus persisted job state for one job spec."""
+
+    def __init__(self, directory, spec):
+        self.spec = spec
+        self.path = Path(os.path.expanduser(directory)) / spec_digest(spec)[:16]
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.path / JOURNAL_FILENAME
+        self.state_path = self.path / STATE_FILENAME
+        self.state = {"spec": spec, "completed": 0}
+        if self.state_path.exists():
+            with open(self.state_path, encoding="utf-8") as handle:
+                self.state.update(json.load(handle))
+        self.repair_journal()
+        self.completed = set()
+        for record in self.records():
+            self.completed.add(record.get("url"))
+        self.journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def repair_journal(self):
+        # A record cut off by a crash would corrupt the next append; drop it.
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "rb+") as handle:
+            data = handle.read()
+            if data and not data.endswith(b"\n"):
+                handle.truncate(data.rfind(b"\n") + 1)
+
+    def records(self):
+        """Yield journaled successful records, one at a time."""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get("success"):
+                    yield record
+
+    def is_done(self, url):
+        return url in self.completed
+
+    def record(self, record):
+        """Journal a result; only successful records mark their URL as done."""
+        self.journal.write(json.dumps(record, default=str) + "\n")
+        self.journal.flush()
+        if record.get("success"):
+            self.completed.add(record.get("url"))
+            self.state["completed"] = len(self.completed)
+
+    def save(self, **updates):
+        """Persist job state atomically (write a temp file, then rename over)."""
+        self.state.update(updates)
+        self.state["updated_at"] = time.time()
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        temp_path = self.state_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.state, handle, indent=2, default=str)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, self.state_path)
+
+    def close(self):
+        self.save()
+        self.journal.close()
@@ -0,0 +1,306 @@
+"""
+Shared Firecrawl REST client used by all Firecrawl scripts.
+
+One client per process keeps a keep-alive HTTPS connection per thread, so bulk
+modes pay for a TLS handshake once per worker instead of once per page. Every
+request goes through a process-wide rate limiter and is retried with
+exponential backoff on 429 and 5xx responses, honouring `Retry-After`.
+POSTs that start a crawl, extract or agent job are not idempotent: they are
+only resent after a 429 or when sending failed, so a job the server already
+accepted is never started (and charged) twice.
+
+Requests use the v1 REST endpoints, whose responses the scripts' JSON output
+is built from. The agent endpoint only exists on v2, so `agent` calls
+/v2/agent; agent.py falls back to extract where it answers 404.
+
+Environment:
+    FIRECRAWL_API_KEY      API key (required unless answering --offline)
+    FIRECRAWL_API_URL      API base URL (default: https://api.firecrawl.dev)
+    FIRECRAWL_MAX_RETRIES  retries after the first attempt (default: 4)
+    FIRECRAWL_TIMING       set to 1 to log one JSON line per request to stderr
+"""
+
+import email.utils
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_API_URL = "https://api.firecrawl.dev"
+DEFAULT_TIMEOUT = 120
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+POLL_SECONDS = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FirecrawlError(Exception):
+    """Raised when the API rejects a request or a job fails.
+
+    `maybe_processed` is set when a non-idempotent request failed after it was
+    sent, so the server may have started its job; sending it again risks a
+    duplicate.
+    """
+
+    def __init__(self, message, status=None, maybe_processed=False):
+        super().__init__(message)
+        self.status = status
+        self.maybe_processed = maybe_processed
+
+
+class RateLimiter:
+    """Space calls evenly so that no more than `rate` start per second."""
+
+    def __init__(self, rate=0):
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def defer(self, seconds):
+        # A 429 applies to every worker, not only the one that received it.
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+def print_error(message):
+    print(json.dumps({"success": False, "error": message}))
+    sys.exit(1)
+
+
+def require_api_key(offline=False):
+    """Return FIRECRAWL_API_KEY, or print the error JSON and exit when it is missing."""
+    api_key = os.environ.get("FIRECRAWL_API_KEY")
+    if not api_key and not offline:
+        print_error("FIRECRAWL_API_KEY environment variable not set")
+    return api_key
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class FirecrawlClient:
+    """Thread-safe Firecrawl API client with connection reuse, retries and rate limiting."""
+
+    def __init__(self, api_key=None, base_url=None, rps=0, timeout=DEFAULT_TIMEOUT, max_retries=None):
+        self.api_key = api_key
+        parts = urlsplit(base_url or os.environ.get("FIRECRAWL_API_URL", DEFAULT_API_URL))
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        if max_retries is None:
+            max_retries = int(os.environ.get("FIRECRAWL_MAX_RETRIES", DEFAULT_MAX_RETRIES))
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rps)
+        self.log_timing = os.environ.get("FIRECRAWL_TIMING", "") not in ("", "0")
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            factory = (
+                http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            )
+            conn = factory(self.host, self.port, timeout=self.timeout)
+            self.local.conn = conn
+        return conn
+
+    def reset_connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def request(self, method, path, payload=None, idempotent=True):
+        """Send one API request and return the decoded JSON body.
+
+        Non-idempotent requests are retried only on 429 and on errors raised
+        before the request was sent; a timeout, dropped connection or 5xx after
+        that is raised, since the server may already have acted on it.
+        """
+        if not self.api_key:
+            raise FirecrawlError("FIRECRAWL_API_KEY environment variable not set")
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        headers = {"Authorization": f"Bearer {self.api_key}", "Accept": "application/json"}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire()
+            status, retry_after, error, sent = None, None, None, False
+            try:
+                if not idempotent:
+                    # A stale keep-alive connection would fail only after the
+                    # request was written, which cannot be told apart from a
+                    # real failure, so job-starting requests get a fresh one.
+                    self.reset_connection()
+                conn = self.connection()
+                conn.request(method, self.prefix + path, body=body, headers=headers)
+                sent = True
+                response = conn.getresponse()
+                status = response.status
+                raw = response.read()
+                retry_after = retry_after_seconds(response.getheader("Retry-After"))
+                if response.will_close:
+                    self.reset_connection()
+            except (OSError, http.client.HTTPException) as e:
+                # Stale keep-alive connections surface here; reconnect and retry.
+                self.reset_connection()
+                error = FirecrawlError(
+                    f"{method} {path} failed: {e}", maybe_processed=sent and not idempotent
+                )
+            retry_statuses = RETRY_STATUSES if idempotent else {429}
+            if error is None and status not in retry_statuses:
+                break
+            if attempt > self.max_retries or (error is not None and sent and not idempotent):
+                if error is None:
+                    error = FirecrawlError(self.error_message(status, raw), status)
+                self.log(method, path, status, attempt, started)
+                raise error
+            delay = retry_after
+            if delay is None:
+                delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+            if status == 429:
+                self.limiter.defer(delay)
+            time.sleep(delay)
+        self.log(method, path, status, attempt, started)
+        if status >= 400:
+            raise FirecrawlError(
+                self.error_message(status, raw), status, status >= 500 and not idempotent
+            )
+        return json.loads(raw.decode("utf-8")) if raw else {}
+
+    @staticmethod
+    def error_message(status, raw):
+        try:
+            message = json.loads(raw.decode("utf-8")).get("error")
+        except (ValueError, AttributeError):
+            message = None
+        return f"HTTP {status}: {message or raw[:200].decode('utf-8', 'replace')}"
+
+    def log(self, method, path, status, attempts, started):
+        if not self.log_timing:
+            return
+        record = {
+            "method": method,
+            "path": path,
+            "status": status,
+            "attempts": attempts,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+        }
+        sys.stderr.write(json.dumps(record) + "\n")
+
+    def wait_for_job(self, path):
+        """Poll a job status endpoint until the job finishes."""
+        while True:
+            status = self.request("GET", path)
+            state = status.get("status")
+            if state == "failed":
+                raise FirecrawlError(status.get("error") or f"Job {path} failed")
+            if state not in ("scraping", "processing", "pending", "queued"):
+                break
+            time.sleep(POLL_SECONDS)
+        return status
+
+    def stream_crawl(self, job_id, skip=0, poll_seconds=POLL_SECONDS):
+        """Yield (status, documents) batches of a crawl job as its pages complete.
+
+        Pages are requested from offset `skip` onwards and only one response
+        page is held at a time, so memory does not grow with the crawl size.
+        """
+        while True:
+            body = self.request("GET", f"/v1/crawl/{job_id}?skip={skip}")
+            while True:
+                documents = body.pop("data", None) or []
+                next_url = body.pop("next", None)
+                skip += len(documents)
+                yield body, documents
+                if not next_url:
+                    break
+                body = self.request("GET", self.relative_path(next_url))
+            state = body.get("status")
+            if state == "failed":
+                raise FirecrawlError(body.get("error") or f"Crawl {job_id} failed")
+            if state not in ("scraping", "processing", "pending", "queued"):
+                return
+            time.sleep(poll_seconds)
+
+    def relative_path(self, url):
+        parts = urlsplit(url)
+        path = parts.path
+        if self.prefix and path.startswith(self.prefix):
+            path = path[len(self.prefix):]
+        return path + (f"?{parts.query}" if parts.query else "")
+
+    def scrape(self, url, formats=("markdown",), only_main_content=False):
+        body = self.request(
+            "POST",
+            "/v1/scrape",
+            {"url": url, "formats": list(formats), "onlyMainContent": only_main_content},
+        )
+        return body.get("data")
+
+    def search(self, query, limit=10):
+        return self.request("POST", "/v1/search", {"query": query, "limit": limit}).get("data")
+
+    def map(self, url, **options):
+        body = self.request("POST", "/v1/map", {"url": url, **options})
+        return {"links": body.get("links", [])}
+
+    def start_crawl(self, url, **options):
+        body = self.request("POST", "/v1/crawl", {"url": url, **options}, idempotent=False)
+        return {"id": body.get("id"), "url": body.get("url")}
+
+    def crawl(self, url, **options):
+        job = self.start_crawl(url, **options)
+        status, documents = {}, []
+        for status, batch in self.stream_crawl(job["id"]):
+            documents.extend(batch)
+        status["data"] = documents
+        return status
+
+    def extract(self, urls, **options):
+        body = self.request("POST", "/v1/extract", {"urls": urls, **options}, idempotent=False)
+        if "id" in body and "data" not in body:
+            body = self.wait_for_job(f"/v1/extract/{body['id']}")
+        return body.get("data")
+
+    def agent(self, prompt, **options):
+        body = self.request("POST", "/v2/agent", {"prompt": prompt, **options}, idempotent=False)
+        if "id" in body and "data" not in body:
+            body = self.wait_for_job(f"/v2/agent/{body['id']}")
+        return body.get("data")
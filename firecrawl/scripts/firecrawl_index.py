@@ -0,0 +1,178 @@
+"""
+Page index for incremental recrawls.
+
+The index is a SQLite file mapping each normalized URL to the hash of its last
+scraped content plus the cheap change signals seen at that time: the sitemap
+`lastmod` value and the page's `ETag` / `Last-Modified` response headers. A
+later run compares fresh signals against it to decide, without calling the
+Firecrawl API, which pages can be skipped.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from firecrawl_cache import normalize_url
+
+ORIGIN_TIMEOUT = 15
+SITEMAP_MAX_FILES = 50
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+USER_AGENT = "firecrawl-skill-incremental/1.0"
+
+
+def content_hash(document):
+    """Hash page content with whitespace collapsed, so reflowed text is not a change."""
+    text = ""
+    if isinstance(document, dict):
+        text = document.get("markdown") or document.get("html") or document.get("rawHtml") or ""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+def origin_request(url, method="GET"):
+    request = urllib.request.Request(url, method=method, headers={"User-Agent": USER_AGENT})
+    return urllib.request.urlopen(request, timeout=ORIGIN_TIMEOUT)
+
+
+def sitemap_lastmods(base_url):
+    """Return {normalized URL: lastmod} from the site's sitemap(s); {} if unavailable."""
+    parts = urlsplit(base_url)
+    pending = [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+    seen, lastmods = set(), {}
+    while pending and len(seen) < SITEMAP_MAX_FILES:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        try:
+            with origin_request(sitemap_url) as response:
+                root = ElementTree.fromstring(response.read())
+        except (OSError, urllib.error.URLError, ElementTree.ParseError, ValueError):
+            continue
+        # A sitemap index lists further sitemaps; a urlset lists pages.
+        for sitemap in root.iter(f"{SITEMAP_NS}sitemap"):
+            location = sitemap.findtext(f"{SITEMAP_NS}loc")
+            if location:
+                pending.append(urljoin(sitemap_url, location.strip()))
+        for entry in root.iter(f"{SITEMAP_NS}url"):
+            location = entry.findtext(f"{SITEMAP_NS}loc")
+            lastmod = entry.findtext(f"{SITEMAP_NS}lastmod")
+            if location and lastmod:
+                lastmods[normalize_url(location)] = lastmod.strip()
+    return lastmods
+
+
+def head_validators(url):
+    """Return the page's ETag / Last-Modified headers, or None if HEAD fails."""
+    try:
+        with origin_request(url, method="HEAD") as response:
+            headers = response.headers
+    except (OSError, urllib.error.URLError, ValueError):
+        return None
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+class PageIndex:
+    """SQLite-backed URL -> content hash index; safe to share between threads."""
+
+    def __init__(self, path):
+        path = Path(os.path.expanduser(path))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                lastmod TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_changed REAL NOT NULL
+            );
+            """
+        )
+        self.db.commit()
+
+    def get(self, url):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT content_hash, lastmod, etag, last_modified FROM pages WHERE url = ?",
+                (normalize_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "lastmod": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def unchanged(self, entry, lastmod=None, validators=None):
+        """True when a sitemap lastmod or origin validator matches the indexed page."""
+        if entry is None:
+            return False
+        if lastmod and entry["lastmod"] == lastmod:
+            return True
+        if validators:
+            if validators.get("etag") and entry["etag"] == validators["etag"]:
+                return True
+            if validators.get("last_modified") and entry["last_modified"] == validators["last_modified"]:
+                return True
+        return False
+
+    def touch(self, url, now):
+        with self.lock:
+            self.db.execute(
+                "UPDATE pages SET last_seen = ? WHERE url = ?", (now, normalize_url(url))
+            )
+            self.db.commit()
+
+    def update(self, url, digest, now, lastmod=None, validators=None):
+        """Record a scraped page; return "new", "changed" or "unchanged"."""
+        validators = validators or {}
+        key = normalize_url(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT content_hash, first_seen, last_changed FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                change, first_seen, last_changed = "new", now, now
+            elif row[0] != digest:
+                change, first_seen, last_changed = "changed", row[1], now
+            else:
+                change, first_seen, last_changed = "unchanged", row[1], row[2]
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, content_hash, lastmod, etag, last_modified, first_seen, last_seen, last_changed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    digest,
+                    lastmod,
+                    validators.get("etag"),
+                    validators.get("last_modified"),
+                    first_seen,
+                    now,
+                    last_changed,
+                ),
+            )
+            self.db.commit()
+        return change
+
+    def missing(self, prefix, since):
+        """URLs under `prefix` that were indexed before but not seen in this run."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT url FROM pages WHERE url LIKE ? ESCAPE '\\' AND last_seen < ?",
+                (prefix.replace("%", r"\%").replace("_", r"\_") + "%", since),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -13,8 +13,9 @@ Examples:
 
 import argparse
 import json
-import os
-import sys
+
+from firecrawl_cache import add_cache_arguments, cached_call, open_cache
+from firecrawl_client import FirecrawlClient, print_error, require_api_key
 
 
 def main():
@@ -41,47 +42,29 @@ Examples:
         help="Filter URLs containing this keyword",
     )
 
+    add_cache_arguments(parser)
+
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     try:
-        from firecrawl import FirecrawlApp
-
-        app = FirecrawlApp(api_key=api_key)
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key)
 
         params = {"limit": args.limit}
         if args.search:
             params["search"] = args.search
 
-        result = app.map_url(args.url, params=params)
+        result = cached_call(
+            cache, "map", args.url, params, lambda: client.map(args.url, **params)
+        )
 
         print(json.dumps({"success": True, "data": result}, indent=2, default=str))
 
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
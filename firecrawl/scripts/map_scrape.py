@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Map a website, pick the most relevant URLs, and scrape them concurrently.
+
+Usage:
+    map_scrape.py <url> [--search "keyword"] [--include GLOB] [--exclude GLOB]
+                  [--include-regex RE] [--exclude-regex RE]
+                  [--prioritize depth|keyword] [--keywords "a,b"]
+                  [--budget N] [--workers N] [--rps N] [--dry-run]
+
+URLs from map are filtered, deduplicated after normalization, ranked, cut to
+the page budget and then scraped with the same concurrent bulk mode as
+scrape.py: one JSON object per line is streamed as each page completes.
+
+Examples:
+    map_scrape.py "https://docs.example.com" --include "/api/*" --budget 50
+    map_scrape.py "https://docs.example.com" --search auth --prioritize keyword
+    map_scrape.py "https://example.com" --exclude "*/blog/*" --dry-run
+"""
+
+import argparse
+import json
+import re
+import sys
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+from firecrawl_cache import add_cache_arguments, cached_call, normalize_url, open_cache
+from firecrawl_client import FirecrawlClient, print_error, require_api_key
+from scrape import DEFAULT_WORKERS, open_checkpoint, scrape_bulk
+
+DEFAULT_MAP_LIMIT = 1000
+DEFAULT_BUDGET = 50
+
+
+def link_entries(links):
+    """Yield (url, text) pairs from map links given as strings or {url, title, ...} dicts."""
+    for link in links:
+        if isinstance(link, dict):
+            text = " ".join(str(link.get(key) or "") for key in ("title", "description"))
+            yield link.get("url"), text
+        else:
+            yield link, ""
+
+
+def url_matches(url, globs, patterns):
+    # Globs match the URL path ("/docs/*") or the whole URL; regexes search the whole URL.
+    path = urlsplit(url).path or "/"
+    return any(fnmatch(path, glob) or fnmatch(url, glob) for glob in globs) or any(
+        pattern.search(url) for pattern in patterns
+    )
+
+
+def path_depth(url):
+    return len([part for part in urlsplit(url).path.split("/") if part])
+
+
+def keyword_score(url, text, keywords):
+    haystack = (urlsplit(url).path + " " + text).lower()
+    return sum(haystack.count(keyword) for keyword in keywords)
+
+
+def select_urls(links, args):
+    """Filter, dedupe and rank mapped URLs; return (selected URLs, stage counts)."""
+    include_patterns = [re.compile(pattern) for pattern in args.include_regex]
+    exclude_patterns = [re.compile(pattern) for pattern in args.exclude_regex]
+    keywords = [word.strip().lower() for word in (args.keywords or args.search or "").split(",")]
+    keywords = [word for word in keywords if word]
+    counts = {"mapped": 0, "filtered": 0, "unique": 0}
+    candidates = {}
+    for url, text in link_entries(links):
+        if not url:
+            continue
+        counts["mapped"] += 1
+        if args.include or include_patterns:
+            if not url_matches(url, args.include, include_patterns):
+                continue
+        if url_matches(url, args.exclude, exclude_patterns):
+            continue
+        counts["filtered"] += 1
+        key = normalize_url(url)
+        if key not in candidates:
+            candidates[key] = (len(candidates), url, text)
+    counts["unique"] = len(candidates)
+
+    def rank(item):
+        order, url, text = item
+        if args.prioritize == "keyword":
+            return (-keyword_score(url, text, keywords), path_depth(url), order)
+        return (path_depth(url), order)
+
+    ranked = sorted(candidates.values(), key=rank)
+    selected = [url for _, url, _ in ranked[: args.budget]]
+    counts["selected"] = len(selected)
+    return selected, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Map a website, filter and rank its URLs, then scrape them",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s "https://docs.example.com" --include "/api/*" --budget 50
+  %(prog)s "https://docs.example.com" --search auth --prioritize keyword
+  %(prog)s "https://example.com" --exclude "*/blog/*" --exclude-regex "[?]page=" --dry-run
+  %(prog)s "https://docs.example.com" --budget 500 --workers 8 --rps 5 > pages.ndjson
+
+Globs (--include/--exclude) match the URL path or the full URL; regexes are
+searched in the full URL. Both flags can be repeated. --prioritize depth (the
+default) scrapes shallow pages first; --prioritize keyword ranks by how often
+--keywords (default: the --search term) occur in the URL, title and description.
+Scraped pages are printed as one JSON object per line, exactly like
+scrape.py bulk mode; the selection counts are written to stderr first.
+        """,
+    )
+    parser.add_argument("url", help="Base URL to map")
+    parser.add_argument(
+        "--search",
+        type=str,
+        help="Filter mapped URLs by this keyword (map option)",
+    )
+    parser.add_argument(
+        "--map-limit",
+        type=int,
+        default=DEFAULT_MAP_LIMIT,
+        help=f"Maximum number of URLs to request from map (default: {DEFAULT_MAP_LIMIT})",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Keep only URLs matching this glob (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Drop URLs matching this glob (repeatable)",
+    )
+    parser.add_argument(
+        "--include-regex",
+        action="append",
+        default=[],
+        metavar="RE",
+        help="Keep only URLs matching this regex (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude-regex",
+        action="append",
+        default=[],
+        metavar="RE",
+        help="Drop URLs matching this regex (repeatable)",
+    )
+    parser.add_argument(
+        "--prioritize",
+        choices=["depth", "keyword"],
+        default="depth",
+        help="Rank URLs by path depth or keyword score before the budget (default: depth)",
+    )
+    parser.add_argument(
+        "--keywords",
+        type=str,
+        help="Comma-separated keywords for --prioritize keyword",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=DEFAULT_BUDGET,
+        help=f"Maximum number of pages to scrape (default: {DEFAULT_BUDGET})",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["markdown", "html"],
+        default="markdown",
+        help="Output format (default: markdown)",
+    )
+    parser.add_argument(
+        "--only-main",
+        action="store_true",
+        help="Extract only main content (removes headers, footers, etc.)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent scrapes (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=0,
+        help="Maximum API requests started per second (default: unlimited)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="DIR",
+        help="Journal results under DIR so a rerun of the same job skips finished URLs",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the selected URLs (map.py JSON shape) instead of scraping them",
+    )
+
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+
+    # Check for API key
+    api_key = require_api_key(args.offline)
+
+    try:
+        if args.budget < 1:
+            raise ValueError("--budget must be at least 1")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
+        if args.rps < 0:
+            raise ValueError("--rps must not be negative")
+
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key, rps=args.rps)
+
+        params = {"limit": args.map_limit}
+        if args.search:
+            params["search"] = args.search
+        mapped = cached_call(
+            cache, "map", args.url, params, lambda: client.map(args.url, **params)
+        )
+        urls, counts = select_urls(mapped.get("links", []), args)
+
+        if args.dry_run:
+            data = {"links": urls, "counts": counts}
+            print(json.dumps({"success": True, "data": data}, indent=2))
+            return
+
+        sys.stderr.write(json.dumps(counts) + "\n")
+        sys.stderr.flush()
+        checkpoint = open_checkpoint(urls, args) if args.checkpoint else None
+        if scrape_bulk(client, cache, urls, args, checkpoint):
+            sys.exit(1)
+
+    except Exception as e:
+        print_error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Firecrawl API, for offline integration tests and benchmarks.
+
+Usage:
+    mock_server.py [--fixtures DIR] [--port N] [--latency MS] [--jitter MS]
+                   [--error-rate P] [--rate-limit-rate P] [--max-rps N] [--seed N]
+
+Serves the search, scrape, map, crawl and extract endpoints the scripts use
+(under both /v1 and /v2) from a fixture directory:
+
+    DIR/pages/<host>/<path>.md     page markdown; index.md is the directory URL
+    DIR/pages/<host>/<path>.html   page HTML (markdown is derived from its text)
+    DIR/search.json                {"query": [{"url", "title", "description"}, ...]}
+    DIR/extract.json               {"url": {extracted fields}, ...}
+
+Queries and hosts without fixtures get deterministic generated responses
+(unless --strict), so bulk runs can be load-tested against any URL list;
+a URL on a fixture host that has no page file answers 404.
+Point the scripts at the server with FIRECRAWL_API_URL; any API key is
+accepted unless --api-key is given. GET /_stats reports request, status and
+connection counts. smoke_test.py runs every script against it.
+
+Examples:
+    mock_server.py --fixtures fixtures/ --port 3002
+    mock_server.py --latency 300 --jitter 100 --rate-limit-rate 0.05 --error-rate 0.02
+    FIRECRAWL_API_URL=http://127.0.0.1:3002 FIRECRAWL_API_KEY=test scrape.py --input-file urls.txt
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from firecrawl_cache import normalize_query, normalize_url
+
+DEFAULT_PORT = 3002
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_CRAWL_PPS = 20.0
+DEFAULT_SYNTHETIC_PAGES = 100
+JOB_PATH = re.compile(r"^/(v[12])/(crawl|extract)/([\w-]+)$")
+
+
+class TextExtractor(HTMLParser):
+    """Collect the <title> and visible text of an HTML fixture."""
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.parts = []
+        self.stack = []
+
+    def handle_starttag(self, tag, attrs):
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.stack:
+            del self.stack[self.stack.index(tag):]
+
+    def handle_data(self, data):
+        if "title" in self.stack:
+            self.title += data.strip()
+        elif not {"script", "style"} & set(self.stack) and data.strip():
+            self.parts.append(data.strip())
+
+
+class Fixtures:
+    """Pages, search results and extract data loaded from a fixture directory."""
+
+    def __init__(self, directory=None, synthetic_pages=DEFAULT_SYNTHETIC_PAGES, strict=False):
+        self.pages = {}
+        self.search = {}
+        self.extract = {}
+        self.synthetic_pages = synthetic_pages
+        self.strict = strict
+        if directory:
+            self.load(Path(directory))
+
+    def load(self, root):
+        pages_root = root / "pages"
+        if pages_root.is_dir():
+            for path in sorted(pages_root.rglob("*")):
+                if path.suffix in (".md", ".html") and path.is_file():
+                    self.add_page(pages_root, path)
+        if (root / "search.json").is_file():
+            entries = json.loads((root / "search.json").read_text(encoding="utf-8"))
+            self.search = {normalize_query(query): items for query, items in entries.items()}
+        if (root / "extract.json").is_file():
+            entries = json.loads((root / "extract.json").read_text(encoding="utf-8"))
+            self.extract = {normalize_url(url): data for url, data in entries.items()}
+
+    def add_page(self, pages_root, path):
+        host, *parts = path.relative_to(pages_root).with_suffix("").parts
+        if parts and parts[-1] == "index":
+            parts[-1] = ""
+        url = f"https://{host}/" + "/".join(parts)
+        text = path.read_text(encoding="utf-8")
+        if path.suffix == ".html":
+            extractor = TextExtractor()
+            extractor.feed(text)
+            markdown = "\n\n".join(extractor.parts)
+            page = {"html": text, "markdown": markdown, "title": extractor.title}
+        else:
+            heading = re.search(r"^#\s+(.+)$", text, re.MULTILINE)
+            page = {"markdown": text, "title": heading.group(1).strip() if heading else ""}
+        self.pages[normalize_url(url)] = {"url": url, **page}
+
+    def has_host(self, host):
+        return any(urlsplit(key).netloc == host for key in self.pages)
+
+    def page(self, url):
+        """Return the fixture page for a URL, a generated one, or None under --strict."""
+        page = self.pages.get(normalize_url(url))
+        if page is not None or self.strict or self.has_host(urlsplit(url).netloc.lower()):
+            return page
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:12]
+        title = f"Generated page {digest}"
+        markdown = f"# {title}\n\nContent of {url}.\n"
+        return {"url": url, "markdown": markdown, "title": title}
+
+    def site_urls(self, base_url):
+        """URLs under base_url: fixture pages, or a generated site for unknown hosts."""
+        key = normalize_url(base_url)
+        host = urlsplit(key).netloc
+        if self.has_host(host):
+            prefix = key.rstrip("/")
+            return sorted(
+                page["url"]
+                for page_key, page in self.pages.items()
+                if page_key == prefix or page_key.startswith(prefix + "/")
+            )
+        if self.strict:
+            return []
+        root = f"{urlsplit(key).scheme or 'https'}://{host}"
+        return [f"{root}/"] + [f"{root}/page-{i}" for i in range(1, self.synthetic_pages)]
+
+    def search_results(self, query, limit):
+        items = self.search.get(normalize_query(query))
+        if items is None:
+            terms = normalize_query(query).split()
+            scored = []
+            for order, page in enumerate(self.pages.values()):
+                haystack = (page["url"] + " " + page["markdown"]).casefold()
+                score = sum(haystack.count(term) for term in terms)
+                if score:
+                    scored.append((-score, order, page))
+            items = [
+                {"url": page["url"], "title": page["title"], "description": page["markdown"][:160]}
+                for _, _, page in sorted(scored, key=lambda item: item[:2])
+            ]
+            if not items and not self.strict:
+                slug = "-".join(terms) or "query"
+                items = [
+                    {
+                        "url": f"https://example.com/search/{slug}/{rank}",
+                        "title": f"{query} - result {rank}",
+                        "description": f"Generated result {rank} for {query}",
+                    }
+                    for rank in range(1, limit + 1)
+                ]
+        return items[:limit]
+
+    def extract_data(self, urls, schema):
+        """Merge per-URL fixture data (or schema-shaped stubs) like a multi-URL extract.
+
+        Raises KeyError naming the URLs that have neither extract data nor a page.
+        """
+        merged, missing = {}, []
+        for url in urls:
+            data = self.extract.get(normalize_url(url))
+            if data is None:
+                page = self.page(url)
+                if page is None:
+                    missing.append(url)
+                    continue
+                data = schema_stub(schema, page) if schema else {"url": url, "title": page["title"]}
+            for key, value in data.items():
+                if isinstance(value, list):
+                    merged.setdefault(key, []).extend(value)
+                else:
+                    merged.setdefault(key, value)
+        if missing:
+            raise KeyError(", ".join(missing))
+        return merged
+
+
+def schema_stub(schema, page):
+    """Fill a JSON schema with placeholder values taken from a page."""
+    if not isinstance(schema, dict):
+        # Boolean schemas (true/false) accept anything.
+        return page["title"] or page["url"]
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((item for item in kind if item != "null"), None)
+    if kind == "object" or "properties" in schema:
+        return {
+            name: schema_stub(prop, page) for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [schema_stub(schema.get("items", {}), page)]
+    if kind in ("number", "integer"):
+        return 0
+    if kind == "boolean":
+        return False
+    return page["title"] or page["url"]
+
+
+def page_document(page, formats):
+    document = {
+        "metadata": {
+            "title": page["title"],
+            "sourceURL": page["url"],
+            "url": page["url"],
+            "statusCode": 200,
+        }
+    }
+    for name in formats or ["markdown"]:
+        if name == "markdown":
+            document["markdown"] = page["markdown"]
+        elif name in ("html", "rawHtml"):
+            fallback = f"<html><body><pre>{page['markdown']}</pre></body></html>"
+            document[name] = page.get("html") or fallback
+    return document
+
+
+def path_depth(url):
+    return len([part for part in urlsplit(url).path.split("/") if part])
+
+
+class FaultInjector:
+    """Latency, random 5xx/429 responses and an optional requests-per-second ceiling."""
+
+    def __init__(self, args):
+        self.latency = args.latency / 1000.0
+        self.jitter = args.jitter / 1000.0
+        self.error_rate = args.error_rate
+        self.rate_limit_rate = args.rate_limit_rate
+        self.max_rps = args.max_rps
+        self.retry_after = args.retry_after
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.window = []
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        return max(0.0, self.latency + jitter)
+
+    def fault(self):
+        """Return (status, body, headers) for an injected failure, or None."""
+        headers = {"Retry-After": str(self.retry_after)}
+        with self.lock:
+            now = time.monotonic()
+            if self.max_rps:
+                self.window = [moment for moment in self.window if now - moment < 1.0]
+                if len(self.window) >= self.max_rps:
+                    return 429, {"success": False, "error": "Rate limit exceeded"}, headers
+                self.window.append(now)
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return 429, {"success": False, "error": "Rate limit exceeded (injected)"}, headers
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503, {"success": False, "error": "Service unavailable (injected)"}, {}
+        return None
+
+
+class MockState:
+    """Shared server state: fixtures, fault settings, crawl/extract jobs and counters."""
+
+    def __init__(self, fixtures, faults, args):
+        self.fixtures = fixtures
+        self.faults = faults
+        self.api_key = args.api_key
+        self.page_size = args.page_size
+        self.crawl_pps = args.crawl_pps
+        self.log = args.log
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.counts = {"requests": {}, "statuses": {}, "connections": 0}
+
+    def new_job(self, job):
+        with self.lock:
+            job_id = f"mock-{len(self.jobs) + 1}"
+            self.jobs[job_id] = {**job, "started": time.monotonic()}
+        return job_id
+
+    def count(self, group, key):
+        with self.lock:
+            counter = self.counts[group]
+            counter[key] = counter.get(key, 0) + 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FirecrawlMock/1.0"
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.counts["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(raw)
+        state = self.server.state
+        state.count("statuses", str(status))
+        if state.log:
+            record = {"method": self.command, "path": self.path, "status": status}
+            sys.stderr.write(json.dumps(record) + "\n")
+
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return "http://" + (self.headers.get("Host") or f"{host}:{port}")
+
+    def do_GET(self):
+        if self.path == "/_stats":
+            with self.server.state.lock:
+                counts = json.loads(json.dumps(self.server.state.counts))
+            return self.send_json(200, counts)
+        self.dispatch(None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.send_json(400, {"success": False, "error": "Invalid JSON body"})
+        self.dispatch(payload)
+
+    def dispatch(self, payload):
+        state = self.server.state
+        parts = urlsplit(self.path)
+        endpoint = JOB_PATH.sub(r"/\1/\2/{id}", parts.path)
+        state.count("requests", f"{self.command} {endpoint}")
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer ") or (
+            state.api_key and authorization != f"Bearer {state.api_key}"
+        ):
+            return self.send_json(401, {"success": False, "error": "Unauthorized"})
+        time.sleep(state.faults.delay())
+        fault = state.faults.fault()
+        if fault:
+            return self.send_json(*fault)
+        try:
+            if payload is None:
+                match = JOB_PATH.match(parts.path)
+                if not match:
+                    return self.send_json(404, {"success": False, "error": "Not found"})
+                version, kind, job_id = match.groups()
+                query = parse_qs(parts.query)
+                skip = int(query.get("skip", ["0"])[0])
+                return self.send_json(*self.job_status(version, kind, job_id, skip))
+            route = {
+                "/v1/scrape": self.scrape,
+                "/v2/scrape": self.scrape,
+                "/v1/search": self.search,
+                "/v2/search": self.search,
+                "/v1/map": self.map,
+                "/v2/map": self.map,
+                "/v1/crawl": self.crawl,
+                "/v2/crawl": self.crawl,
+                "/v1/extract": self.extract,
+                "/v2/extract": self.extract,
+            }.get(parts.path)
+            if route is None:
+                return self.send_json(404, {"success": False, "error": "Not found"})
+            return self.send_json(*route(parts.path[1:3], payload))
+        except (KeyError, TypeError, ValueError) as e:
+            return self.send_json(400, {"success": False, "error": f"Bad request: {e}"})
+
+    def scrape(self, version, payload):
+        page = self.server.state.fixtures.page(payload["url"])
+        if page is None:
+            return 404, {"success": False, "error": f"No fixture for {payload['url']}"}
+        return 200, {"success": True, "data": page_document(page, payload.get("formats"))}
+
+    def search(self, version, payload):
+        fixtures = self.server.state.fixtures
+        items = fixtures.search_results(payload["query"], int(payload.get("limit") or 5))
+        return 200, {"success": True, "data": {"web": items} if version == "v2" else items}
+
+    def map(self, version, payload):
+        fixtures = self.server.state.fixtures
+        urls = fixtures.site_urls(payload["url"])
+        search = (payload.get("search") or "").casefold()
+        if search:
+            urls = [url for url in urls if search in url.casefold()]
+        urls = urls[: int(payload.get("limit") or 5000)]
+        if version == "v2":
+            links = []
+            for url in urls:
+                page = fixtures.page(url)
+                links.append({"url": url, "title": page["title"] if page else None})
+            return 200, {"success": True, "links": links}
+        return 200, {"success": True, "links": urls}
+
+    def crawl(self, version, payload):
+        urls = self.server.state.fixtures.site_urls(payload["url"])
+        max_depth = payload.get("maxDepth") or payload.get("maxDiscoveryDepth")
+        if max_depth is not None:
+            base_depth = path_depth(payload["url"])
+            urls = [url for url in urls if path_depth(url) - base_depth <= int(max_depth)]
+        urls = urls[: int(payload.get("limit") or 10000)]
+        formats = (payload.get("scrapeOptions") or {}).get("formats")
+        job_id = self.server.state.new_job({"kind": "crawl", "urls": urls, "formats": formats})
+        status_url = f"{self.base_url()}/{version}/crawl/{job_id}"
+        return 200, {"success": True, "id": job_id, "url": status_url}
+
+    def extract(self, version, payload):
+        try:
+            data = self.server.state.fixtures.extract_data(payload["urls"], payload.get("schema"))
+        except KeyError as e:
+            # Like the real API, unreachable URLs fail the job rather than the
+            # request, so clients can still tell them apart from a 4xx.
+            job = {"kind": "extract", "error": f"No fixture for {e.args[0]}"}
+        else:
+            job = {"kind": "extract", "data": data}
+        job_id = self.server.state.new_job(job)
+        return 200, {"success": True, "id": job_id}
+
+    def job_status(self, version, kind, job_id, skip):
+        state = self.server.state
+        job = state.jobs.get(job_id)
+        if job is None or job["kind"] != kind:
+            return 404, {"success": False, "error": "Job not found"}
+        if kind == "extract":
+            if "error" in job:
+                return 200, {"success": False, "status": "failed", "error": job["error"]}
+            return 200, {"success": True, "status": "completed", "data": job["data"]}
+        # Crawl pages "finish" at --crawl-pps so clients see a job in progress.
+        total = len(job["urls"])
+        elapsed = time.monotonic() - job["started"]
+        done = min(total, int(elapsed * state.crawl_pps)) if state.crawl_pps else total
+        end = min(done, skip + state.page_size)
+        documents = []
+        for url in job["urls"][skip:end]:
+            page = state.fixtures.page(url)
+            if page is not None:
+                documents.append(page_document(page, job["formats"]))
+        body = {
+            "success": True,
+            "status": "completed" if done >= total else "scraping",
+            "total": total,
+            "completed": done,
+            "creditsUsed": done,
+            "data": documents,
+        }
+        if end < done:
+            body["next"] = f"{self.base_url()}/{version}/crawl/{job_id}?skip={end}"
+        return 200, body
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a local stand-in for the Firecrawl API",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s --fixtures fixtures/ --port 3002
+  %(prog)s --latency 300 --jitter 100 --rate-limit-rate 0.05 --error-rate 0.02 --seed 1
+  %(prog)s --max-rps 5 --log 2> requests.ndjson
+
+Then, in another shell:
+  export FIRECRAWL_API_URL=http://127.0.0.1:3002 FIRECRAWL_API_KEY=test
+  FIRECRAWL_TIMING=1 scrape.py --input-file urls.txt --workers 8 > pages.ndjson
+  curl -s http://127.0.0.1:3002/_stats
+
+Once listening, one {"success": true, "data": {"url", "pages"}} line is printed
+to stdout. Injected 429 responses carry a Retry-After header; --max-rps
+answers 429 to requests beyond N in any one-second window.
+        """,
+    )
+    parser.add_argument(
+        "--fixtures",
+        metavar="DIR",
+        help="Fixture directory with pages/, search.json and extract.json",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Interface to bind (default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on; 0 picks a free port (default: {DEFAULT_PORT})",
+    )
+    parser.add_argument(
+        "--api-key",
+        help="Only accept this API key (default: accept any key)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        metavar="MS",
+        help="Added delay per request in milliseconds (default: 0)",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        metavar="MS",
+        help="Uniform +/- variation of the latency in milliseconds (default: 0)",
+    )
+    parser.add_argument(
+        "--error-rate",
+        type=float,
+        default=0,
+        metavar="P",
+        help="Probability of answering 503 (default: 0)",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0,
+        metavar="P",
+        help="Probability of answering 429 with Retry-After (default: 0)",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Answer 429 to requests beyond N per second (default: unlimited)",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=int,
+        default=1,
+        metavar="SECONDS",
+        help="Retry-After value sent with 429 responses (default: 1)",
+    )
+    parser.add_argument(
+        "--crawl-pps",
+        type=float,
+        default=DEFAULT_CRAWL_PPS,
+        help=f"Crawl pages finished per second; 0 means at once (default: {DEFAULT_CRAWL_PPS:g})",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f"Documents per crawl status response (default: {DEFAULT_PAGE_SIZE})",
+    )
+    parser.add_argument(
+        "--synthetic-pages",
+        type=int,
+        default=DEFAULT_SYNTHETIC_PAGES,
+        help=f"Pages generated for hosts without fixtures (default: {DEFAULT_SYNTHETIC_PAGES})",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Answer 404 / empty results instead of generating content for unknown URLs",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for repeatable fault injection")
+    parser.add_argument(
+        "--log",
+        action="store_true",
+        help="Write one JSON line per request to stderr",
+    )
+
+    args = parser.parse_args()
+
+    try:
+        for name in ("error_rate", "rate_limit_rate"):
+            if not 0 <= getattr(args, name) <= 1:
+                raise ValueError(f"--{name.replace('_', '-')} must be between 0 and 1")
+        if args.error_rate + args.rate_limit_rate > 1:
+            raise ValueError("--error-rate plus --rate-limit-rate must not exceed 1")
+        if args.page_size < 1:
+            raise ValueError("--page-size must be at least 1")
+        if min(args.latency, args.jitter, args.max_rps, args.crawl_pps, args.synthetic_pages) < 0:
+            raise ValueError("Numeric options must not be negative")
+        if args.fixtures and not Path(args.fixtures).is_dir():
+            raise ValueError(f"Fixture directory not found: {args.fixtures}")
+
+        fixtures = Fixtures(args.fixtures, args.synthetic_pages, args.strict)
+        server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+        server.daemon_threads = True
+        server.state = MockState(fixtures, FaultInjector(args), args)
+    except (OSError, ValueError) as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+    host, port = server.server_address[:2]
+    data = {"url": f"http://{host}:{port}", "pages": len(fixtures.pages)}
+    print(json.dumps({"success": True, "data": data}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
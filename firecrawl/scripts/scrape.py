@@ -1,34 +1,168 @@
 #!/usr/bin/env python3
 """
-Scrape content from a single URL using Firecrawl API.
+Scrape content from one or many URLs using Firecrawl API.
 
 Usage:
     scrape.py <url> [--format markdown|html] [--only-main]
+    scrape.py <url> <url> ... [--workers N] [--rps N]
+    scrape.py --input-file urls.txt [--workers N] [--rps N] [--checkpoint DIR]
+
+With a single URL the result is printed as one JSON object. With several URLs
+(or --input-file) pages are scraped concurrently and one JSON object per line
+is streamed as each page completes. With --checkpoint, every result is also
+journaled so an interrupted run can be restarted without re-scraping.
 
 Examples:
     scrape.py "https://example.com"
     scrape.py "https://example.com" --format html
     scrape.py "https://example.com" --only-main
+    scrape.py --input-file urls.txt --workers 8 --rps 5
+    scrape.py --input-file urls.txt --checkpoint .firecrawl-jobs > pages.ndjson
+    map.py "https://docs.example.com" | scrape.py --input-file - --only-main
 """
 
 import argparse
 import json
-import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from firecrawl_cache import add_cache_arguments, cached_call, normalize_url, open_cache
+from firecrawl_checkpoint import Checkpoint, spec_digest
+from firecrawl_client import FirecrawlClient, print_error, require_api_key
+
+DEFAULT_WORKERS = 4
+
+
+def extract_urls(text):
+    """Return URLs from plain text (one per line) or from map.py JSON output."""
+    stripped = text.strip()
+    if stripped.startswith(("{", "[")):
+        payload = json.loads(stripped)
+        if isinstance(payload, dict):
+            payload = payload.get("data", payload)
+        if isinstance(payload, dict):
+            payload = payload.get("links", payload.get("urls", []))
+        urls = []
+        for item in payload:
+            if isinstance(item, dict):
+                item = item.get("url")
+            if isinstance(item, str) and item.strip():
+                urls.append(item.strip())
+        return urls
+    return [
+        line.strip()
+        for line in stripped.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+def collect_urls(args):
+    urls = list(args.urls)
+    if args.input_file:
+        if args.input_file == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args.input_file, encoding="utf-8") as handle:
+                text = handle.read()
+        urls.extend(extract_urls(text))
+    # Keep the first occurrence of each URL so a page is scraped once.
+    return list(dict.fromkeys(urls))
+
+
+def scrape_params(args):
+    return {"formats": [args.format], "onlyMainContent": args.only_main}
+
+
+def scrape_one(client, cache, url, args):
+    started = time.monotonic()
+    try:
+        result = cached_call(
+            cache,
+            "scrape",
+            url,
+            scrape_params(args),
+            lambda: client.scrape(url, formats=[args.format], only_main_content=args.only_main),
+        )
+        return {
+            "success": True,
+            "url": url,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "data": result,
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "url": url,
+            "elapsed_ms": round((time.monotonic() - started) * 1000),
+            "error": str(e),
+        }
+
+
+def write_record(record):
+    # One compact JSON object per line, flushed so consumers can stream.
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def open_checkpoint(urls, args):
+    spec = {
+        "endpoint": "scrape",
+        "params": scrape_params(args),
+        "urls": spec_digest(sorted(normalize_url(url) for url in urls)),
+    }
+    return Checkpoint(args.checkpoint, spec)
+
+
+def scrape_bulk(client, cache, urls, args, checkpoint=None):
+    failures = 0
+    if checkpoint is not None:
+        # Replay what an earlier run finished so stdout is still the full result.
+        for record in checkpoint.records():
+            write_record(record)
+        urls = [url for url in urls if not checkpoint.is_done(url)]
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(scrape_one, client, cache, url, args) for url in urls]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                if not record["success"]:
+                    failures += 1
+                if checkpoint is not None:
+                    checkpoint.record(record)
+                write_record(record)
+        except BaseException:
+            # Do not keep scraping queued pages whose results would be dropped.
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+    return failures
 
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Scrape content from a single URL",
+        description="Scrape content from one or many URLs",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
   %(prog)s "https://example.com"
   %(prog)s "https://example.com" --format html
   %(prog)s "https://example.com" --only-main
+  %(prog)s "https://a.example.com" "https://b.example.com" --workers 4
+  %(prog)s --input-file urls.txt --workers 8 --rps 5 > pages.ndjson
+  %(prog)s --input-file urls.txt --checkpoint .firecrawl-jobs > pages.ndjson
+
+Bulk mode prints one JSON object per line ({"success", "url", "data" or "error"})
+in completion order. --input-file accepts one URL per line or map.py JSON output;
+use "-" to read from stdin. With --checkpoint DIR, rerunning the same command
+replays finished pages from the journal and scrapes only the rest (failed
+pages are retried).
         """,
     )
-    parser.add_argument("url", help="URL to scrape")
+    parser.add_argument("urls", nargs="*", help="URL(s) to scrape")
     parser.add_argument(
         "--format",
         choices=["markdown", "html"],
@@ -40,45 +174,66 @@ Examples:
         action="store_true",
         help="Extract only main content (removes headers, footers, etc.)",
     )
+    parser.add_argument(
+        "--input-file",
+        help="File with URLs (one per line, or map.py JSON output); '-' reads stdin",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent scrapes in bulk mode (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=0,
+        help="Maximum scrape requests started per second in bulk mode (default: unlimited)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="DIR",
+        help="Journal results under DIR so a rerun of the same job skips finished URLs",
+    )
+
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     try:
-        from firecrawl import FirecrawlApp
+        urls = collect_urls(args)
+        if not urls:
+            raise ValueError("No URLs given. Pass URLs as arguments or use --input-file")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
+        if args.rps < 0:
+            raise ValueError("--rps must not be negative")
 
-        app = FirecrawlApp(api_key=api_key)
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key, rps=args.rps)
 
-        # Call scrape with keyword arguments
-        result = app.scrape(args.url, formats=[args.format], only_main_content=args.only_main)
-
-        print(json.dumps({"success": True, "data": result}, indent=2, default=str))
-
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
+        if len(urls) == 1 and not args.input_file and not args.checkpoint:
+            # Call scrape with keyword arguments
+            result = cached_call(
+                cache,
+                "scrape",
+                urls[0],
+                scrape_params(args),
+                lambda: client.scrape(
+                    urls[0], formats=[args.format], only_main_content=args.only_main
+                ),
             )
-        )
-        sys.exit(1)
+            print(json.dumps({"success": True, "data": result}, indent=2, default=str))
+        elif scrape_bulk(
+            client, cache, urls, args, open_checkpoint(urls, args) if args.checkpoint else None
+        ):
+            sys.exit(1)
+
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
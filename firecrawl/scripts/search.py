@@ -4,16 +4,145 @@ Search the web using Firecrawl API.
 
 Usage:
     search.py <query> [--limit N]
+    search.py --query "q1" --query "q2" ... [--queries-file FILE] [--workers N] [--rps N]
+
+With several queries, searches run concurrently and results are merged: URLs
+are normalized and deduplicated, each new URL is streamed as one JSON line as
+soon as a query returns it, and a final line reports per-query hit counts and
+the merged ranking (reciprocal rank fusion across queries).
 
 Examples:
     search.py "latest AI news"
     search.py "Python tutorials" --limit 5
+    search.py --query "firecrawl pricing" --query "firecrawl cost per page" --limit 10
+    search.py --queries-file variants.txt --workers 8 --rps 5 > merged.ndjson
 """
 
 import argparse
 import json
-import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from firecrawl_cache import (
+    add_cache_arguments,
+    cached_call,
+    normalize_query,
+    normalize_url,
+    open_cache,
+)
+from firecrawl_client import FirecrawlClient, print_error, require_api_key
+
+DEFAULT_WORKERS = 4
+# Standard reciprocal rank fusion constant; dampens the weight of top ranks.
+RRF_K = 60
+
+
+def collect_queries(args):
+    queries = ([args.query] if args.query else []) + list(args.queries)
+    if args.queries_file:
+        if args.queries_file == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(args.queries_file, encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+        queries.extend(
+            line.strip() for line in lines if line.strip() and not line.startswith("#")
+        )
+    # Drop variants that only differ in case or spacing.
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query.strip())
+    return list(unique.values())
+
+
+def result_items(result):
+    if isinstance(result, dict):
+        result = result.get("web") or result.get("data") or []
+    return [item for item in result or [] if isinstance(item, dict) and item.get("url")]
+
+
+class MergedResults:
+    """Aggregate search hits by normalized URL across queries."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, query, items):
+        """Record one query's results; return (rank, item) pairs for first-seen URLs."""
+        new = []
+        for rank, item in enumerate(items, start=1):
+            key = normalize_url(item["url"])
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    "url": item["url"],
+                    "title": item.get("title"),
+                    "description": item.get("description"),
+                    "score": 0.0,
+                    "hits": 0,
+                    "best_rank": rank,
+                    "queries": [],
+                }
+                new.append((rank, item))
+            if query in entry["queries"]:
+                continue
+            entry["score"] += 1.0 / (RRF_K + rank)
+            entry["hits"] += 1
+            entry["best_rank"] = min(entry["best_rank"], rank)
+            entry["queries"].append(query)
+        return new
+
+    def ranked(self):
+        entries = sorted(
+            self.entries.values(), key=lambda entry: (-entry["score"], entry["best_rank"])
+        )
+        return [{**entry, "score": round(entry["score"], 6)} for entry in entries]
+
+
+def search_many(client, cache, queries, args):
+    """Run queries concurrently, streaming new URLs; return the number of failed queries."""
+    params = {"limit": args.limit}
+    merged = MergedResults()
+    stats = {query: {"query": query, "hits": 0, "new": 0} for query in queries}
+
+    def run(query):
+        return cached_call(cache, "search", query, params, lambda: client.search(query, **params))
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(run, query): query for query in queries}
+        for future in as_completed(futures):
+            query = futures[future]
+            try:
+                items = result_items(future.result())
+            except Exception as e:
+                stats[query]["error"] = str(e)
+                record = {"success": False, "query": query, "error": str(e)}
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+                continue
+            new = merged.add(query, items)
+            stats[query]["hits"] = len(items)
+            stats[query]["new"] = len(new)
+            for rank, item in new:
+                record = {
+                    "success": True,
+                    "url": item["url"],
+                    "query": query,
+                    "rank": rank,
+                    "data": item,
+                }
+                sys.stdout.write(json.dumps(record, default=str) + "\n")
+            sys.stdout.flush()
+
+    failures = sum(1 for entry in stats.values() if "error" in entry)
+    summary = {
+        "success": failures < len(queries),
+        "queries": [stats[query] for query in queries],
+        "unique": len(merged.entries),
+        "results": merged.ranked(),
+    }
+    sys.stdout.write(json.dumps(summary, default=str) + "\n")
+    return failures
 
 
 def main():
@@ -24,53 +153,77 @@ def main():
 Examples:
   %(prog)s "latest AI news"
   %(prog)s "Python web scraping tutorials" --limit 5
+  %(prog)s --query "firecrawl pricing" --query "firecrawl cost per page"
+  %(prog)s --queries-file variants.txt --workers 8 --rps 5 > merged.ndjson
+
+With more than one query the output is NDJSON: one {"success", "url", "query",
+"rank", "data"} line per newly seen URL as queries complete, then a final
+{"success", "queries", "unique", "results"} line with per-query hit counts and
+the merged results ranked by reciprocal rank fusion.
         """,
     )
-    parser.add_argument("query", help="Search query")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument(
+        "--query",
+        dest="queries",
+        action="append",
+        default=[],
+        metavar="QUERY",
+        help="Additional search query (repeatable)",
+    )
+    parser.add_argument(
+        "--queries-file",
+        help="File with one query per line; '-' reads stdin",
+    )
     parser.add_argument(
         "--limit",
         type=int,
         default=10,
-        help="Maximum number of results (default: 10)",
+        help="Maximum number of results per query (default: 10)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent searches with several queries (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=0,
+        help="Maximum search requests started per second (default: unlimited)",
     )
 
+    add_cache_arguments(parser)
+
     args = parser.parse_args()
 
     # Check for API key
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    api_key = require_api_key(args.offline)
 
     try:
-        from firecrawl import FirecrawlApp
+        queries = collect_queries(args)
+        if not queries:
+            raise ValueError("No query given. Pass a query, --query or --queries-file")
+        if args.workers < 1:
+            raise ValueError("--workers must be at least 1")
+        if args.rps < 0:
+            raise ValueError("--rps must not be negative")
 
-        app = FirecrawlApp(api_key=api_key)
+        cache = open_cache(args)
+        client = FirecrawlClient(api_key, rps=args.rps)
 
-        result = app.search(args.query, params={"limit": args.limit})
-
-        print(json.dumps({"success": True, "data": result}, indent=2, default=str))
-
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
+        if len(queries) == 1 and not args.queries_file:
+            params = {"limit": args.limit}
+            result = cached_call(
+                cache, "search", queries[0], params, lambda: client.search(queries[0], **params)
             )
-        )
-        sys.exit(1)
+            print(json.dumps({"success": True, "data": result}, indent=2, default=str))
+        elif search_many(client, cache, queries, args) == len(queries):
+            sys.exit(1)
+
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
-        sys.exit(1)
+        print_error(str(e))
 
 
 if __name__ == "__main__":
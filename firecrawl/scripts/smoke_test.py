@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Run every Firecrawl script against the local mock server.
+
+Usage:
+    smoke_test.py [--fixtures DIR] [--rate-limit-rate P] [--seed N] [--no-jp-grants]
+
+Starts mock_server.py on a free port, runs each script with FIRECRAWL_API_URL
+pointing at it and checks that it exits 0 and prints only success JSON. Further
+scenarios, each against a mock of its own, cover the riskier paths:
+
+- cache: a --cache run is replayed --offline without API requests, and an
+  --offline miss fails
+- checkpoint: an interrupted crawl --checkpoint resumes the same job without
+  duplicate pages, and a finished one replays from the journal
+- incremental: a second crawl --incremental run outputs no unchanged pages
+- bisection: an extract chunk with one unknown URL is split until only that
+  URL is reported under "errors"
+- retries: scripts succeed while the mock injects 429 and 503 responses
+- duplicate POSTs: job-starting requests answered with 503 are sent only once
+
+No API key or network access is needed. The jp-grants scripts are checked too
+when that skill is installed next to this one.
+
+Examples:
+    smoke_test.py
+    smoke_test.py --rate-limit-rate 0.2 --seed 1
+    smoke_test.py --fixtures fixtures/
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.request import urlopen
+
+from firecrawl_client import print_error
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+JP_GRANTS_DIR = SCRIPT_DIR.parent.parent / "jp-grants" / "scripts"
+CHECK_TIMEOUT_SECONDS = 120
+# A reserved TLD: the origin requests of --incremental fail without leaving the machine.
+SITE = "https://docs.example.invalid"
+RETRY_SEED = 3
+
+CHECKS = [
+    ("scrape", ["scrape.py", f"{SITE}/"]),
+    ("scrape bulk", ["scrape.py", f"{SITE}/a", f"{SITE}/b", f"{SITE}/c", "--workers", "3"]),
+    ("search", ["search.py", "firecrawl pricing", "--limit", "3"]),
+    ("map", ["map.py", SITE, "--limit", "20"]),
+    ("map_scrape", ["map_scrape.py", SITE, "--budget", "3"]),
+    ("crawl", ["crawl.py", SITE, "--limit", "5"]),
+    ("crawl stream", ["crawl.py", SITE, "--limit", "5", "--stream"]),
+    (
+        "extract",
+        ["extract.py", f"{SITE}/a", f"{SITE}/b", "--prompt", "Extract the title", "--chunk-size", "1"],
+    ),
+    # The mock has no agent endpoint, so this covers the extract fallback.
+    ("agent", ["agent.py", "--prompt", "Summarize the page", "--urls", f"{SITE}/"]),
+]
+
+JP_GRANTS_CHECKS = [
+    (
+        "jp-grants find_candidates",
+        ["find_candidates.py", "--query", "補助金", "--limit", "2", "--max-queries", "2"],
+    ),
+    ("jp-grants extract_programs", ["extract_programs.py", f"{SITE}/"]),
+]
+
+# Sequential, so the mock's seeded faults hit the same requests on every run.
+RETRY_CHECKS = [
+    ("retries scrape", ["scrape.py", f"{SITE}/"]),
+    ("retries search", ["search.py", "firecrawl pricing", "--limit", "3"]),
+    ("retries map", ["map.py", SITE, "--limit", "20"]),
+    ("retries crawl", ["crawl.py", SITE, "--limit", "3"]),
+]
+
+# Each job-starting request and the endpoint it must reach exactly once.
+DUPLICATE_POST_CHECKS = [
+    ("no duplicate crawl POST", "POST /v1/crawl", ["crawl.py", SITE, "--limit", "3"]),
+    (
+        "no duplicate extract POST",
+        "POST /v1/extract",
+        ["extract.py", f"{SITE}/", "--prompt", "Extract the title", "--chunk-retries", "0"],
+    ),
+    (
+        "no duplicate agent POST",
+        "POST /v2/agent",
+        ["agent.py", "--prompt", "Summarize the page", "--urls", f"{SITE}/"],
+    ),
+]
+
+
+@contextmanager
+def mock_server(*options):
+    """Run mock_server.py on a free port for the duration of the block; yield its URL."""
+    command = [sys.executable, str(SCRIPT_DIR / "mock_server.py"), "--port", "0", *options]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        try:
+            ready = json.loads(line)
+        except json.JSONDecodeError:
+            ready = {}
+        if not ready.get("success"):
+            raise RuntimeError(ready.get("error") or "mock_server.py did not start")
+        yield ready["data"]["url"]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def fetch_stats(url):
+    with urlopen(f"{url}/_stats") as response:
+        return json.loads(response.read())
+
+
+def new_requests(before, after, endpoint=None):
+    """Requests the mock received between two /_stats snapshots (to one endpoint)."""
+    counts = after["requests"]
+    keys = [endpoint] if endpoint else counts
+    return sum(counts.get(key, 0) - before["requests"].get(key, 0) for key in keys)
+
+
+def output_records(stdout):
+    """Parse a script's stdout as one JSON document or as JSON lines."""
+    try:
+        return [json.loads(stdout)]
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in stdout.splitlines() if line.strip()]
+
+
+def run_script(command, cwd, env):
+    """Run one script; return (completed process, parsed output records)."""
+    completed = subprocess.run(
+        [sys.executable, *command],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=CHECK_TIMEOUT_SECONDS,
+    )
+    return completed, output_records(completed.stdout)
+
+
+def script_error(completed, records):
+    """Why a run did not succeed, or None when it exited 0 with only success output."""
+    failed = [record for record in records if not record.get("success")]
+    if completed.returncode == 0 and records and not failed:
+        return None
+    error = failed[0].get("error") if failed else None
+    return error or completed.stderr.strip()[-500:] or "No output"
+
+
+def stderr_summary(completed):
+    """The last JSON line a script wrote to stderr."""
+    lines = [line for line in completed.stderr.splitlines() if line.startswith("{")]
+    return json.loads(lines[-1]) if lines else {}
+
+
+def run_check(name, verify):
+    """Time `verify`, which returns an error message or None, as one check entry."""
+    started = time.monotonic()
+    check = {"name": name, "ok": False}
+    try:
+        error = verify()
+    except (OSError, KeyError, subprocess.TimeoutExpired, json.JSONDecodeError) as e:
+        error = f"{type(e).__name__}: {e}"
+    if error:
+        check["error"] = error
+    else:
+        check["ok"] = True
+    check["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+    return check
+
+
+def script_check(name, command, cwd, env):
+    return run_check(name, lambda: script_error(*run_script(command, cwd, env)))
+
+
+def api_env(url, **extra):
+    return {**os.environ, "FIRECRAWL_API_URL": url, "FIRECRAWL_API_KEY": "test", **extra}
+
+
+def check_scripts(args, workdir):
+    """Every script once, against generated content or --fixtures."""
+    options = ["--crawl-pps", "0", "--rate-limit-rate", str(args.rate_limit_rate), "--retry-after", "0"]
+    if args.fixtures:
+        options += ["--fixtures", args.fixtures]
+    if args.seed is not None:
+        options += ["--seed", str(args.seed)]
+    with mock_server(*options) as url:
+        env = api_env(url)
+        checks = [script_check(name, command, SCRIPT_DIR, env) for name, command in CHECKS]
+        if JP_GRANTS_DIR.is_dir() and not args.no_jp_grants:
+            env["FIRECRAWL_SKILL_DIR"] = str(SCRIPT_DIR.parent)
+            checks += [
+                script_check(name, command, JP_GRANTS_DIR, env)
+                for name, command in JP_GRANTS_CHECKS
+            ]
+        return checks, fetch_stats(url)
+
+
+def check_cache(args, workdir):
+    """A --cache run answers the same --offline call; an --offline miss fails."""
+    with mock_server("--crawl-pps", "0") as url:
+        env = api_env(url, FIRECRAWL_CACHE_DIR=str(workdir / "cache"))
+
+        def replay():
+            error = script_error(*run_script(["scrape.py", f"{SITE}/", "--cache"], SCRIPT_DIR, env))
+            if error:
+                return error
+            before = fetch_stats(url)
+            completed, records = run_script(["scrape.py", f"{SITE}/", "--offline"], SCRIPT_DIR, env)
+            error = script_error(completed, records)
+            if error:
+                return f"--offline replay failed: {error}"
+            sent = new_requests(before, fetch_stats(url))
+            return f"--offline sent {sent} API requests" if sent else None
+
+        def miss():
+            completed, _ = run_script(["scrape.py", f"{SITE}/uncached", "--offline"], SCRIPT_DIR, env)
+            return "--offline cache miss exited 0" if completed.returncode == 0 else None
+
+        checks = [run_check("cache offline replay", replay), run_check("cache offline miss", miss)]
+        return checks, fetch_stats(url)
+
+
+def check_checkpoint(args, workdir):
+    """Interrupt a crawl --checkpoint, resume it, then replay the finished crawl."""
+    # One page per second keeps the crawl running long enough to interrupt it.
+    with mock_server("--crawl-pps", "1") as url:
+        env = api_env(url)
+        command = ["crawl.py", SITE, "--limit", "6", "--checkpoint", str(workdir / "checkpoint")]
+        resumed_urls = []
+
+        def resume():
+            process = subprocess.Popen(
+                [sys.executable, *command],
+                cwd=SCRIPT_DIR,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+            first = process.stdout.readline()
+            process.send_signal(signal.SIGINT)
+            rest, _ = process.communicate(timeout=CHECK_TIMEOUT_SECONDS)
+            if process.returncode != 130:
+                return f"Crawl was not interrupted (exit code {process.returncode})"
+            interrupted = {record["url"] for record in output_records(first + rest)}
+            completed, records = run_script(command, SCRIPT_DIR, env)
+            error = script_error(completed, records)
+            if error:
+                return f"Resumed crawl failed: {error}"
+            resumed_urls.extend(record["url"] for record in records)
+            if len(set(resumed_urls)) != len(resumed_urls):
+                return "Resumed crawl output duplicate pages"
+            if not interrupted <= set(resumed_urls) or len(resumed_urls) != 6:
+                return f"Resumed crawl output {len(resumed_urls)} of 6 pages"
+            jobs = fetch_stats(url)["requests"].get("POST /v1/crawl", 0)
+            return f"Resumed crawl started {jobs} jobs" if jobs != 1 else None
+
+        def replay():
+            before = fetch_stats(url)
+            completed, records = run_script(command, SCRIPT_DIR, env)
+            error = script_error(completed, records)
+            if error:
+                return f"Replayed crawl failed: {error}"
+            if [record["url"] for record in records] != resumed_urls:
+                return "Replayed crawl output differs from the resumed one"
+            sent = new_requests(before, fetch_stats(url))
+            return f"Finished checkpoint sent {sent} API requests" if sent else None
+
+        checks = [run_check("crawl checkpoint resume", resume)]
+        if checks[0]["ok"]:
+            checks.append(run_check("crawl checkpoint replay", replay))
+        return checks, fetch_stats(url)
+
+
+def check_incremental(args, workdir):
+    """A second crawl --incremental run over unchanged pages outputs nothing new."""
+    with mock_server("--crawl-pps", "0") as url:
+        env = api_env(url)
+        command = ["crawl.py", SITE, "--limit", "5", "--incremental", str(workdir / "index.json")]
+
+        def first_run():
+            completed, records = run_script(command, SCRIPT_DIR, env)
+            error = script_error(completed, records)
+            if error:
+                return error
+            changes = {record.get("change") for record in records}
+            return f"First run reported changes {sorted(changes)}" if changes != {"new"} else None
+
+        def second_run():
+            completed, records = run_script(command, SCRIPT_DIR, env)
+            if completed.returncode != 0:
+                return completed.stderr.strip()[-500:] or "No output"
+            if records:
+                return f"Second run output {len(records)} pages"
+            summary = stderr_summary(completed)
+            if not summary.get("mapped") or summary.get("unchanged") != summary["mapped"]:
+                return f"Unexpected summary {json.dumps(summary)}"
+            return None
+
+        checks = [run_check("crawl incremental first run", first_run)]
+        if checks[0]["ok"]:
+            checks.append(run_check("crawl incremental unchanged", second_run))
+        return checks, fetch_stats(url)
+
+
+def check_bisection(args, workdir):
+    """A failing extract chunk is split until only the unknown URL is left as an error."""
+    urls = [f"{SITE}/{name}" for name in ("a", "b", "c", "d")]
+    missing = urls[2]
+    fixtures = workdir / "bisection"
+    fixtures.mkdir()
+    extract = {url: {"titles": [url]} for url in urls if url != missing}
+    (fixtures / "extract.json").write_text(json.dumps(extract), encoding="utf-8")
+    schema = {"type": "object", "properties": {"titles": {"type": "array"}}}
+
+    # --strict fails the whole extract job for the URL without fixture data.
+    with mock_server("--strict", "--fixtures", str(fixtures)) as url:
+        env = api_env(url)
+
+        def bisect():
+            command = [
+                "extract.py",
+                *urls,
+                "--prompt",
+                "Extract the title",
+                "--schema",
+                json.dumps(schema),
+                "--chunk-size",
+                "4",
+                "--chunk-retries",
+                "0",
+            ]
+            completed, records = run_script(command, SCRIPT_DIR, env)
+            error = script_error(completed, records)
+            if error:
+                return error
+            output = records[0]
+            failed = [entry["url"] for entry in output.get("errors", [])]
+            if failed != [missing]:
+                return f"Expected only {missing} under errors, got {failed}"
+            titles = output["data"].get("titles")
+            if sorted(titles or []) != sorted(extract):
+                return f"Merged data lost pages: {titles}"
+            return None
+
+        checks = [run_check("extract chunk bisection", bisect)]
+        return checks, fetch_stats(url)
+
+
+def check_retries(args, workdir):
+    """Scripts still succeed while the mock injects 429 and 503 responses."""
+    options = ["--crawl-pps", "0", "--error-rate", "0.2", "--rate-limit-rate", "0.2"]
+    options += ["--retry-after", "0", "--seed", str(RETRY_SEED)]
+    with mock_server(*options) as url:
+        env = api_env(url)
+        checks = [script_check(name, command, SCRIPT_DIR, env) for name, command in RETRY_CHECKS]
+        stats = fetch_stats(url)
+
+        def injected():
+            statuses = stats["statuses"]
+            absent = [status for status in ("429", "503") if not statuses.get(status)]
+            return f"No {' or '.join(absent)} responses were injected" if absent else None
+
+        checks.append(run_check("retries injected 429 and 503", injected))
+        return checks, stats
+
+
+def check_duplicate_posts(args, workdir):
+    """Job-starting requests answered with 503 fail without being sent again."""
+    with mock_server("--crawl-pps", "0", "--error-rate", "1") as url:
+        env = api_env(url, FIRECRAWL_MAX_RETRIES="2")
+
+        def verify(endpoint, command):
+            def sent_once():
+                before = fetch_stats(url)
+                completed, _ = run_script(command, SCRIPT_DIR, env)
+                if completed.returncode == 0:
+                    return "Expected the 503 to fail the run"
+                sent = new_requests(before, fetch_stats(url), endpoint)
+                return f"{endpoint} was sent {sent} times" if sent != 1 else None
+
+            return sent_once
+
+        checks = [
+            run_check(name, verify(endpoint, command))
+            for name, endpoint, command in DUPLICATE_POST_CHECKS
+        ]
+        return checks, fetch_stats(url)
+
+
+SCENARIOS = [
+    ("scripts", check_scripts),
+    ("cache", check_cache),
+    ("checkpoint", check_checkpoint),
+    ("incremental", check_incremental),
+    ("bisection", check_bisection),
+    ("retries", check_retries),
+    ("duplicate_posts", check_duplicate_posts),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run every Firecrawl script against the local mock server",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s
+  %(prog)s --rate-limit-rate 0.2 --seed 1
+  %(prog)s --fixtures fixtures/
+
+Prints {"success", "data": {"checks", "stats"}} with one {"name", "ok",
+"elapsed_ms"} entry per check and the /_stats counts of each scenario's mock.
+--fixtures, --rate-limit-rate and --seed apply to the run of every script;
+the cache, checkpoint, incremental, bisection, retry and duplicate-POST
+scenarios use mocks of their own. Exits 1 when any check fails.
+        """,
+    )
+    parser.add_argument(
+        "--fixtures",
+        metavar="DIR",
+        help="Fixture directory for the mock server (default: generated content)",
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0,
+        metavar="P",
+        help="Fraction of requests the mock answers with 429, to exercise retries (default: 0)",
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for the injected 429 responses")
+    parser.add_argument(
+        "--no-jp-grants",
+        action="store_true",
+        help="Skip the jp-grants scripts even when that skill is installed",
+    )
+
+    args = parser.parse_args()
+
+    checks, stats = [], {}
+    try:
+        with tempfile.TemporaryDirectory(prefix="firecrawl-smoke-") as tmp:
+            for name, scenario in SCENARIOS:
+                workdir = Path(tmp) / name
+                workdir.mkdir()
+                scenario_checks, stats[name] = scenario(args, workdir)
+                checks += scenario_checks
+    except (OSError, RuntimeError) as e:
+        print_error(str(e))
+
+    failed = [check for check in checks if not check["ok"]]
+    result = {"success": not failed, "data": {"checks": checks, "stats": stats}}
+    if failed:
+        result["error"] = f"{len(failed)} of {len(checks)} checks failed"
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,10 @@ Examples:
 
 import argparse
 import json
-import os
 import sys
 
+from firecrawl_api import create_client
+
 
 DEFAULT_SCHEMA = {
     "type": "object",
@@ -108,27 +109,6 @@ Fields:
 """.strip()
 
 
-def _to_jsonable(obj):
-    if obj is None or isinstance(obj, (str, int, float, bool)):
-        return obj
-    if isinstance(obj, list):
-        return [_to_jsonable(x) for x in obj]
-    if isinstance(obj, dict):
-        return {str(k): _to_jsonable(v) for k, v in obj.items()}
-    for meth in ("model_dump", "dict"):
-        if hasattr(obj, meth):
-            try:
-                return _to_jsonable(getattr(obj, meth)())
-            except Exception:
-                pass
-    if hasattr(obj, "__dict__"):
-        try:
-            return _to_jsonable(obj.__dict__)
-        except Exception:
-            pass
-    return str(obj)
-
-
 def main():
     parser = argparse.ArgumentParser(
         description="Extract official public award-result fields from result pages",
@@ -148,17 +128,7 @@ Examples:
     )
     args = parser.parse_args()
 
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
+    client = create_client()
 
     schema = DEFAULT_SCHEMA
     if args.schema:
@@ -171,26 +141,8 @@ Examples:
             sys.exit(1)
 
     try:
-        from firecrawl import FirecrawlApp
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
-
-    try:
-        app = FirecrawlApp(api_key=api_key)
-        result = app.extract(args.urls, prompt=args.prompt, schema=schema)
-        print(
-            json.dumps(
-                {"success": True, "data": _to_jsonable(result)}, indent=2, default=str
-            )
-        )
+        result = client.extract(args.urls, prompt=args.prompt, schema=schema)
+        print(json.dumps({"success": True, "data": result}, indent=2, default=str))
     except Exception as exc:
         print(json.dumps({"success": False, "error": str(exc)}))
         sys.exit(1)
@@ -14,10 +14,11 @@ Examples:
 
 import argparse
 import json
-import os
 import sys
 from urllib.parse import urlparse
 
+from firecrawl_api import create_client
+
 
 DEFAULT_SITE_QUERIES = [
     "site:chusho.meti.go.jp",
@@ -88,50 +89,6 @@ def _dedupe_results(results):
     return out
 
 
-def _to_jsonable(obj):
-    if obj is None or isinstance(obj, (str, int, float, bool)):
-        return obj
-    if isinstance(obj, list):
-        return [_to_jsonable(x) for x in obj]
-    if isinstance(obj, dict):
-        return {str(k): _to_jsonable(v) for k, v in obj.items()}
-    for meth in ("model_dump", "dict"):
-        if hasattr(obj, meth):
-            try:
-                return _to_jsonable(getattr(obj, meth)())
-            except Exception:
-                pass
-    if hasattr(obj, "__dict__"):
-        try:
-            return _to_jsonable(obj.__dict__)
-        except Exception:
-            pass
-    return str(obj)
-
-
-def _extract_items(search_result):
-    # firecrawl-py v2 returns a SearchData object with .data
-    if hasattr(search_result, "data"):
-        try:
-            items = getattr(search_result, "data")
-            if isinstance(items, list):
-                return [_to_jsonable(x) for x in items]
-        except Exception:
-            pass
-
-    # Older variants: dict-like with "data".
-    if isinstance(search_result, dict):
-        data = search_result.get("data")
-        if isinstance(data, list):
-            return [_to_jsonable(x) for x in data]
-
-    # Fallback: attempt to coerce to list.
-    if isinstance(search_result, list):
-        return [_to_jsonable(x) for x in search_result]
-
-    return []
-
-
 def main():
     parser = argparse.ArgumentParser(
         description="Find candidate Japanese subsidy/grant pages via Firecrawl search",
@@ -179,30 +136,7 @@ Examples:
     )
     args = parser.parse_args()
 
-    api_key = os.environ.get("FIRECRAWL_API_KEY")
-    if not api_key:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "FIRECRAWL_API_KEY environment variable not set",
-                }
-            )
-        )
-        sys.exit(1)
-
-    try:
-        from firecrawl import FirecrawlApp
-    except ImportError:
-        print(
-            json.dumps(
-                {
-                    "success": False,
-                    "error": "firecrawl-py not installed. Run: pip install firecrawl-py",
-                }
-            )
-        )
-        sys.exit(1)
+    client = create_client()
 
     site_queries = list(DEFAULT_SITE_QUERIES)
     if args.include_local:
@@ -239,14 +173,11 @@ Examples:
     # Cap to avoid excessive API usage.
     expanded_queries = expanded_queries[: max(1, args.max_queries)]
 
-    app = FirecrawlApp(api_key=api_key)
-
     all_results = []
     per_query = []
     try:
         for q in expanded_queries:
-            r = app.search(q, limit=args.limit)
-            items = _extract_items(r)
+            items = client.search(q, limit=args.limit) or []
             per_query.append({"query": q, "count": len(items)})
             all_results.extend(items)
 
@@ -0,0 +1,40 @@
+"""
+Firecrawl access shared by the jp-grants scripts.
+
+The scripts use the firecrawl skill's API client (`firecrawl/scripts/firecrawl_client.py`)
+rather than a second client of their own, so they get the same connection reuse,
+429/5xx retries and FIRECRAWL_API_URL handling. Skills are installed side by side,
+so the client is loaded from the sibling `firecrawl` skill directory; set
+FIRECRAWL_SKILL_DIR when it is installed elsewhere.
+"""
+
+import json
+import os
+import sys
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SKILL_DIR = os.path.join(SCRIPT_DIR, os.pardir, os.pardir, "firecrawl")
+
+
+def _fail(message):
+    print(json.dumps({"success": False, "error": message}))
+    sys.exit(1)
+
+
+def create_client():
+    """Return a FirecrawlClient for FIRECRAWL_API_KEY, or print the error JSON and exit."""
+    api_key = os.environ.get("FIRECRAWL_API_KEY")
+    if not api_key:
+        _fail("FIRECRAWL_API_KEY environment variable not set")
+
+    skill_dir = os.environ.get("FIRECRAWL_SKILL_DIR") or DEFAULT_SKILL_DIR
+    sys.path.insert(0, os.path.join(os.path.abspath(skill_dir), "scripts"))
+    try:
+        from firecrawl_client import FirecrawlClient
+    except ImportError:
+        _fail(
+            "firecrawl skill not found. Run: npx skills add tumf/skills --skill firecrawl "
+            "(or set FIRECRAWL_SKILL_DIR to its directory)"
+        )
+    return FirecrawlClient(api_key)